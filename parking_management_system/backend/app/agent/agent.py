@@ -1,23 +1,46 @@
 from typing import List, Dict, Any, Optional
-import os
 import json
 import uuid
 import requests
 from datetime import datetime
 from sqlalchemy.orm import Session
 
+from ..database import crud
+from ..llm.client import LLMClient, LLMError, get_llm_client
+from ..llm.response_cache import LLMResponseCache, bypass_reason, cache_key
+from ..llm.scheduler import LLMOverloaded, LLMPriority, LLMScheduler
+from .gazetteer import get_gazetteer
+from .stage_timings import StageTimer, StageTimings
+from .prompt_builder import PromptBuilder, SHARED_USER_ID, SHARED_USER_NAME
+from .time_parser import InvalidDateError, combine_time_phrases, duration_hours, find_time_phrase, resolve_time_period
+from .tools import LIVE_DATA_TOOLS, MAX_TOOL_ROUNDS, TOOL_DEFINITIONS, run_tool, tool_calling_enabled
 from ..memory.chat_manager import ChatMemoryManager
 from ..memory.vector_store import VectorChatHistory
 from ..memory.file_chat_history import FileChatHistory
+from ..memory.history_window import HistoryWindow
 from ..memory.in_memory_store import InMemoryStore
 
 class ParkingAgent:
-    def __init__(self, db: Session, user_id: str, model_name: str = "llama-3.3-70b-versatile", use_vector_store: bool = False):
+    def __init__(
+        self,
+        db: Session,
+        user_id: str,
+        model_name: str = "llama-3.3-70b-versatile",
+        use_vector_store: bool = False,
+        memory_manager: Optional[ChatMemoryManager] = None,
+        file_chat: Optional[FileChatHistory] = None,
+        vector_store: Optional[VectorChatHistory] = None,
+        llm_client: Optional[LLMClient] = None,
+        use_tools: Optional[bool] = None
+    ):
         self.db = db
         self.user_id = user_id
         self.user_name = None  # Will be set from the header if available
         self.model_name = model_name
-        self.api_key = os.getenv("GROQ_API_KEY")
+        self.llm = llm_client or get_llm_client()
+        # Function calling instead of the full catalog and slot list in every prompt (LLM_TOOL_CALLING)
+        self.use_tools = tool_calling_enabled() if use_tools is None else use_tools
+        self.last_tool_calls: List[str] = []
         self.use_vector_store = use_vector_store
 
         # Initialize in-memory store
@@ -31,50 +54,112 @@ class ParkingAgent:
         self.conversation_context = self.store.get_conversation_context(user_id)
         print(f"Retrieved conversation context from store: {self.conversation_context}")
 
-        # Initialize memory managers
-        self.memory_manager = ChatMemoryManager(user_id=user_id)
+        # Initialize memory managers (shared with the user's other cached agents when given)
+        self.memory_manager = memory_manager or ChatMemoryManager(user_id=user_id)
 
         # Initialize chat history
         if use_vector_store:
             try:
-                self.vector_store = VectorChatHistory(user_id=user_id)
+                self.vector_store = vector_store or VectorChatHistory(user_id=user_id)
                 # Create a default conversation ID if not provided
                 self.conversation_id = str(uuid.uuid4())
             except Exception as e:
                 print(f"Error initializing vector store: {str(e)}")
                 self.use_vector_store = False
                 # Fall back to file-based chat history
-                self.file_chat = FileChatHistory(user_id=user_id)
+                self.file_chat = file_chat or FileChatHistory(user_id=user_id)
                 self.conversation_id = str(uuid.uuid4())
         else:
             # Use file-based chat history
-            self.file_chat = FileChatHistory(user_id=user_id)
+            self.file_chat = file_chat or FileChatHistory(user_id=user_id)
             self.conversation_id = str(uuid.uuid4())
 
+        # Token-budgeted history for prompts; summaries are stored with the file chat history when there is one
+        self.history_window = HistoryWindow(summary_store=getattr(self, "file_chat", None))
+
+    def bind_request(self, db: Session, conversation_id: Optional[str] = None, user_name: Optional[str] = None):
+        """Prepare a cached agent for a new request.
+
+        Binds the request's DB session and reloads the per-user state other
+        agents of the same user may have changed since this one last ran.
+        """
+        self.db = db
+        self.user_name = user_name
+        self.pending_booking = self.store.get_pending_booking(self.user_id)
+        self.conversation_context = self.store.get_conversation_context(self.user_id)
+        # Requests without a conversation ID start a new conversation, as a fresh agent would
+        self.conversation_id = conversation_id or str(uuid.uuid4())
+
+    def _llm_priority(self) -> LLMPriority:
+        """Get the scheduling priority of this conversation's next LLM call."""
+        intent = self.conversation_context.get("intent")
+        if self.pending_booking or intent in ("create_booking", "cancel_booking"):
+            return LLMPriority.BOOKING
+        if intent:
+            return LLMPriority.DEFAULT
+        return LLMPriority.SMALL_TALK
+
     def _call_groq_api(self, messages):
-        """Call the Groq API directly."""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
-        data = {
-            "model": self.model_name,
-            "messages": messages,
-            "temperature": 0.2,
-            "max_tokens": 1000
-        }
-
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=data
-        )
-
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
-        else:
-            return f"Error calling Groq API: {response.status_code} - {response.text}"
+        """Call the Groq API through the pooled LLM client.
+
+        Waits for a slot from the LLM scheduler first; raises LLMOverloaded if none frees up in time.
+        """
+        self.last_tool_calls = []
+        try:
+            with LLMScheduler().slot(self._llm_priority()):
+                if self.use_tools:
+                    return self._run_tool_loop(messages)
+                return self.llm.chat(messages, model=self.model_name, temperature=0.2, max_tokens=1000)
+        except LLMError as e:
+            if e.status_code is not None:
+                return f"Error calling Groq API: {e.status_code} - {e.body}"
+            return f"Error calling Groq API: {str(e)}"
+
+    def _stream_groq_api(self, messages):
+        """Call the Groq API with streaming enabled, yielding content tokens as they arrive.
+
+        The scheduler slot is held until the stream ends. In tool-calling mode the
+        model's tool rounds aren't streamed, so the answer arrives as one chunk.
+        """
+        if self.use_tools:
+            yield self._call_groq_api(messages)
+            return
+        try:
+            with LLMScheduler().slot(self._llm_priority()):
+                yield from self.llm.stream_chat(messages, model=self.model_name, temperature=0.2, max_tokens=1000)
+        except LLMError as e:
+            if e.status_code is not None:
+                yield f"Error calling Groq API: {e.status_code} - {e.body}"
+            else:
+                yield f"Error calling Groq API: {str(e)}"
+
+    def _run_tool_loop(self, messages):
+        """Let the model call tools until it answers, running each call locally.
+
+        After MAX_TOOL_ROUNDS rounds the model is made to answer without more tools.
+        """
+        messages = list(messages)
+        for round_number in range(MAX_TOOL_ROUNDS + 1):
+            tool_choice = "auto" if round_number < MAX_TOOL_ROUNDS else "none"
+            message = self.llm.complete(
+                messages, model=self.model_name, tools=TOOL_DEFINITIONS, tool_choice=tool_choice,
+                temperature=0.2, max_tokens=1000
+            )
+            tool_calls = message.get("tool_calls") or []
+            if not tool_calls:
+                return message.get("content") or ""
+
+            messages.append({"role": "assistant", "content": message.get("content"), "tool_calls": tool_calls})
+            for tool_call in tool_calls:
+                name = tool_call["function"]["name"]
+                print(f"Running tool {name} with {tool_call['function'].get('arguments')}")
+                self.last_tool_calls.append(name)
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call["id"],
+                    "content": run_tool(self, name, tool_call["function"].get("arguments"))
+                })
+        return message.get("content") or ""
 
     def _handle_booking_command(self, query):
         """Handle a booking command from the user."""
@@ -217,76 +302,25 @@ Please respond with "Yes" or "No".
 
                 # Add time information if available
                 if self.conversation_context["selected_time_period"]:
-                    # Parse the time period to create a proper datetime
-                    import re
-                    import datetime
-
+                    # Resolve the time phrase (e.g. "tomorrow at 5 pm for 2 hours") to start and end times
                     time_period = self.conversation_context["selected_time_period"]
                     print(f"Processing time period: {time_period}")
-
-                    # Get current date
-                    now = datetime.datetime.now()
-
-                    # Default values
-                    booking_date = now.date()
-                    booking_hour = 17  # Default to 5 PM
-                    booking_minute = 0
-                    duration_hours = 2  # Default duration
-
-                    # Check for "tomorrow"
-                    if "tomorrow" in time_period.lower():
-                        booking_date = (now + datetime.timedelta(days=1)).date()
-                        print(f"Setting date to tomorrow: {booking_date}")
-
-                    # Extract time (e.g., "5 pm", "3:30 pm")
-                    time_match = re.search(r'(\d+)(?::(\d+))?\s*(am|pm)', time_period.lower())
-                    if time_match:
-                        hour = int(time_match.group(1))
-                        minute = int(time_match.group(2)) if time_match.group(2) else 0
-                        am_pm = time_match.group(3)
-
-                        # Convert to 24-hour format
-                        if am_pm == "pm" and hour < 12:
-                            hour += 12
-                        elif am_pm == "am" and hour == 12:
-                            hour = 0
-
-                        booking_hour = hour
-                        booking_minute = minute
-                        print(f"Extracted time: {hour}:{minute} {am_pm}")
-
-                    # Extract duration (e.g., "2 hours", "3 hrs")
-                    duration_match = re.search(r'(\d+)\s*(?:hour|hr|hrs?)', time_period.lower())
-                    if duration_match:
-                        duration_hours = int(duration_match.group(1))
-                        print(f"Extracted duration: {duration_hours} hours")
-
-                    # Create datetime object
-                    booking_datetime = datetime.datetime(
-                        booking_date.year, booking_date.month, booking_date.day,
-                        booking_hour, booking_minute
-                    )
-
-                    # Calculate end time
-                    end_datetime = booking_datetime + datetime.timedelta(hours=duration_hours)
+                    try:
+                        booking_datetime, end_datetime = resolve_time_period(time_period, datetime.now())
+                    except InvalidDateError as e:
+                        return self._ask_date_again(e)
 
                     # Format for API
                     start_time = booking_datetime.isoformat()
                     end_time = end_datetime.isoformat()
                     params["start_time"] = start_time
                     params["end_time"] = end_time
-                    params["duration"] = duration_hours
+                    params["duration"] = duration_hours(booking_datetime, end_datetime)
 
-                    print(f"Adding start_time: {start_time}, end_time: {end_time}, duration: {duration_hours}")
+                    print(f"Adding start_time: {start_time}, end_time: {end_time}, duration: {params['duration']}")
 
                     # Check for conflicting bookings
-                    from ..database.models import Booking, BookingStatus
-                    conflicting_bookings = self.db.query(Booking).filter(
-                        Booking.parking_slot_id == self.pending_booking["slot_id"],
-                        Booking.status == BookingStatus.CONFIRMED,
-                        Booking.start_time < end_datetime,
-                        Booking.end_time > booking_datetime
-                    ).all()
+                    conflicting_bookings = crud.get_conflicting_bookings(self.db, self.pending_booking["slot_id"], booking_datetime, end_datetime)
 
                     if conflicting_bookings:
                         return f"""
@@ -466,12 +500,7 @@ Thank you for using our parking service!
             filtered_slots = []
             for slot in slots:
                 # Check for conflicting bookings
-                conflicting_bookings = self.db.query(Booking).filter(
-                    Booking.parking_slot_id == slot.id,
-                    Booking.status == BookingStatus.CONFIRMED,
-                    Booking.start_time < end_time,
-                    Booking.end_time > start_time
-                ).all()
+                conflicting_bookings = crud.get_conflicting_bookings(self.db, slot.id, start_time, end_time)
 
                 # Only include slots without conflicts
                 if not conflicting_bookings:
@@ -527,15 +556,14 @@ Thank you for using our parking service!
     def get_user_bookings(self):
         """Tool to get the user's bookings directly from the database."""
         try:
-            # Query the database directly
-            from ..database.models import Booking, ParkingSlot, Mall, Vehicle
+            # Query the booking read model directly (mall, slot and vehicle details are already joined in)
+            from ..database.models import BookingView, BookingStatus
 
             # Get only confirmed bookings for this user
-            from ..database.models import BookingStatus
-            bookings = self.db.query(Booking).filter(
-                Booking.user_id == self.user_id,
-                Booking.status == BookingStatus.CONFIRMED
-            ).all()
+            bookings = self.db.query(BookingView).filter(
+                BookingView.user_id == self.user_id,
+                BookingView.status == BookingStatus.CONFIRMED
+            ).order_by(BookingView.booking_id).all()
             print(f"Found {len(bookings)} confirmed bookings for user {self.user_id} directly from database")
 
             if not bookings:
@@ -549,21 +577,16 @@ Thank you for using our parking service!
             # Format bookings for display
             formatted_bookings = []
             for booking in bookings:
-                # Get related data
-                slot = self.db.query(ParkingSlot).filter(ParkingSlot.id == booking.parking_slot_id).first()
-                mall = self.db.query(Mall).filter(Mall.id == slot.mall_id).first() if slot else None
-                vehicle = self.db.query(Vehicle).filter(Vehicle.id == booking.vehicle_id).first()
-
                 # Format dates
                 start_time = booking.start_time.strftime('%d/%m/%Y, %I:%M %p') if booking.start_time else "Not specified"
                 end_time = booking.end_time.strftime('%d/%m/%Y, %I:%M %p') if booking.end_time else "Not specified"
 
                 formatted_bookings.append({
-                    "id": booking.id,
-                    "mall_name": mall.name if mall else "Unknown Mall",
-                    "slot_number": slot.slot_number if slot else "Unknown",
-                    "vehicle_type": vehicle.vehicle_type.value if vehicle else "Unknown",
-                    "vehicle_number": vehicle.license_plate if vehicle else "No plate",
+                    "id": booking.booking_id,
+                    "mall_name": booking.mall_name or "Unknown Mall",
+                    "slot_number": booking.slot_number or "Unknown",
+                    "vehicle_type": booking.vehicle_type.value if booking.vehicle_type else "Unknown",
+                    "vehicle_number": booking.license_plate or "No plate",
                     "start_time": start_time,
                     "end_time": end_time,
                     "total_amount": booking.total_amount,
@@ -815,121 +838,67 @@ Please try again later or contact customer support if the problem persists.
 
     def _update_conversation_context(self, query: str):
         """Update the conversation context based on the user's query."""
-        query_lower = query.lower()
-
         # Get the latest context from the store
         stored_context = self.store.get_conversation_context(self.user_id)
         if stored_context:
             self.conversation_context = stored_context
             print(f"Retrieved updated context from store: {self.conversation_context}")
 
-        # Check for mall mentions
-        from ..database.models import Mall
-        malls = self.db.query(Mall).all()
-
-        # First check for mall IDs (e.g., "mall 1" or "mall ID 1")
-        if "mall" in query_lower and any(char.isdigit() for char in query_lower):
-            # Extract digits from the query
-            import re
-            mall_id_matches = re.findall(r'mall\s+(?:id\s+)?(\d+)', query_lower)
-            if mall_id_matches:
-                try:
-                    mall_id = int(mall_id_matches[0])
-                    mall = self.db.query(Mall).filter(Mall.id == mall_id).first()
-                    if mall:
-                        self.conversation_context["selected_mall"] = mall.name
-                        self.conversation_context["selected_mall_id"] = mall.id
-                        print(f"Detected mall by ID: {mall.name} (ID: {mall.id})")
-                except (ValueError, IndexError):
-                    pass
-
-        # If no mall ID was found, check for mall names
-        mall_found = False
-        for mall in malls:
-            mall_name_lower = mall.name.lower()
-            if mall_name_lower in query_lower:
-                self.conversation_context["selected_mall"] = mall.name
-                self.conversation_context["selected_mall_id"] = mall.id
-                print(f"Detected mall by name: {mall.name}")
-                mall_found = True
-                break
-
-        # Check for specific mall names that might not be in the database
-        if not mall_found:
-            mall_keywords = {
-                "phoenix": "Phoenix Mall",
-                "palladium": "Palladium Mall",
-                "orion": "Orion Mall",
-                "forum": "Forum Mall",
-                "market city": "Phoenix Market City",
-                "mall of asia": "Phoenix Mall of Asia"
-            }
+        # Scan the query once for every known entity
+        entities = get_gazetteer(self.db).extract(query)
+
+        # Mall ID mentions (e.g., "mall 1" or "mall ID 1")
+        if entities["mall_by_id"]:
+            mall_id, mall_name = entities["mall_by_id"]
+            self.conversation_context["selected_mall"] = mall_name
+            self.conversation_context["selected_mall_id"] = mall_id
+            print(f"Detected mall by ID: {mall_name} (ID: {mall_id})")
+
+        # Mall names take precedence over IDs
+        if entities["mall_by_name"]:
+            mall_id, mall_name = entities["mall_by_name"]
+            self.conversation_context["selected_mall"] = mall_name
+            self.conversation_context["selected_mall_id"] = mall_id
+            print(f"Detected mall by name: {mall_name}")
+        # Otherwise fall back to well-known mall aliases
+        elif entities.get("mall_by_alias") and not self.conversation_context["selected_mall"]:
+            mall_id, mall_name = entities["mall_by_alias"]
+            self.conversation_context["selected_mall"] = mall_name
+            self.conversation_context["selected_mall_id"] = mall_id
+            print(f"Detected mall by alias: {mall_name}")
+        # Finally try a typo-tolerant match, e.g. "phonix marketcity"
+        elif entities["mall_by_fuzzy"] and not entities["mall_by_id"]:
+            mall_id, mall_name = entities["mall_by_fuzzy"]
+            self.conversation_context["selected_mall"] = mall_name
+            self.conversation_context["selected_mall_id"] = mall_id
+            print(f"Detected mall by fuzzy match: {mall_name}")
+
+        if entities["vehicle_type"]:
+            self.conversation_context["selected_vehicle_type"] = entities["vehicle_type"]
+            print(f"Detected vehicle type: {entities['vehicle_type']}")
+
+        # Time phrases like "tomorrow at 3 pm for 2 hours"; parts given in separate
+        # messages ("tomorrow", then "at 3 pm") are combined
+        time_phrase = find_time_phrase(query) or entities["time_period"]
+        if time_phrase:
+            self.conversation_context["selected_time_period"] = combine_time_phrases(
+                self.conversation_context["selected_time_period"], time_phrase
+            )
+            print(f"Detected time period: {self.conversation_context['selected_time_period']}")
 
-            for keyword, _ in mall_keywords.items():
-                if keyword in query_lower and not self.conversation_context["selected_mall"]:
-                    # Find the closest matching mall in the database
-                    closest_mall = None
-                    for mall in malls:
-                        if keyword in mall.name.lower():
-                            closest_mall = mall
-                            break
-
-                    if closest_mall:
-                        self.conversation_context["selected_mall"] = closest_mall.name
-                        self.conversation_context["selected_mall_id"] = closest_mall.id
-                        print(f"Detected mall by keyword '{keyword}': {closest_mall.name}")
-                    break
-
-        # Check for vehicle type mentions
-        vehicle_types = ["car", "truck", "bike"]
-        for vehicle_type in vehicle_types:
-            if vehicle_type in query_lower:
-                self.conversation_context["selected_vehicle_type"] = vehicle_type
-                print(f"Detected vehicle type: {vehicle_type}")
-                break
-
-        # Check for time period mentions
-        time_patterns = [
-            "today", "tomorrow", "next week",
-            "morning", "afternoon", "evening", "night",
-            "am", "pm", "hours", "hour", "hr", "hrs"
-        ]
-        for pattern in time_patterns:
-            if pattern in query_lower:
-                # Extract the full time-related phrase
-                words = query_lower.split()
-                for i, word in enumerate(words):
-                    if pattern in word and i > 0:
-                        # Try to capture phrases like "3 pm" or "2 hours"
-                        time_phrase = f"{words[i-1]} {word}"
-                        self.conversation_context["selected_time_period"] = time_phrase
-                        print(f"Detected time period: {time_phrase}")
-                        break
-
-        # Detect license plate (common formats like KA01AB1234, MH02CD5678)
-        import re
-        license_plate_pattern = r'\b[A-Z]{2}\d{2}[A-Z]{1,2}\d{1,4}\b'
-        license_plate_matches = re.findall(license_plate_pattern, query)
-        if license_plate_matches and not self.conversation_context["selected_license_plate"]:
-            self.conversation_context["selected_license_plate"] = license_plate_matches[0]
-            print(f"Detected license plate: {license_plate_matches[0]}")
+        # License plates (common formats like KA01AB1234, MH02CD5678)
+        if entities["license_plate"] and not self.conversation_context["selected_license_plate"]:
+            self.conversation_context["selected_license_plate"] = entities["license_plate"]
+            print(f"Detected license plate: {entities['license_plate']}")
 
         # Track query type and intent
-        if "available" in query_lower or "find" in query_lower or "looking for" in query_lower or "show slots" in query_lower:
-            self.conversation_context["last_query_type"] = "availability"
-            self.conversation_context["intent"] = "check_available_slots"
-        elif "book" in query_lower or "reserve" in query_lower:
-            self.conversation_context["last_query_type"] = "booking"
-            self.conversation_context["intent"] = "create_booking"
-        elif "cancel" in query_lower:
-            self.conversation_context["last_query_type"] = "cancellation"
-            self.conversation_context["intent"] = "cancel_booking"
-        elif "rate" in query_lower or "price" in query_lower or "cost" in query_lower or "fee" in query_lower or "charge" in query_lower:
-            self.conversation_context["last_query_type"] = "pricing"
-            self.conversation_context["intent"] = "check_parking_rates"
+        if entities["intent"]:
+            last_query_type, intent = entities["intent"]
+            self.conversation_context["last_query_type"] = last_query_type
+            self.conversation_context["intent"] = intent
 
             # If this is a pricing query, fetch the rates using our tool
-            if self.conversation_context["selected_mall_id"]:
+            if intent == "check_parking_rates" and self.conversation_context["selected_mall_id"]:
                 try:
                     # Get rates for the selected mall
                     rates_result = self.get_parking_rates(self.conversation_context["selected_mall_id"])
@@ -941,9 +910,6 @@ Please try again later or contact customer support if the problem persists.
                                 break
                 except Exception as e:
                     print(f"Error fetching parking rates: {str(e)}")
-        elif "my booking" in query_lower or "view booking" in query_lower or "show booking" in query_lower or "show my booking" in query_lower or "check booking" in query_lower or "check my booking" in query_lower or "show bookings" in query_lower:
-            self.conversation_context["last_query_type"] = "view_bookings"
-            self.conversation_context["intent"] = "check_user_bookings"
 
         # Check if we have a pending slot ID and the user is providing missing information
         if self.conversation_context.get("pending_slot_id"):
@@ -956,6 +922,12 @@ Please try again later or contact customer support if the problem persists.
         self.store.set_conversation_context(self.user_id, self.conversation_context)
         print(f"Saved updated context to store: {self.conversation_context}")
 
+    def _ask_date_again(self, error: InvalidDateError) -> str:
+        """Forget a booking time whose date doesn't exist and ask the user for it again."""
+        self.conversation_context["selected_time_period"] = None
+        self.store.set_conversation_context(self.user_id, self.conversation_context)
+        return f"Sorry, {error}. Please tell me which day you want to park (e.g., 'tomorrow at 5 pm', '25/12 at 3 pm')."
+
     def _create_booking_from_context(self):
         """Create a booking based on the conversation context."""
         try:
@@ -970,57 +942,13 @@ Please try again later or contact customer support if the problem persists.
             if not self.conversation_context["selected_time_period"]:
                 return "Please specify when you want to park (e.g., 'tomorrow at 5 pm', 'today at 3 pm')."
 
-            # Parse the time period to create proper datetime objects
-            from datetime import datetime, timedelta
-            import re
-
-            # Get current date
-            now = datetime.now()
-
-            # Default values
-            booking_date = now.date()
-            booking_hour = 17  # Default to 5 PM
-            booking_minute = 0
-            duration_hours = 2  # Default duration
-
-            # Parse the time period
+            # Resolve the time phrase (e.g. "friday 3-5 pm") to start and end times
             time_period = self.conversation_context["selected_time_period"]
             print(f"Processing time period: {time_period}")
-
-            # Check for "tomorrow"
-            if "tomorrow" in time_period.lower():
-                booking_date = (now + timedelta(days=1)).date()
-                print(f"Setting date to tomorrow: {booking_date}")
-
-            # Extract time (e.g., "5 pm", "3:30 pm")
-            time_match = re.search(r'(\d+)(?::(\d+))?\s*(am|pm)', time_period.lower())
-            if time_match:
-                hour = int(time_match.group(1))
-                minute = int(time_match.group(2)) if time_match.group(2) else 0
-                am_pm = time_match.group(3)
-
-                # Convert to 24-hour format
-                if am_pm == "pm" and hour < 12:
-                    hour += 12
-                elif am_pm == "am" and hour == 12:
-                    hour = 0
-
-                booking_hour = hour
-                booking_minute = minute
-                print(f"Extracted time: {hour}:{minute} {am_pm}")
-
-            # Extract duration (e.g., "2 hours", "3 hrs")
-            duration_match = re.search(r'(\d+)\s*(?:hour|hr|hrs?)', time_period.lower())
-            if duration_match:
-                duration_hours = int(duration_match.group(1))
-                print(f"Extracted duration: {duration_hours} hours")
-
-            # Create datetime objects
-            start_time = datetime(
-                booking_date.year, booking_date.month, booking_date.day,
-                booking_hour, booking_minute
-            )
-            end_time = start_time + timedelta(hours=duration_hours)
+            try:
+                start_time, end_time = resolve_time_period(time_period, datetime.now())
+            except InvalidDateError as e:
+                return self._ask_date_again(e)
 
             print(f"Calculated booking time: {start_time} to {end_time}")
 
@@ -1040,12 +968,7 @@ Please try again later or contact customer support if the problem persists.
                     return f"Sorry, the slot you were interested in is no longer available. Let me find another one for you."
 
                 # Check for conflicting bookings
-                conflicting_bookings = self.db.query(Booking).filter(
-                    Booking.parking_slot_id == slot.id,
-                    Booking.status == BookingStatus.CONFIRMED,
-                    Booking.start_time < end_time,
-                    Booking.end_time > start_time
-                ).all()
+                conflicting_bookings = crud.get_conflicting_bookings(self.db, slot.id, start_time, end_time)
 
                 if conflicting_bookings:
                     # Clear the pending slot ID as it's not available for this time
@@ -1081,12 +1004,7 @@ Please try again later or contact customer support if the problem persists.
                 available_slots = []
                 for slot in slots:
                     # Check for conflicting bookings
-                    conflicting_bookings = self.db.query(Booking).filter(
-                        Booking.parking_slot_id == slot.id,
-                        Booking.status == BookingStatus.CONFIRMED,
-                        Booking.start_time < end_time,
-                        Booking.end_time > start_time
-                    ).all()
+                    conflicting_bookings = crud.get_conflicting_bookings(self.db, slot.id, start_time, end_time)
 
                     # If no conflicts, the slot is available
                     if not conflicting_bookings:
@@ -1111,6 +1029,8 @@ Please try again later or contact customer support if the problem persists.
                 "hourly_rate": slot.hourly_rate,
                 "license_plate": self.conversation_context["selected_license_plate"]
             }
+            # Persist it so the user's "Yes" (handled by a later request) finds it
+            self.store.set_pending_booking(self.user_id, self.pending_booking)
 
             # Return confirmation message
             license_plate_info = f"* License Plate: {self.pending_booking['license_plate']}" if self.pending_booking['license_plate'] else "* License Plate: Not provided (a demo plate will be used)"
@@ -1140,342 +1060,318 @@ Please respond with "Yes" or "No".
 
     def process_query(self, query: str, conversation_id: Optional[str] = None) -> str:
         """Process a user query and return the agent's response."""
+        timer = StageTimer()
         try:
-            # Update conversation context based on query
-            self._update_conversation_context(query)
-
-            # Check for specific commands first
-            if query.lower().startswith("book slot "):
-                return self._handle_booking_command(query)
-            elif query.lower().startswith("cancel booking "):
-                return self._handle_booking_cancellation(query)
-            elif query.lower() in ["check my bookings", "show my bookings", "view my bookings", "my bookings", "check bookings"]:
-                return self._check_user_bookings()
-            elif query.lower() in ["check parking rates", "show rates", "parking rates", "what are the rates", "how much does it cost"]:
-                return self._check_parking_rates()
-            elif query.lower() in ["check available slots", "show available slots", "available slots", "find slots", "find parking"]:
-                return self._check_available_slots()
-            elif query.lower() in ["yes", "confirm", "yes, please", "yes, book it"]:
-                # Debug logging
-                print(f"Processing confirmation. Pending booking: {self.pending_booking}")
-                print(f"Conversation context: {self.conversation_context}")
-
-                # If there's a pending booking, confirm it
-                if self.pending_booking:
-                    print(f"Confirming pending booking: {self.pending_booking}")
-                    return self._handle_booking_confirmation()
-                # If there's no pending booking but we have context, create one
-                elif self.conversation_context["selected_mall_id"] and self.conversation_context["selected_vehicle_type"]:
-                    print(f"Creating booking from context: Mall ID: {self.conversation_context['selected_mall_id']}, Vehicle: {self.conversation_context['selected_vehicle_type']}")
-                    return self._create_booking_from_context()
-                # Otherwise, we don't have enough information
-                else:
-                    print("Not enough information for booking")
-                    return "I'm not sure what you're confirming. Please provide more details about which mall and vehicle type you're interested in."
-
-            # If no specific command matched, check the detected intent
-            elif self.conversation_context.get("intent"):
-                intent = self.conversation_context["intent"]
-                print(f"Using detected intent: {intent}")
-
-                if intent == "check_available_slots":
-                    return self._check_available_slots()
-                elif intent == "check_parking_rates":
-                    return self._check_parking_rates()
-                elif intent == "check_user_bookings":
-                    return self._check_user_bookings()
-                elif intent == "create_booking" and self.conversation_context["selected_mall_id"] and self.conversation_context["selected_vehicle_type"]:
-                    return self._create_booking_from_context()
-                # For cancel_booking intent, we need a specific booking ID, so we don't handle it here
-
-            # Set conversation ID if provided
-            if conversation_id:
-                self.conversation_id = conversation_id
-            elif not hasattr(self, 'conversation_id'):
-                # Create a new conversation ID if none exists
-                self.conversation_id = str(uuid.uuid4())
-                print(f"Created new conversation ID: {self.conversation_id}")
+            # Handle commands and detected intents without calling the LLM
+            direct_response = self._route_query(query)
+            timer.mark("route")
+            if direct_response is not None:
+                self._record_timings(timer, "direct")
+                return direct_response
+
+            # Repeated FAQ-style questions are answered from the response cache
+            response_key, cached_response = self._cached_response(query, conversation_id)
+            timer.mark("cache_lookup")
+            if cached_response is not None:
+                self._save_interaction(query, cached_response)
+                timer.mark("save")
+                self._record_timings(timer, "cached")
+                return cached_response
+
+            messages = self._build_messages(query, conversation_id, timer, shared=response_key is not None)
 
-            # Get relevant history
-            relevant_history = []
-            try:
-                if conversation_id:
-                    # First try to get history for this specific conversation
-                    if self.use_vector_store:
-                        conversation_history = self.vector_store.get_conversation_history(conversation_id)
-                    else:
-                        conversation_history = self.file_chat.get_conversation_history(conversation_id)
-
-                    if conversation_history:
-                        relevant_history = [
-                            f"User: {entry['user_query']}\nAgent: {entry['agent_response']}"
-                            for entry in conversation_history
-                        ]
-                        print(f"Found {len(relevant_history)} messages in conversation history")
-
-                # If no conversation history or it's empty, try semantic search or file-based history
-                if not relevant_history:
-                    if self.use_vector_store:
-                        relevant_history_entries = self.vector_store.get_relevant_history(query, k=5)
-                    else:
-                        relevant_history_entries = self.file_chat.get_relevant_history(query, k=5)
-
-                    relevant_history = [
-                        f"User: {entry['user_query']}\nAgent: {entry['agent_response']}"
-                        for entry in relevant_history_entries
-                    ]
-                    print(f"Found {len(relevant_history)} relevant messages from history search")
-
-                # Fallback to traditional memory manager if needed
-                if not relevant_history:
-                    relevant_history = self.memory_manager.get_relevant_history(query, k=5)
-                    print(f"Using memory manager history with {len(relevant_history)} messages")
-            except Exception as history_error:
-                print(f"Error retrieving history: {str(history_error)}")
-                # Continue without history if there's an error
-
-            # Fetch actual mall names from the database
-            from ..database.models import Mall
-            malls = self.db.query(Mall).all()
-            mall_names = [f"* {mall.name} (ID: {mall.id})" for mall in malls]
-            mall_list = "\n".join(mall_names)
-
-            # Create system message
-            system_message = f"""
-            You are a helpful parking management assistant for a mall parking system. You can help users with:
-
-            1. Finding available parking slots
-            2. Checking parking rates
-            3. Creating parking bookings
-            4. Cancelling bookings
-            5. Viewing booking history
-
-            CRITICAL FORMATTING INSTRUCTIONS (YOU MUST FOLLOW THESE EXACTLY):
-            - NEVER respond with long paragraphs
-            - ALWAYS use simple asterisk (*) for bullet points like this:
-              * First point
-              * Second point
-            - DO NOT use Unicode bullet points (•) as they may not display correctly
-            - ALWAYS put each piece of information on a separate line
-            - ALWAYS use numbered lists (1., 2., 3.) for sequential instructions
-            - ALWAYS break your response into short, digestible sections
-            - ALWAYS use line breaks between different sections of information
-            - NEVER combine multiple points into a single paragraph
-            - Format mall lists and options as bullet points, not as running text
-
-            CRITICAL CONVERSATION INSTRUCTIONS:
-            - NEVER ask for information that the user has already provided
-            - If the user has already mentioned a mall name, DO NOT ask them to select a mall again
-            - If the user has already mentioned a vehicle type, DO NOT ask them to select a vehicle type again
-            - ALWAYS remember information from earlier in the conversation
-            - NEVER repeat questions that have already been answered
-            - If the user says "Phoenix Mall of Asia" or any other mall name, remember it and use it
-            - If the user says "car", "bike", or "truck", remember it and use it
-
-            When the user asks about parking availability, make sure to ask for ONLY the information they haven't provided yet:
-            * Which mall they're interested in (if not already mentioned)
-            * What type of vehicle they have (if not already mentioned)
-            * The time period they're interested in (if not already mentioned)
-
-            When creating a booking, ensure you have all the necessary information:
-            * Mall location (if not already mentioned)
-            * Vehicle type (if not already mentioned)
-            * Preferred parking slot ID (if any)
-
-            Our system has the following malls, each with parking slots:
-            {mall_list}
-
-            Each mall has:
-            * 3 slots for trucks (₹100/hour)
-            * 3 slots for cars (₹50/hour)
-            * 4 slots for bikes (₹20/hour)
-            """
-
-            # Fetch available slots for reference
-            from ..database.models import ParkingSlot, VehicleType
-
-            # Get all available slots
-            available_slots = self.db.query(ParkingSlot).filter(ParkingSlot.is_available == True).all()
-            available_slot_info = []
-
-            # Get slots for the selected mall and vehicle type if specified
-            mall_specific_slots = []
-            if self.conversation_context["selected_mall_id"] and self.conversation_context["selected_vehicle_type"]:
-                print(f"Filtering slots for mall ID: {self.conversation_context['selected_mall_id']} and vehicle type: {self.conversation_context['selected_vehicle_type']}")
+            # Call Groq API
+            response = self._call_groq_api(messages)
+            timer.mark("llm")
+            # Answers built from live availability or bookings the model looked up aren't cached
+            if response_key is not None and not LIVE_DATA_TOOLS.intersection(self.last_tool_calls):
+                LLMResponseCache().put(response_key, response)
 
-                # Convert string vehicle type to enum
-                vehicle_type_enum = None
-                if self.conversation_context["selected_vehicle_type"] == "car":
-                    vehicle_type_enum = VehicleType.CAR
-                elif self.conversation_context["selected_vehicle_type"] == "bike":
-                    vehicle_type_enum = VehicleType.BIKE
-                elif self.conversation_context["selected_vehicle_type"] == "truck":
-                    vehicle_type_enum = VehicleType.TRUCK
+            self._save_interaction(query, response)
+            timer.mark("save")
+            self._record_timings(timer, "llm")
 
-                if vehicle_type_enum:
-                    # Get all slots for this mall and vehicle type
-                    mall_specific_slots = self.db.query(ParkingSlot).filter(
-                        ParkingSlot.mall_id == self.conversation_context["selected_mall_id"],
-                        ParkingSlot.vehicle_type == vehicle_type_enum,
-                        ParkingSlot.is_available == True
-                    ).all()
+            return response
 
-                    print(f"Found {len(mall_specific_slots)} available slots at mall ID {self.conversation_context['selected_mall_id']} for {self.conversation_context['selected_vehicle_type']}")
+        except LLMOverloaded:
+            # Let the API answer 503 instead of an apology
+            raise
+        except Exception as e:
+            error_message = f"I encountered an error while processing your request: {str(e)}"
+            print(f"Error in process_query: {str(e)}")
+            return error_message
 
-            # Add mall-specific slots first
-            for slot in mall_specific_slots:
-                mall = self.db.query(Mall).filter(Mall.id == slot.mall_id).first()
-                if mall:
-                    available_slot_info.append(
-                        f"* Slot ID: {slot.id}, Mall: {mall.name}, Type: {slot.vehicle_type.value}, "
-                        f"Number: {slot.slot_number}, Rate: ₹{slot.hourly_rate}/hour"
-                    )
+    def process_query_stream(self, query: str, conversation_id: Optional[str] = None):
+        """Process a user query, yielding the agent's response in chunks as it is generated.
 
-            # Then add other available slots (limited to 20 total)
-            remaining_slots = 20 - len(mall_specific_slots)
-            for slot in available_slots[:remaining_slots]:
-                # Skip slots already included in mall-specific slots
-                if slot in mall_specific_slots:
-                    continue
+        Commands handled without the LLM are yielded as a single chunk. LLM
+        responses are streamed token by token and saved to chat history once
+        the full response has been received.
+        """
+        timer = StageTimer()
+        try:
+            direct_response = self._route_query(query)
+            timer.mark("route")
+            if direct_response is not None:
+                self._record_timings(timer, "direct")
+                yield direct_response
+                return
+
+            response_key, cached_response = self._cached_response(query, conversation_id)
+            timer.mark("cache_lookup")
+            if cached_response is not None:
+                self._record_timings(timer, "cached")
+                yield cached_response
+                self._save_interaction(query, cached_response)
+                return
+
+            messages = self._build_messages(query, conversation_id, timer, shared=response_key is not None)
+
+            tokens = []
+            for token in self._stream_groq_api(messages):
+                tokens.append(token)
+                yield token
+            timer.mark("llm")
+
+            response = "".join(tokens)
+            if response_key is not None and not LIVE_DATA_TOOLS.intersection(self.last_tool_calls):
+                LLMResponseCache().put(response_key, response)
+            self._save_interaction(query, response)
+            timer.mark("save")
+            self._record_timings(timer, "llm")
+
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            print(f"Error in process_query_stream: {str(e)}")
+            yield f"I encountered an error while processing your request: {str(e)}"
+
+    def _cached_response(self, query: str, conversation_id: Optional[str] = None):
+        """Look up a cached LLM answer to the query.
+
+        Returns (cache key, cached response or None). The key is None when the
+        request depends on live availability, the user's bookings or earlier
+        turns of the conversation and must not use the cache. Otherwise the
+        answer is shared between users, so its prompt must be built with
+        shared=True.
+        """
+        if conversation_id:
+            self.conversation_id = conversation_id
+
+        cache = LLMResponseCache()
+        if bypass_reason(self.conversation_context, self.pending_booking, self._has_prior_turns()):
+            cache.record_bypass()
+            return None, None
+
+        # Answers are only valid for the catalog and rate card they were built from
+        prompt_builder = PromptBuilder()
+        data_version = (prompt_builder.catalog_version, prompt_builder.availability_version, self.model_name, self.use_tools)
+        key = cache_key(query, self.conversation_context, data_version)
+        return key, cache.get(key)
+
+    def _has_prior_turns(self) -> bool:
+        """Check whether the current conversation already has saved turns."""
+        conversation_id = getattr(self, "conversation_id", None)
+        if not conversation_id:
+            return False
+        if self.use_vector_store:
+            try:
+                return bool(self.vector_store.get_conversation_history(conversation_id))
+            except Exception as e:
+                print(f"Error checking conversation history: {str(e)}")
+                return True
+        return self.file_chat.has_interactions(conversation_id)
+
+    def _route_query(self, query: str) -> Optional[str]:
+        """Handle commands and detected intents that don't need the LLM.
+
+        Returns the response, or None if the query should go to the LLM.
+        """
+        # Update conversation context based on query
+        self._update_conversation_context(query)
+
+        # Check for specific commands first
+        if query.lower().startswith("book slot "):
+            return self._handle_booking_command(query)
+        elif query.lower().startswith("cancel booking "):
+            return self._handle_booking_cancellation(query)
+        elif query.lower() in ["check my bookings", "show my bookings", "view my bookings", "my bookings", "check bookings"]:
+            return self._check_user_bookings()
+        elif query.lower() in ["check parking rates", "show rates", "parking rates", "what are the rates", "how much does it cost"]:
+            return self._check_parking_rates()
+        elif query.lower() in ["check available slots", "show available slots", "available slots", "find slots", "find parking"]:
+            return self._check_available_slots()
+        elif query.lower() in ["yes", "confirm", "yes, please", "yes, book it"]:
+            # Debug logging
+            print(f"Processing confirmation. Pending booking: {self.pending_booking}")
+            print(f"Conversation context: {self.conversation_context}")
+
+            # If there's a pending booking, confirm it
+            if self.pending_booking:
+                print(f"Confirming pending booking: {self.pending_booking}")
+                return self._handle_booking_confirmation()
+            # If there's no pending booking but we have context, create one
+            elif self.conversation_context["selected_mall_id"] and self.conversation_context["selected_vehicle_type"]:
+                print(f"Creating booking from context: Mall ID: {self.conversation_context['selected_mall_id']}, Vehicle: {self.conversation_context['selected_vehicle_type']}")
+                return self._create_booking_from_context()
+            # Otherwise, we don't have enough information
+            else:
+                print("Not enough information for booking")
+                return "I'm not sure what you're confirming. Please provide more details about which mall and vehicle type you're interested in."
+
+        # Route requests the local classifier is confident about, however they are phrased
+        # (imported here so NumPy only loads once a query needs it)
+        from .intent_classifier import default_threshold, get_intent_classifier
+        classifier = get_intent_classifier()
+        intent, confidence = classifier.predict(query)
+        handler = self._intent_handler(intent) if confidence >= default_threshold() else None
+        keyword_handler = self._intent_handler(self.conversation_context.get("intent"))
+        classifier.record(intent, confidence, routed=handler is not None, llm_call_avoided=keyword_handler is None)
+        if handler:
+            print(f"Using classified intent: {intent} ({confidence:.2f})")
+            self.conversation_context["intent"] = intent
+            self.store.set_conversation_context(self.user_id, self.conversation_context)
+            return handler()
+
+        # If no specific command matched, check the detected intent
+        if keyword_handler:
+            print(f"Using detected intent: {self.conversation_context['intent']}")
+            return keyword_handler()
+
+        return None
+
+    def _intent_handler(self, intent: Optional[str]):
+        """Get the direct handler for an intent, or None if the LLM has to answer."""
+        if intent == "check_available_slots":
+            return self._check_available_slots
+        elif intent == "check_parking_rates":
+            return self._check_parking_rates
+        elif intent == "check_user_bookings":
+            return self._check_user_bookings
+        elif intent == "create_booking" and self.conversation_context["selected_mall_id"] and self.conversation_context["selected_vehicle_type"]:
+            return self._create_booking_from_context
+        # For cancel_booking intent, we need a specific booking ID, so we don't handle it here
+        return None
+
+    def _record_timings(self, timer: StageTimer, path: str):
+        """Log a request's stage times and add them to the process-wide totals."""
+        print(f"Stage timings ({path}, ms): {timer.summary()}")
+        StageTimings().record(timer, path)
+
+    def _load_history(self, query: str, conversation_id: Optional[str] = None):
+        """Get the history to send with a query: (summary of older turns or None, recent turns oldest first)."""
+        # Get relevant history as turns (oldest first), plus a summary of older turns that don't fit
+        history_summary = None
+        history_turns = []
+        try:
+            if conversation_id:
+                # First try to get history for this specific conversation
+                if self.use_vector_store:
+                    conversation_history = self.vector_store.get_conversation_history(conversation_id)
+                else:
+                    conversation_history = self.file_chat.get_conversation_history(conversation_id)
 
-                mall = self.db.query(Mall).filter(Mall.id == slot.mall_id).first()
-                if mall:
-                    available_slot_info.append(
-                        f"* Slot ID: {slot.id}, Mall: {mall.name}, Type: {slot.vehicle_type.value}, "
-                        f"Number: {slot.slot_number}, Rate: ₹{slot.hourly_rate}/hour"
-                    )
+                if conversation_history:
+                    history_summary, history_turns = self.history_window.build(conversation_id, conversation_history)
+                    print(f"Found {len(conversation_history)} messages in conversation history, sending {len(history_turns)}")
 
-            # Format available slots text with better organization
-            if not available_slot_info:
-                available_slots_text = "No slots available currently."
-            else:
-                # Group slots by mall for better readability
-                mall_slots = {}
-                for slot_info in available_slot_info:
-                    mall_name = slot_info.split("Mall: ")[1].split(",")[0]
-                    if mall_name not in mall_slots:
-                        mall_slots[mall_name] = []
-                    mall_slots[mall_name].append(slot_info)
-
-                # Format the text with mall grouping
-                available_slots_text = ""
-                for mall_name, slots in mall_slots.items():
-                    available_slots_text += f"\nSlots at {mall_name}:\n"
-                    available_slots_text += "\n".join(slots)
-                    available_slots_text += "\n"
-
-            # Update conversation context based on query
-            self._update_conversation_context(query)
-
-            # Add user ID, name, and conversation context to system message
-            user_context = f"""
-            IMPORTANT USER INFORMATION:
-            * Current User ID: {self.user_id}
-            * User Name: {self.user_name or "User"}
-            * Always use this User ID for all operations
-            * Always address the user by their name when asking for information
-            * Do NOT ask the user for their User ID again
-
-            CURRENT CONVERSATION CONTEXT:
-            * Selected Mall: {self.conversation_context['selected_mall'] or 'Not specified'}
-            * Selected Vehicle Type: {self.conversation_context['selected_vehicle_type'] or 'Not specified'}
-            * Selected License Plate: {self.conversation_context['selected_license_plate'] or 'Not specified'}
-            * Selected Time Period: {self.conversation_context['selected_time_period'] or 'Not specified'}
-
-            PARKING RATES (if available):
-            {self._format_parking_rates()}
-
-            IMPORTANT: If the user has already provided information about their mall or vehicle type,
-            DO NOT ask for it again. Use the information they've already provided.
-
-            BOOKING INSTRUCTIONS:
-            When a user wants to book a parking slot, you should:
-            1. If they haven't specified a mall, ask which mall they prefer
-            2. If they haven't specified a vehicle type, ask what type of vehicle they have
-            3. If they haven't specified a vehicle license plate, ask for their license plate number
-            4. If they haven't specified a date/time, ask when they want to park
-            5. If they haven't specified a duration, assume 2 hours
-            6. Show them available slots matching their criteria
-            7. To book a slot, tell them to use the following format: "Book slot [SLOT_ID]"
-               For example: "Book slot 5"
-            8. If the user says "yes" or "confirm" after you've shown them available slots,
-               I will automatically find and book an appropriate slot for them
-
-            CHECKING BOOKINGS:
-            When a user wants to check their bookings, tell them to use one of these commands:
-            * "Check my bookings"
-            * "Show my bookings"
-            * "View my bookings"
-            * "My bookings"
-
-            REQUIRED INFORMATION FOR BOOKING:
-            * Mall name (one of the malls listed above)
-            * Vehicle type (car, bike, or truck)
-            * Vehicle license plate number (e.g., "KA01AB1234")
-            * Date and time (e.g., "tomorrow at 5 pm", "today at 3 pm")
-            * Duration (default is 2 hours if not specified)
-
-            EXAMPLE BOOKING QUERY:
-            "I want to book a parking slot at Orion Mall for my car with license plate KA01AB1234 tomorrow at 5 pm for 2 hours"
-
-            IMPORTANT: When the user says "yes" or "confirm", I will:
-            1. Check if there's a pending booking request
-            2. If not, I'll check if I know their mall and vehicle preferences
-            3. If I have this information, I'll find an available slot and book it
-            4. If I don't have enough information, I'll ask for it
-
-            CURRENTLY AVAILABLE SLOTS:
-            {available_slots_text}
-            """
-
-            # Create messages array for the API call
-            messages = [
-                {"role": "system", "content": system_message + user_context}
-            ]
-
-            # Add conversation history to messages
-            if relevant_history:
-                # Add each message from history as a separate message with proper role
-                for history_entry in relevant_history:
-                    if history_entry.startswith("User: "):
-                        user_msg = history_entry.replace("User: ", "", 1)
-                        messages.append({"role": "user", "content": user_msg})
-                    elif history_entry.startswith("Agent: "):
-                        agent_msg = history_entry.replace("Agent: ", "", 1)
-                        messages.append({"role": "assistant", "content": agent_msg})
-
-            # Add user query
-            messages.append({"role": "user", "content": query})
+            # If no conversation history or it's empty, try semantic search or file-based history
+            if not history_turns and not history_summary:
+                if self.use_vector_store:
+                    relevant_history_entries = self.vector_store.get_relevant_history(query, k=5)
+                else:
+                    relevant_history_entries = self.file_chat.get_relevant_history(query, k=5)
+
+                # Entries come newest first
+                history_turns = list(reversed(relevant_history_entries))
+                print(f"Found {len(history_turns)} relevant messages from history search")
+
+            # Fallback to traditional memory manager if needed
+            if not history_turns and not history_summary:
+                for entry in reversed(self.memory_manager.get_relevant_history(query, k=5)):
+                    user_query, _, agent_response = entry[len("User: "):].partition("\nAgent: ")
+                    history_turns.append({"user_query": user_query, "agent_response": agent_response})
+                print(f"Using memory manager history with {len(history_turns)} messages")
+
+            # Search results aren't summarized, but still have to fit the budget
+            if not history_summary:
+                history_turns = history_turns[self.history_window.recent_turns(history_turns):]
+        except Exception as history_error:
+            print(f"Error retrieving history: {str(history_error)}")
+            # Continue without history if there's an error
+
+        return history_summary, history_turns
+
+    def _build_messages(self, query: str, conversation_id: Optional[str] = None,
+                        timer: Optional[StageTimer] = None, shared: bool = False) -> List[Dict[str, str]]:
+        """Build the chat-completion messages (system prompt, history and query) for the LLM.
+
+        A shared prompt, for an answer cached across users, leaves out the
+        user's ID and name and their matched past questions.
+        """
+        # Set conversation ID if provided
+        if conversation_id:
+            self.conversation_id = conversation_id
+        elif not hasattr(self, 'conversation_id'):
+            # Create a new conversation ID if none exists
+            self.conversation_id = str(uuid.uuid4())
+            print(f"Created new conversation ID: {self.conversation_id}")
+
+        # Assemble the system prompt from the cached instruction, mall and slot blocks
+        # (in tool-calling mode the model fetches malls, slots and rates itself)
+        prompt_builder = PromptBuilder()
+        user_id, user_name = (SHARED_USER_ID, SHARED_USER_NAME) if shared else (self.user_id, self.user_name)
+        if self.use_tools:
+            system_content = prompt_builder.tool_system_message(user_id, user_name, self.conversation_context)
+        else:
+            system_content = prompt_builder.system_message(self.db) + prompt_builder.user_context(
+                self.db, user_id, user_name, self.conversation_context, self._format_parking_rates()
+            )
+        if timer:
+            timer.mark("prompt")
 
-            # Call Groq API
-            response = self._call_groq_api(messages)
+        # Cached questions open a conversation, so there is no history of their own to send
+        if shared:
+            history_summary, history_turns = None, []
+        else:
+            history_summary, history_turns = self._load_history(query, conversation_id)
+        if timer:
+            timer.mark("history")
 
-            # Add interaction to memory
-            self.memory_manager.add_interaction(query, response)
+        # Create messages array for the API call
+        messages = [
+            {"role": "system", "content": system_content}
+        ]
 
-            # Add to chat history
-            if self.use_vector_store:
-                try:
-                    self.vector_store.add_interaction(
-                        conversation_id=self.conversation_id,
-                        user_query=query,
-                        agent_response=response
-                    )
-                    print(f"Added interaction to vector store with conversation ID: {self.conversation_id}")
-                except Exception as vector_error:
-                    print(f"Error adding to vector store: {str(vector_error)}")
-                    # Fall back to file-based chat history
-                    try:
-                        self.file_chat.add_interaction(
-                            conversation_id=self.conversation_id,
-                            user_query=query,
-                            agent_response=response
-                        )
-                        print(f"Added interaction to file chat history with conversation ID: {self.conversation_id}")
-                    except Exception as file_error:
-                        print(f"Error adding to file chat history: {str(file_error)}")
-            else:
-                # Use file-based chat history
+        # Add the summary of older turns, then each recent turn as a user/assistant pair
+        if history_summary:
+            messages.append({"role": "system", "content": history_summary})
+        for turn in history_turns:
+            messages.append({"role": "user", "content": turn.get("user_query", "")})
+            messages.append({"role": "assistant", "content": turn.get("agent_response", "")})
+
+        # Add user query
+        messages.append({"role": "user", "content": query})
+
+        return messages
+
+    def _save_interaction(self, query: str, response: str):
+        """Save a completed interaction to memory and chat history."""
+        # Add interaction to memory
+        self.memory_manager.add_interaction(query, response)
+
+        # Add to chat history
+        if self.use_vector_store:
+            try:
+                self.vector_store.add_interaction(
+                    conversation_id=self.conversation_id,
+                    user_query=query,
+                    agent_response=response
+                )
+                print(f"Added interaction to vector store with conversation ID: {self.conversation_id}")
+            except Exception as vector_error:
+                print(f"Error adding to vector store: {str(vector_error)}")
+                # Fall back to file-based chat history
                 try:
                     self.file_chat.add_interaction(
                         conversation_id=self.conversation_id,
@@ -1485,10 +1381,14 @@ Please respond with "Yes" or "No".
                     print(f"Added interaction to file chat history with conversation ID: {self.conversation_id}")
                 except Exception as file_error:
                     print(f"Error adding to file chat history: {str(file_error)}")
-
-            return response
-
-        except Exception as e:
-            error_message = f"I encountered an error while processing your request: {str(e)}"
-            print(f"Error in process_query: {str(e)}")
-            return error_message
+        else:
+            # Use file-based chat history
+            try:
+                self.file_chat.add_interaction(
+                    conversation_id=self.conversation_id,
+                    user_query=query,
+                    agent_response=response
+                )
+                print(f"Added interaction to file chat history with conversation ID: {self.conversation_id}")
+            except Exception as file_error:
+                print(f"Error adding to file chat history: {str(file_error)}")
@@ -0,0 +1,330 @@
+"""
+Entity gazetteer for conversation context extraction.
+
+The agent pulls malls, vehicle types, time phrases, license plates and the
+intent out of every message. Instead of loading the mall catalog and running
+one substring check per mall, alias, vehicle type, time word and intent
+keyword, all of those phrases are compiled once into an Aho-Corasick
+automaton, so a message is scanned once and every phrase occurrence comes
+back with its position. Matching stays substring based, like the checks it
+replaced, and the precedence rules between matches are unchanged.
+
+When no mall is mentioned exactly, a character-trigram index over mall names
+and aliases finds the closest name to any run of words in the message, so
+"phonix marketcity" or "oryon mall" still resolve to a mall without an LLM
+round trip.
+
+The compiled gazetteer is cached per process and rebuilt after a commit that
+adds, changes or deletes a mall.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from ..database.models import Mall
+
+# Aliases for well-known malls, in priority order; each maps to the first
+# catalog mall whose name contains it
+MALL_ALIASES = ["phoenix", "palladium", "orion", "forum", "market city", "mall of asia"]
+
+# Checked in this order; the first one mentioned wins
+VEHICLE_TYPES = ["car", "truck", "bike"]
+
+# Words that mark a time phrase, together with the word before them; when
+# several are mentioned, the one listed last wins
+TIME_WORDS = [
+    "today", "tomorrow", "next week",
+    "morning", "afternoon", "evening", "night",
+    "am", "pm", "hours", "hour", "hr", "hrs"
+]
+
+# (last_query_type, intent, keywords) in priority order
+INTENT_KEYWORDS = [
+    ("availability", "check_available_slots", ["available", "find", "looking for", "show slots"]),
+    ("booking", "create_booking", ["book", "reserve"]),
+    ("cancellation", "cancel_booking", ["cancel"]),
+    ("pricing", "check_parking_rates", ["rate", "price", "cost", "fee", "charge"]),
+    ("view_bookings", "check_user_bookings", [
+        "my booking", "view booking", "show booking", "show my booking",
+        "check booking", "check my booking", "show bookings"
+    ]),
+]
+
+# Minimum Dice similarity between a run of words and a mall name or alias for a fuzzy match
+FUZZY_MATCH_THRESHOLD = 0.7
+# Words that never start or end a fuzzy mall mention
+FUZZY_EDGE_STOPWORDS = {
+    "a", "an", "the", "at", "in", "on", "to", "for", "of", "and", "or", "is", "it",
+    "i", "me", "my", "we", "you", "please", "want", "need", "book", "slot", "slots",
+    "parking", "park", "car", "truck", "bike", "today", "tomorrow", "near", "from"
+}
+
+MALL_ID_PATTERN = re.compile(r'mall\s+(?:id\s+)?(\d+)')
+# Common formats like KA01AB1234, MH02CD5678 (matched on the original casing)
+LICENSE_PLATE_PATTERN = re.compile(r'\b[A-Z]{2}\d{2}[A-Z]{1,2}\d{1,4}\b')
+WORD_PATTERN = re.compile(r'\S+')
+LETTERS_PATTERN = re.compile(r'[a-z]+')
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton over a fixed set of phrases."""
+
+    def __init__(self, phrases: Sequence[Tuple[str, Any]]):
+        # Trie transitions, failure links and (phrase length, payload) outputs per state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, Any]]] = [[]]
+
+        for phrase, payload in phrases:
+            state = 0
+            for char in phrase:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append((len(phrase), payload))
+
+        # Breadth-first, so every failure target is finished before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def scan(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Find every (possibly overlapping) phrase occurrence as (start, end, payload)."""
+        matches = []
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, payload in outputs[state]:
+                matches.append((position + 1 - length, position + 1, payload))
+        return matches
+
+def _trigrams(text: str) -> Set[str]:
+    """Character trigrams of a letters-only string, padded so word edges count."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """Inverted index from character trigrams to the phrases containing them."""
+
+    def __init__(self, phrases: Sequence[Tuple[str, Any]]):
+        # Phrases are compared without spaces, so "market city" matches "marketcity"
+        self._payloads: List[Any] = []
+        self._sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        self.max_words = 1
+
+        for phrase, payload in phrases:
+            words = LETTERS_PATTERN.findall(phrase.lower())
+            if not words:
+                continue
+            trigrams = _trigrams("".join(words))
+            entry = len(self._payloads)
+            self._payloads.append(payload)
+            self._sizes.append(len(trigrams))
+            for trigram in trigrams:
+                self._postings.setdefault(trigram, []).append(entry)
+            self.max_words = max(self.max_words, len(words))
+
+    def best_match(self, text: str, threshold: float = FUZZY_MATCH_THRESHOLD) -> Optional[Tuple[Any, float]]:
+        """Find the phrase most similar to any run of words in the text.
+
+        Runs of up to one word more than the longest phrase are compared by
+        Dice similarity of their trigrams. Returns (payload, similarity), or
+        None if nothing reaches the threshold.
+        """
+        words = LETTERS_PATTERN.findall(text.lower())
+        best_entry, best_score = None, threshold
+
+        for start in range(len(words)):
+            if words[start] in FUZZY_EDGE_STOPWORDS:
+                continue
+            for end in range(start + 1, min(len(words), start + self.max_words + 1) + 1):
+                if words[end - 1] in FUZZY_EDGE_STOPWORDS:
+                    continue
+                window = "".join(words[start:end])
+                if len(window) < 4:
+                    continue
+                trigrams = _trigrams(window)
+                shared: Dict[int, int] = {}
+                for trigram in trigrams:
+                    for entry in self._postings.get(trigram, ()):
+                        shared[entry] = shared.get(entry, 0) + 1
+                for entry, count in shared.items():
+                    score = 2 * count / (len(trigrams) + self._sizes[entry])
+                    if score > best_score or (score == best_score and best_entry is None):
+                        best_entry, best_score = entry, score
+
+        if best_entry is None:
+            return None
+        return self._payloads[best_entry], best_score
+
+class Gazetteer:
+    """Compiled entity phrases for one version of the mall catalog."""
+
+    def __init__(self, malls: Sequence[Tuple[int, str]]):
+        # Malls in catalog (id) order, which decides ties between name matches
+        self.malls = list(malls)
+        self.mall_names_by_id = dict(self.malls)
+
+        # Each alias resolves to the first mall whose name contains it, if any
+        self.alias_malls = []
+        for alias in MALL_ALIASES:
+            self.alias_malls.append(next(
+                ((mall_id, name) for mall_id, name in self.malls if alias in name.lower()),
+                None
+            ))
+
+        phrases = [(name.lower(), ("mall", index)) for index, (_, name) in enumerate(self.malls)]
+        phrases += [(alias, ("alias", index)) for index, alias in enumerate(MALL_ALIASES)]
+        phrases += [(vehicle_type, ("vehicle", index)) for index, vehicle_type in enumerate(VEHICLE_TYPES)]
+        phrases += [(word, ("time", index)) for index, word in enumerate(TIME_WORDS)]
+        phrases += [
+            (keyword, ("intent", index))
+            for index, (_, _, keywords) in enumerate(INTENT_KEYWORDS)
+            for keyword in keywords
+        ]
+        self.automaton = PhraseAutomaton(phrases)
+
+        # Fuzzy fallback over mall names and the aliases that resolve to a mall
+        fuzzy_phrases = [(name, (mall_id, name)) for mall_id, name in self.malls]
+        fuzzy_phrases += [(alias, mall) for alias, mall in zip(MALL_ALIASES, self.alias_malls) if mall]
+        self.fuzzy_index = TrigramIndex(fuzzy_phrases)
+
+    def extract(self, query: str) -> Dict[str, Any]:
+        """Extract the entities mentioned in a query.
+
+        Returns a dict with:
+            mall_by_id     (id, name) for a "mall 3" / "mall id 3" mention of a known mall
+            mall_by_name   (id, name) of the first catalog mall whose name is mentioned
+            mall_by_alias  (id, name) for the first alias mentioned, None if no mall has it;
+                           the key is absent when no alias is mentioned
+            mall_by_fuzzy  (id, name) of the mall whose name or alias is closest to a
+                           misspelled mention, only looked for when no mall matched exactly
+            vehicle_type   first vehicle type mentioned
+            time_period    time word with the word before it, e.g. "5 pm"
+            license_plate  first license plate found
+            intent         (last_query_type, intent) of the highest priority keyword group
+        """
+        query_lower = query.lower()
+        entities: Dict[str, Any] = {
+            "mall_by_id": None,
+            "mall_by_name": None,
+            "mall_by_fuzzy": None,
+            "vehicle_type": None,
+            "time_period": None,
+            "license_plate": None,
+            "intent": None
+        }
+
+        mall_id_match = MALL_ID_PATTERN.search(query_lower)
+        if mall_id_match:
+            mall_id = int(mall_id_match.group(1))
+            if mall_id in self.mall_names_by_id:
+                entities["mall_by_id"] = (mall_id, self.mall_names_by_id[mall_id])
+
+        plate_match = LICENSE_PLATE_PATTERN.search(query)
+        if plate_match:
+            entities["license_plate"] = plate_match.group(0)
+
+        # Best (lowest) index per phrase kind; time words keep the earliest word after the first
+        best: Dict[str, int] = {}
+        time_words: Dict[int, int] = {}
+        word_spans = None
+
+        for start, end, (kind, index) in self.automaton.scan(query_lower):
+            if kind == "time":
+                if word_spans is None:
+                    word_spans = [match.span() for match in WORD_PATTERN.finditer(query_lower)]
+                word_index = _word_containing(word_spans, start, end)
+                if word_index and (index not in time_words or word_index < time_words[index]):
+                    time_words[index] = word_index
+            elif kind not in best or index < best[kind]:
+                best[kind] = index
+
+        if "mall" in best:
+            entities["mall_by_name"] = self.malls[best["mall"]]
+        if "alias" in best:
+            entities["mall_by_alias"] = self.alias_malls[best["alias"]]
+        if "vehicle" in best:
+            entities["vehicle_type"] = VEHICLE_TYPES[best["vehicle"]]
+        if "intent" in best:
+            last_query_type, intent, _ = INTENT_KEYWORDS[best["intent"]]
+            entities["intent"] = (last_query_type, intent)
+        if not (entities["mall_by_id"] or entities["mall_by_name"] or entities.get("mall_by_alias")):
+            fuzzy_match = self.fuzzy_index.best_match(query_lower)
+            if fuzzy_match:
+                entities["mall_by_fuzzy"] = fuzzy_match[0]
+        if time_words:
+            word_index = time_words[max(time_words)]
+            words = query_lower.split()
+            entities["time_period"] = f"{words[word_index - 1]} {words[word_index]}"
+
+        return entities
+
+def _word_containing(word_spans: List[Tuple[int, int]], start: int, end: int) -> Optional[int]:
+    """Index of the whitespace-separated word containing [start, end), or None."""
+    for index, (word_start, word_end) in enumerate(word_spans):
+        if word_start <= start and end <= word_end:
+            return index
+        if word_start > start:
+            break
+    return None
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+_CATALOG_CHANGED_KEY = "mall_catalog_changed"
+
+def get_gazetteer(db: Session) -> Gazetteer:
+    """Get the compiled gazetteer, building it from the mall catalog if needed."""
+    global _gazetteer
+    gazetteer = _gazetteer
+    if gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                malls = db.execute(select(Mall.id, Mall.name).order_by(Mall.id)).all()
+                _gazetteer = Gazetteer([(mall_id, name) for mall_id, name in malls if name])
+            gazetteer = _gazetteer
+    return gazetteer
+
+def invalidate_gazetteer():
+    """Drop the compiled gazetteer so the next lookup rebuilds it."""
+    global _gazetteer
+    with _gazetteer_lock:
+        _gazetteer = None
+
+@event.listens_for(Session, "after_flush")
+def _note_catalog_changes(session: Session, flush_context):
+    """Flag sessions that have flushed mall changes."""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Mall):
+            session.info[_CATALOG_CHANGED_KEY] = True
+            return
+
+@event.listens_for(Session, "after_commit")
+def _rebuild_on_catalog_change(session: Session):
+    """Rebuild the gazetteer once mall changes have committed."""
+    if session.info.pop(_CATALOG_CHANGED_KEY, False):
+        invalidate_gazetteer()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_changes(session: Session):
+    """Forget mall changes that were rolled back."""
+    session.info.pop(_CATALOG_CHANGED_KEY, None)
@@ -0,0 +1,247 @@
+"""
+Local intent classifier for routing requests without the LLM.
+
+Only exact command strings ("show my bookings") and keyword hits used to reach
+the direct handlers; anything phrased differently cost a full LLM round trip.
+This classifier maps free-form queries to the intents that have a direct
+handler, or to "other" for everything the LLM should answer. Cancellations
+get their own class, which is never routed, so "delete my reservation" isn't
+mistaken for a request to list bookings.
+
+Features are hashed word unigrams and bigrams plus character 4-grams (which
+tolerate typos), weighted by TF-IDF and L2-normalised. The model is a
+softmax regression trained with full-batch gradient descent in NumPy. It is
+trained at first use from the seed examples below plus the chat_history logs,
+where replies that open with the rate, slot or booking list header label
+their queries.
+
+Predictions below INTENT_CLASSIFIER_THRESHOLD (default 0.75) are ignored.
+"""
+
+import glob
+import json
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+OTHER = "other"
+CANCEL_BOOKING = "cancel_booking"
+INTENTS = ["check_available_slots", "check_parking_rates", "check_user_bookings", "create_booking", CANCEL_BOOKING, OTHER]
+
+# Hand-written examples per intent
+SEED_EXAMPLES = {
+    "check_available_slots": [
+        "are there any free spots", "is there space for my car", "any parking left",
+        "do you have open spaces", "which slots are free", "is anything vacant right now",
+        "can i find a spot", "what spots are open", "are slots free this evening",
+        "is there room to park", "any empty bays", "check free spaces",
+        "where can i park", "show open parking spots", "is the parking full",
+        "how many spaces are left", "do you have a slot for a bike", "is there a free truck bay",
+    ],
+    "check_parking_rates": [
+        "how much does parking cost", "what do you charge per hour", "how expensive is it",
+        "what is the hourly price", "tell me the tariff", "how much for two hours",
+        "what are the charges", "parking fees please", "what will it cost me",
+        "how much is it per hour for a car", "pricing for bikes", "is parking free",
+        "how much do i pay", "what's the rate for trucks", "give me the price list",
+        "cost of parking", "how much money per hour",
+    ],
+    "check_user_bookings": [
+        "what have i booked", "list my reservations", "do i have any bookings",
+        "show me my reservations", "what are my upcoming reservations", "did my booking go through",
+        "where is my reservation", "see my bookings", "my reservations please",
+        "display my parking history", "which slot did i reserve", "what did i book yesterday",
+        "do i have a reservation", "show existing bookings", "pull up my reservations",
+    ],
+    "create_booking": [
+        "i want to book a spot", "reserve a slot for me", "can you book parking",
+        "get me a parking spot", "i'd like to make a reservation", "book it for me",
+        "please reserve parking for my car", "hold a slot for me", "make a booking",
+        "i need to reserve a space", "secure a spot for tomorrow", "book a place to park",
+        "reserve parking at 5 pm", "i want a reservation for 2 hours",
+    ],
+    # Needs a booking ID, so the agent never routes it; the class keeps these away from the others
+    CANCEL_BOOKING: [
+        "cancel my booking", "delete the booking", "i want to cancel", "remove my booking",
+        "please cancel the reservation", "call off my parking", "drop my booking for tomorrow",
+        "i don't need the slot anymore", "undo my reservation", "scrap the booking",
+        "get rid of my reservation", "cancel booking 12", "i need to cancel my parking",
+    ],
+    OTHER: [
+        "hello", "hi there", "good morning", "thanks", "thank you so much", "who are you",
+        "what can you do", "how are you", "tell me a joke", "what's the weather",
+        "where is the mall located", "what time does the mall open", "is there a food court",
+        "can i pay by card", "do you have ev charging", "what is my name", "bye",
+        "ok", "help", "i lost my ticket", "how do i get there", "is the mall open on sunday",
+        "what shops are there", "can you speak hindi", "who built this app",
+        # Changing a booking has no direct handler
+        "can i modify my booking", "change my booking time", "move my booking to friday",
+        "extend my parking by an hour", "update the plate on my reservation", "reschedule my slot",
+    ],
+}
+
+# Headers that open the rate, slot and booking list replies. Booking
+# confirmations and cancellations also mention rates, slot IDs and booking IDs,
+# so only a reply that starts with one of these labels its query.
+RESPONSE_SIGNATURES = [
+    (re.compile(r"\s*Here are the current parking rates:"), "check_parking_rates"),
+    (re.compile(r"\s*Here are the available \w+ slots at "), "check_available_slots"),
+    (re.compile(r"\s*Here are your current active bookings:"), "check_user_bookings"),
+]
+
+# A sticky intent can answer "cancel booking 12" with the bookings list; such queries are never labelled
+UNLABELLED_QUERY_PATTERN = re.compile(r"\b(cancel|delete|remove|modify|change|reschedule|extend)\b", re.IGNORECASE)
+
+HASH_DIMENSIONS = 2 ** 14
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+def default_threshold() -> float:
+    """Get the minimum confidence for routing a query without the LLM."""
+    return float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", "0.75"))
+
+def _features(text: str) -> Dict[int, float]:
+    """Hashed n-gram counts for a text."""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    grams = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f"#{token}#"
+        grams.extend(f"c:{padded[i:i + 4]}" for i in range(max(len(padded) - 3, 1)))
+
+    counts: Dict[int, float] = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode("utf-8")) % HASH_DIMENSIONS
+        counts[index] = counts.get(index, 0.0) + 1.0
+    return counts
+
+def load_chat_history_examples(directory: str = "chat_history") -> List[Tuple[str, str]]:
+    """Label logged queries whose replies open with a rate, slot or booking list."""
+    examples = []
+    for path in glob.glob(os.path.join(directory, "user_*", "*.json")):
+        if os.path.basename(path) == "metadata.json":
+            continue
+        try:
+            with open(path, "r") as f:
+                interactions = json.load(f)
+        except Exception as e:
+            print(f"Error loading chat history {path}: {str(e)}")
+            continue
+
+        for interaction in interactions if isinstance(interactions, list) else []:
+            query = interaction.get("user_query") or ""
+            response = interaction.get("agent_response") or ""
+            if not query or query == "New conversation" or UNLABELLED_QUERY_PATTERN.search(query):
+                continue
+            for signature, intent in RESPONSE_SIGNATURES:
+                if signature.match(response):
+                    examples.append((query, intent))
+                    break
+    return examples
+
+class IntentClassifier:
+    """Softmax regression over hashed TF-IDF n-gram features."""
+
+    def __init__(self, intents: Sequence[str] = INTENTS):
+        self.intents = list(intents)
+        self.idf = np.ones(HASH_DIMENSIONS, dtype=np.float32)
+        self.weights = np.zeros((HASH_DIMENSIONS, len(self.intents)), dtype=np.float32)
+        self.bias = np.zeros(len(self.intents), dtype=np.float32)
+        self._lock = threading.Lock()
+        self.stats = {"predictions": 0, "routed": 0, "llm_calls_avoided": 0, "not_routed": 0, "other": 0}
+        self.routed_by_intent = {intent: 0 for intent in self.intents if intent != OTHER}
+
+    def _vector(self, counts: Dict[int, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse TF-IDF vector as (indices, L2-normalised values)."""
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts))) * self.idf[indices]
+        norm = np.linalg.norm(values)
+        return indices, values / norm if norm else values
+
+    def train(self, examples: Iterable[Tuple[str, str]], epochs: int = 300, learning_rate: float = 2.0, l2: float = 1e-4) -> "IntentClassifier":
+        """Fit the model on (text, intent) pairs."""
+        examples = [(text, intent) for text, intent in examples if intent in self.intents]
+        feature_counts = [_features(text) for text, _ in examples]
+        labels = np.array([self.intents.index(intent) for _, intent in examples])
+
+        # Smoothed inverse document frequency over the training texts
+        document_frequency = np.zeros(HASH_DIMENSIONS, dtype=np.float32)
+        for counts in feature_counts:
+            document_frequency[list(counts.keys())] += 1
+        self.idf = (np.log((1 + len(examples)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        # Training sets are small, so a dense design matrix over the features
+        # that actually occur is fine
+        active = np.flatnonzero(document_frequency)
+        column = np.zeros(HASH_DIMENSIONS, dtype=np.int64)
+        column[active] = np.arange(len(active))
+        design = np.zeros((len(examples), len(active)), dtype=np.float32)
+        for row, counts in enumerate(feature_counts):
+            indices, values = self._vector(counts)
+            design[row, column[indices]] = values
+        targets = np.eye(len(self.intents), dtype=np.float32)[labels]
+
+        weights = np.zeros((len(active), len(self.intents)), dtype=np.float32)
+        bias = np.zeros(len(self.intents), dtype=np.float32)
+        for _ in range(epochs):
+            probabilities = _softmax(design @ weights + bias)
+            error = (probabilities - targets) / len(examples)
+            weights -= learning_rate * (design.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+        self.weights = np.zeros((HASH_DIMENSIONS, len(self.intents)), dtype=np.float32)
+        self.weights[active] = weights
+        self.bias = bias
+        return self
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Get the most likely intent of a query and its probability."""
+        indices, values = self._vector(_features(text))
+        scores = values @ self.weights[indices] + self.bias if len(indices) else self.bias
+        probabilities = _softmax(scores[np.newaxis, :])[0]
+        best = int(np.argmax(probabilities))
+        return self.intents[best], float(probabilities[best])
+
+    def record(self, intent: str, confidence: float, routed: bool, llm_call_avoided: bool = False):
+        """Count a prediction and what the agent did with it."""
+        with self._lock:
+            self.stats["predictions"] += 1
+            if routed:
+                self.stats["routed"] += 1
+                self.routed_by_intent[intent] += 1
+                if llm_call_avoided:
+                    self.stats["llm_calls_avoided"] += 1
+            elif intent == OTHER:
+                self.stats["other"] += 1
+            else:
+                self.stats["not_routed"] += 1
+
+    def info(self) -> Dict[str, Any]:
+        """Get prediction counters, including LLM calls saved by local routing."""
+        with self._lock:
+            return {**self.stats, "routed_by_intent": dict(self.routed_by_intent)}
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    shifted = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+def training_examples(chat_history_directory: Optional[str] = "chat_history") -> List[Tuple[str, str]]:
+    """Seed examples plus labelled queries from the chat history logs."""
+    examples = [(text, intent) for intent, texts in SEED_EXAMPLES.items() for text in texts]
+    if chat_history_directory:
+        examples.extend(load_chat_history_examples(chat_history_directory))
+    return examples
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_lock = threading.Lock()
+
+def get_intent_classifier() -> IntentClassifier:
+    """Get the process-wide classifier, training it on first use."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = IntentClassifier().train(training_examples())
+    return _classifier
@@ -0,0 +1,313 @@
+"""
+System prompt assembly for the agent's LLM calls.
+
+The instruction text is fixed, so it lives in module constants and only the
+per-request fields are formatted in. The mall list is cached until the mall
+catalog changes, and the "currently available slots" block comes from one
+joined query, memoized per (selected mall, vehicle type) until a slot or
+mall changes. Both are tracked with after_flush/after_commit hooks, so
+building the prompt for a message costs a few dictionary lookups.
+
+In tool-calling mode (LLM_TOOL_CALLING) the prompt carries neither the mall
+list, the slot block nor the booking instructions; the model asks for
+availability, rates and bookings through tools instead, so
+tool_system_message() needs no database at all.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from sqlalchemy import case, event, select
+from sqlalchemy.orm import Session
+
+from ..database.models import Mall, ParkingSlot, VehicleType
+
+# Most slots listed in the prompt
+MAX_PROMPT_SLOTS = 20
+# Memoized slot blocks kept (one per selected mall and vehicle type)
+MAX_CACHED_SLOT_BLOCKS = 256
+
+SYSTEM_INSTRUCTIONS = """
+        You are a helpful parking management assistant for a mall parking system. You can help users with:
+
+        1. Finding available parking slots
+        2. Checking parking rates
+        3. Creating parking bookings
+        4. Cancelling bookings
+        5. Viewing booking history
+
+        CRITICAL FORMATTING INSTRUCTIONS (YOU MUST FOLLOW THESE EXACTLY):
+        - NEVER respond with long paragraphs
+        - ALWAYS use simple asterisk (*) for bullet points like this:
+          * First point
+          * Second point
+        - DO NOT use Unicode bullet points (•) as they may not display correctly
+        - ALWAYS put each piece of information on a separate line
+        - ALWAYS use numbered lists (1., 2., 3.) for sequential instructions
+        - ALWAYS break your response into short, digestible sections
+        - ALWAYS use line breaks between different sections of information
+        - NEVER combine multiple points into a single paragraph
+        - Format mall lists and options as bullet points, not as running text
+
+        CRITICAL CONVERSATION INSTRUCTIONS:
+        - NEVER ask for information that the user has already provided
+        - If the user has already mentioned a mall name, DO NOT ask them to select a mall again
+        - If the user has already mentioned a vehicle type, DO NOT ask them to select a vehicle type again
+        - ALWAYS remember information from earlier in the conversation
+        - NEVER repeat questions that have already been answered
+        - If the user says "Phoenix Mall of Asia" or any other mall name, remember it and use it
+        - If the user says "car", "bike", or "truck", remember it and use it
+
+        When the user asks about parking availability, make sure to ask for ONLY the information they haven't provided yet:
+        * Which mall they're interested in (if not already mentioned)
+        * What type of vehicle they have (if not already mentioned)
+        * The time period they're interested in (if not already mentioned)
+
+        When creating a booking, ensure you have all the necessary information:
+        * Mall location (if not already mentioned)
+        * Vehicle type (if not already mentioned)
+        * Preferred parking slot ID (if any)
+"""
+
+SYSTEM_PROMPT_HEAD = SYSTEM_INSTRUCTIONS + """
+        Our system has the following malls, each with parking slots:
+        """
+
+SYSTEM_PROMPT_TAIL = """
+
+        Each mall has:
+        * 3 slots for trucks (₹100/hour)
+        * 3 slots for cars (₹50/hour)
+        * 4 slots for bikes (₹20/hour)
+        """
+
+USER_CONTEXT_TEMPLATE = """
+        IMPORTANT USER INFORMATION:
+        * Current User ID: {user_id}
+        * User Name: {user_name}
+        * Always use this User ID for all operations
+        * Always address the user by their name when asking for information
+        * Do NOT ask the user for their User ID again
+
+        CURRENT CONVERSATION CONTEXT:
+        * Selected Mall: {selected_mall}
+        * Selected Vehicle Type: {selected_vehicle_type}
+        * Selected License Plate: {selected_license_plate}
+        * Selected Time Period: {selected_time_period}
+
+        PARKING RATES (if available):
+        {parking_rates}
+
+        IMPORTANT: If the user has already provided information about their mall or vehicle type,
+        DO NOT ask for it again. Use the information they've already provided.
+
+        BOOKING INSTRUCTIONS:
+        When a user wants to book a parking slot, you should:
+        1. If they haven't specified a mall, ask which mall they prefer
+        2. If they haven't specified a vehicle type, ask what type of vehicle they have
+        3. If they haven't specified a vehicle license plate, ask for their license plate number
+        4. If they haven't specified a date/time, ask when they want to park
+        5. If they haven't specified a duration, assume 2 hours
+        6. Show them available slots matching their criteria
+        7. To book a slot, tell them to use the following format: "Book slot [SLOT_ID]"
+           For example: "Book slot 5"
+        8. If the user says "yes" or "confirm" after you've shown them available slots,
+           I will automatically find and book an appropriate slot for them
+
+        CHECKING BOOKINGS:
+        When a user wants to check their bookings, tell them to use one of these commands:
+        * "Check my bookings"
+        * "Show my bookings"
+        * "View my bookings"
+        * "My bookings"
+
+        REQUIRED INFORMATION FOR BOOKING:
+        * Mall name (one of the malls listed above)
+        * Vehicle type (car, bike, or truck)
+        * Vehicle license plate number (e.g., "KA01AB1234")
+        * Date and time (e.g., "tomorrow at 5 pm", "today at 3 pm")
+        * Duration (default is 2 hours if not specified)
+
+        EXAMPLE BOOKING QUERY:
+        "I want to book a parking slot at Orion Mall for my car with license plate KA01AB1234 tomorrow at 5 pm for 2 hours"
+
+        IMPORTANT: When the user says "yes" or "confirm", I will:
+        1. Check if there's a pending booking request
+        2. If not, I'll check if I know their mall and vehicle preferences
+        3. If I have this information, I'll find an available slot and book it
+        4. If I don't have enough information, I'll ask for it
+
+        CURRENTLY AVAILABLE SLOTS:
+        {available_slots}
+        """
+
+# Tool-calling mode only keeps the role, formatting and conversation rules; what the
+# tools need (mall, vehicle type, plate, time) and how booking works is in their schemas
+TOOL_INSTRUCTIONS_TEMPLATE = """
+        You are a helpful parking management assistant for a mall parking system. You help users
+        find available slots, check rates, book or cancel parking and view their bookings.
+
+        FORMATTING:
+        * Keep answers short, with each piece of information on its own line
+        * Use asterisk (*) bullet points, not Unicode bullets, and numbered lists (1., 2., 3.) for steps
+
+        RULES:
+        * Call the tools whenever the user needs availability, prices or their bookings; never guess them
+        * Never ask for anything the user or the context below has already given
+        * Address the user by their name
+
+        USER: {user_name} (ID: {user_id})
+
+        CURRENT CONVERSATION CONTEXT:
+        * Selected Mall: {selected_mall}
+        * Selected Vehicle Type: {selected_vehicle_type}
+        * Selected License Plate: {selected_license_plate}
+        * Selected Time Period: {selected_time_period}
+        """
+
+# Stand-ins for the user in prompts whose answers are cached and shared between users
+SHARED_USER_ID = "not needed for this question"
+SHARED_USER_NAME = "not given, so don't address the user by name"
+
+# Keys under session.info for changes waiting for their transaction to commit
+_MALLS_CHANGED_KEY = "prompt_malls_changed"
+_SLOTS_CHANGED_KEY = "prompt_slots_changed"
+
+class PromptBuilder:
+    """Process-wide cache of the system prompt's catalog and availability blocks."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PromptBuilder, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.catalog_version = 0
+            cls._instance.availability_version = 0
+            cls._instance._system_message = None
+            cls._instance._slots_blocks = OrderedDict()
+        return cls._instance
+
+    def system_message(self, db: Session) -> str:
+        """Get the static instructions with the current mall list."""
+        cached = self._system_message
+        if cached is not None and cached[0] == self.catalog_version:
+            return cached[1]
+
+        version = self.catalog_version
+        malls = db.execute(select(Mall.id, Mall.name).order_by(Mall.id)).all()
+        mall_list = "\n".join(f"* {name} (ID: {mall_id})" for mall_id, name in malls)
+        message = SYSTEM_PROMPT_HEAD + mall_list + SYSTEM_PROMPT_TAIL
+        self._system_message = (version, message)
+        return message
+
+    def available_slots_text(self, db: Session, mall_id: Optional[int] = None, vehicle_type: Optional[str] = None) -> str:
+        """Get the available slots block, listing the selected mall's slots for the vehicle type first."""
+        if not mall_id or vehicle_type not in {member.value for member in VehicleType}:
+            mall_id, vehicle_type = None, None
+
+        key = (mall_id, vehicle_type, self.availability_version)
+        with self._lock:
+            text = self._slots_blocks.get(key)
+            if text is not None:
+                self._slots_blocks.move_to_end(key)
+                return text
+
+        text = self._build_slots_text(db, mall_id, vehicle_type)
+        with self._lock:
+            self._slots_blocks[key] = text
+            # Blocks from older versions are never looked up again
+            while len(self._slots_blocks) > MAX_CACHED_SLOT_BLOCKS:
+                self._slots_blocks.popitem(last=False)
+        return text
+
+    def _build_slots_text(self, db: Session, mall_id: Optional[int], vehicle_type: Optional[str]) -> str:
+        """Format up to MAX_PROMPT_SLOTS available slots, grouped by mall."""
+        query = (
+            select(
+                ParkingSlot.id, Mall.name.label("mall_name"), ParkingSlot.vehicle_type,
+                ParkingSlot.slot_number, ParkingSlot.hourly_rate
+            )
+            .join(Mall, Mall.id == ParkingSlot.mall_id)
+            .where(ParkingSlot.is_available == True)
+        )
+        if mall_id:
+            selected = (ParkingSlot.mall_id == mall_id) & (ParkingSlot.vehicle_type == VehicleType(vehicle_type))
+            query = query.order_by(case((selected, 0), else_=1), ParkingSlot.id)
+        else:
+            query = query.order_by(ParkingSlot.id)
+        rows = db.execute(query.limit(MAX_PROMPT_SLOTS)).all()
+
+        if not rows:
+            return "No slots available currently."
+
+        # Group slots by mall for better readability
+        mall_slots: Dict[str, list] = {}
+        for row in rows:
+            mall_slots.setdefault(row.mall_name, []).append(
+                f"* Slot ID: {row.id}, Mall: {row.mall_name}, Type: {row.vehicle_type.value}, "
+                f"Number: {row.slot_number}, Rate: ₹{row.hourly_rate}/hour"
+            )
+
+        available_slots_text = ""
+        for mall_name, slots in mall_slots.items():
+            available_slots_text += f"\nSlots at {mall_name}:\n"
+            available_slots_text += "\n".join(slots)
+            available_slots_text += "\n"
+        return available_slots_text
+
+    def user_context(self, db: Session, user_id: str, user_name: Optional[str], context: Dict, parking_rates: str) -> str:
+        """Fill in the per-user part of the system prompt."""
+        return USER_CONTEXT_TEMPLATE.format(
+            user_id=user_id,
+            user_name=user_name or "User",
+            selected_mall=context["selected_mall"] or "Not specified",
+            selected_vehicle_type=context["selected_vehicle_type"] or "Not specified",
+            selected_license_plate=context["selected_license_plate"] or "Not specified",
+            selected_time_period=context["selected_time_period"] or "Not specified",
+            parking_rates=parking_rates,
+            available_slots=self.available_slots_text(db, context["selected_mall_id"], context["selected_vehicle_type"])
+        )
+
+    def tool_system_message(self, user_id: str, user_name: Optional[str], context: Dict) -> str:
+        """Get the compact system prompt for tool-calling mode (no mall list, slot block or booking guide)."""
+        return TOOL_INSTRUCTIONS_TEMPLATE.format(
+            user_id=user_id,
+            user_name=user_name or "User",
+            selected_mall=context["selected_mall"] or "Not specified",
+            selected_vehicle_type=context["selected_vehicle_type"] or "Not specified",
+            selected_license_plate=context["selected_license_plate"] or "Not specified",
+            selected_time_period=context["selected_time_period"] or "Not specified"
+        )
+
+    def invalidate(self, malls: bool = True, slots: bool = True):
+        """Mark the cached blocks stale after mall or slot changes."""
+        with self._lock:
+            if malls:
+                self.catalog_version += 1
+            if malls or slots:
+                self.availability_version += 1
+                self._slots_blocks.clear()
+
+@event.listens_for(Session, "after_flush")
+def _note_prompt_changes(session: Session, flush_context):
+    """Flag sessions that have flushed mall or slot changes."""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Mall):
+            session.info[_MALLS_CHANGED_KEY] = True
+        elif isinstance(obj, ParkingSlot):
+            session.info[_SLOTS_CHANGED_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _refresh_prompt_blocks(session: Session):
+    """Drop the cached blocks once mall or slot changes have committed."""
+    malls = session.info.pop(_MALLS_CHANGED_KEY, False)
+    slots = session.info.pop(_SLOTS_CHANGED_KEY, False)
+    if malls or slots:
+        PromptBuilder().invalidate(malls=malls, slots=slots)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_prompt_changes(session: Session):
+    """Forget changes that were rolled back."""
+    session.info.pop(_MALLS_CHANGED_KEY, None)
+    session.info.pop(_SLOTS_CHANGED_KEY, None)
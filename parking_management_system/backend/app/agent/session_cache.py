@@ -0,0 +1,161 @@
+"""
+Per-user cache of ParkingAgent sessions.
+
+Building a ParkingAgent loads and replays the user's whole chat history from
+disk, so /chat keeps agents between requests instead, keyed by user and
+conversation. Each request binds its own DB session to the cached agent and
+reloads the shared per-user state (pending booking, conversation context) from
+InMemoryStore, so setup cost per message stays constant as history grows.
+
+The cache is LRU-bounded (AGENT_CACHE_SIZE, default 1000) and drops sessions
+idle for longer than AGENT_CACHE_TTL seconds (default 1800). A user's agents
+share one ChatMemoryManager and FileChatHistory, so conversations of the same
+user never overwrite each other's history files.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from .agent import ParkingAgent
+from ..memory.file_chat_history import FileChatHistory
+
+# How long a request waits for another request of the same conversation before
+# falling back to an uncached agent
+CHECKOUT_TIMEOUT = 30
+
+class AgentSession:
+    """A cached agent, with a lock so only one request uses it at a time."""
+
+    def __init__(self, key: Tuple[str, Optional[str]], agent: ParkingAgent, cached: bool = True):
+        self.key = key
+        self.agent = agent
+        self.cached = cached
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+class AgentSessionCache:
+    """Process-wide LRU cache of agent sessions with idle expiry."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AgentSessionCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._sessions = OrderedDict()
+            cls._instance.max_size = int(os.getenv("AGENT_CACHE_SIZE", "1000"))
+            cls._instance.idle_ttl = float(os.getenv("AGENT_CACHE_TTL", "1800"))
+            cls._instance.stats = {"hits": 0, "misses": 0, "evictions": 0, "busy": 0}
+        return cls._instance
+
+    def checkout(
+        self,
+        db: Session,
+        user_id: str,
+        conversation_id: Optional[str] = None,
+        user_name: Optional[str] = None,
+        use_vector_store: bool = False
+    ) -> AgentSession:
+        """Get the agent session for a user's conversation, bound to this request's DB session.
+
+        Must be paired with release().
+        """
+        key = (str(user_id), conversation_id)
+
+        with self._lock:
+            self._evict_expired()
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+                session.last_used = time.monotonic()
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+                existing = self._find_user_agent(key[0])
+
+        if session is None:
+            # Build the agent outside the lock; it reads the user's history from disk
+            agent = self._create_agent(db, user_id, use_vector_store, existing)
+            with self._lock:
+                # Another request may have cached this conversation in the meantime
+                session = self._sessions.get(key)
+                if session is None:
+                    session = AgentSession(key, agent)
+                    self._sessions[key] = session
+                    self._evict_overflow()
+
+        if not session.lock.acquire(timeout=CHECKOUT_TIMEOUT):
+            # Another request still holds this conversation's agent; don't block on it
+            with self._lock:
+                self.stats["busy"] += 1
+            session = AgentSession(key, ParkingAgent(db=db, user_id=user_id, use_vector_store=use_vector_store), cached=False)
+            session.lock.acquire()
+
+        session.agent.bind_request(db, conversation_id=conversation_id, user_name=user_name)
+        return session
+
+    def release(self, session: AgentSession):
+        """Return a checked-out session to the cache."""
+        # Don't keep the request's DB session alive through the cache
+        session.agent.db = None
+        session.last_used = time.monotonic()
+        session.lock.release()
+
+    def get_file_chat(self, user_id: str) -> FileChatHistory:
+        """Get the user's shared FileChatHistory, or a new one if the user has no cached agent."""
+        with self._lock:
+            agent = self._find_user_agent(str(user_id))
+        if agent is not None and hasattr(agent, "file_chat"):
+            return agent.file_chat
+        return FileChatHistory(user_id=user_id)
+
+    def clear(self):
+        """Drop all cached sessions."""
+        with self._lock:
+            self._sessions.clear()
+
+    def _create_agent(self, db: Session, user_id: str, use_vector_store: bool, existing: Optional[ParkingAgent]) -> ParkingAgent:
+        """Create an agent, reusing the memory objects of another of the user's agents if there is one."""
+        if existing is None:
+            return ParkingAgent(db=db, user_id=user_id, use_vector_store=use_vector_store)
+        return ParkingAgent(
+            db=db,
+            user_id=user_id,
+            use_vector_store=use_vector_store,
+            memory_manager=existing.memory_manager,
+            file_chat=getattr(existing, "file_chat", None),
+            vector_store=getattr(existing, "vector_store", None)
+        )
+
+    def _find_user_agent(self, user_id: str) -> Optional[ParkingAgent]:
+        """Find any cached agent for a user (caller holds the lock)."""
+        for (cached_user_id, _), session in reversed(self._sessions.items()):
+            if cached_user_id == user_id:
+                return session.agent
+        return None
+
+    def _evict_expired(self):
+        """Drop sessions idle past the TTL (caller holds the lock)."""
+        cutoff = time.monotonic() - self.idle_ttl
+        # Sessions are in least-recently-used order, so stop at the first fresh one
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.last_used > cutoff:
+                break
+            del self._sessions[key]
+            self.stats["evictions"] += 1
+
+    def _evict_overflow(self):
+        """Drop least recently used sessions beyond the size limit (caller holds the lock)."""
+        while len(self._sessions) > self.max_size:
+            self._sessions.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def info(self) -> Dict[str, int]:
+        """Get cache size and hit/miss counters."""
+        with self._lock:
+            return {"size": len(self._sessions), **self.stats}
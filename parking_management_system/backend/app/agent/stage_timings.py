@@ -0,0 +1,69 @@
+"""
+Per-stage timings of agent requests.
+
+StageTimer marks how long each stage of one request took (routing, cache
+lookup, prompt assembly, history, LLM call, save); StageTimings aggregates
+them by path (direct, cached or llm) for GET /llm/metrics.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+class StageTimer:
+    """Times consecutive stages of one request."""
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def mark(self, stage: str):
+        """End the current stage, crediting the time since the previous mark to it."""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last
+        self.last = now
+
+    def elapsed(self) -> float:
+        return self.last - self.started
+
+    def summary(self) -> str:
+        return ", ".join(f"{stage} {1000 * seconds:.1f}" for stage, seconds in self.stages.items())
+
+class StageTimings:
+    """Process-wide totals of per-stage request timings."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StageTimings, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._totals = {}
+        return cls._instance
+
+    def record(self, timer: StageTimer, path: str):
+        """Add a finished request's stage times under its path (direct, cached or llm)."""
+        with self._lock:
+            totals = self._totals.setdefault(path, {"requests": 0, "stages": {}})
+            totals["requests"] += 1
+            for stage, seconds in list(timer.stages.items()) + [("total", timer.elapsed())]:
+                count, total, maximum = totals["stages"].get(stage, (0, 0.0, 0.0))
+                totals["stages"][stage] = (count + 1, total + seconds, max(maximum, seconds))
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+    def info(self) -> Dict[str, Any]:
+        """Get request counts and average/max milliseconds per stage, by path."""
+        with self._lock:
+            return {
+                path: {
+                    "requests": totals["requests"],
+                    "stages_ms": {
+                        stage: {"avg": round(1000 * total / count, 2), "max": round(1000 * maximum, 2)}
+                        for stage, (count, total, maximum) in totals["stages"].items()
+                    }
+                }
+                for path, totals in self._totals.items()
+            }
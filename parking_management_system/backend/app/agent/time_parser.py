@@ -0,0 +1,353 @@
+"""
+Natural-language booking time parser.
+
+Turns phrases like "tomorrow at 5 pm for 2 hours", "friday 3-5 pm",
+"25 oct from 10:30 to 13:00" or "next monday evening for 90 minutes" into a
+start and end datetime. Parsing happens in two steps:
+
+- parse_time_phrase() matches a text against precompiled grammars for dates,
+  relative days, weekdays, clock times, "from X to Y" ranges and durations,
+  producing a TimeSpec that doesn't depend on the current time. Parses are
+  memoized, since the same phrase is re-read on every turn of a booking.
+- resolve_time_period() places a TimeSpec relative to a reference time.
+
+Missing parts fall back to the agent's old defaults: 5 pm, for 2 hours. A
+time that has already passed today, with no day given, means tomorrow.
+Numeric dates are day first (25/10/2026), as used in India. A date that
+doesn't exist ("31/04/2027", "30 february") raises InvalidDateError when
+resolved, so the user is asked for the date again rather than booked on
+another day.
+"""
+
+import math
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+DEFAULT_START = (17, 0)
+DEFAULT_DURATION_MINUTES = 120
+
+# Start hour assumed for a part of the day mentioned without a clock time
+PARTS_OF_DAY = {"morning": 9, "afternoon": 14, "evening": 18, "night": 20, "tonight": 20}
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tues": 1, "tue": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thurs": 3, "thur": 3, "thu": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sept": 9, "sep": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+}
+
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+
+_MONTH = "(?P<month_name>" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_WEEKDAY = "(?P<weekday>" + "|".join(sorted(WEEKDAYS, key=len, reverse=True)) + ")"
+_ORDINAL = r"(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s*(?P<year>\d{4}))?"
+_MERIDIEM = r"(?:\s*(?P<{0}>[ap])\.?m\b\.?)"
+_CLOCK = r"(?P<{0}_hour>\d{{1,2}})(?::(?P<{0}_minute>\d{{2}}))?" + _MERIDIEM.format("{0}_meridiem") + "?"
+_CLOCK_OR_WORD = r"(?:(?P<{0}_word>noon|midnight)|" + _CLOCK + ")"
+
+DATE_PATTERNS = [
+    re.compile(r"\b(?:on\s+)?(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b"),
+    # "-" and "." only with a year, so "3-5 pm" and "1.5 hours" aren't dates
+    re.compile(
+        r"\b(?:on\s+)?(?P<day>\d{1,2})(?P<separator>[/.-])(?P<month>\d{1,2})"
+        r"(?:(?P=separator)(?P<year>\d{4}|\d{2}))?\b(?!\s*[ap]\.?m\b)"
+    ),
+    re.compile(r"\b(?:on\s+)?(?:the\s+)?" + _ORDINAL + r"\s+(?:of\s+)?" + _MONTH + _YEAR + r"\b"),
+    re.compile(r"\b(?:on\s+)?" + _MONTH + r"\s+(?:the\s+)?" + _ORDINAL + _YEAR + r"\b"),
+]
+RELATIVE_DAY_PATTERN = re.compile(
+    r"\b(?:(?P<after>day after tomorrow)|(?P<today>today|tonight)|(?P<tomorrow>tomorrow|tmrw|tmr)"
+    r"|in\s+(?P<days>\d+|a|one|two|three|four|five|six)\s+days?|(?P<next_week>next week))\b"
+)
+WEEKDAY_PATTERN = re.compile(r"\b(?:on\s+)?(?:(?P<qualifier>next|this|coming)\s+)?" + _WEEKDAY + r"\b")
+RANGE_PATTERN = re.compile(
+    r"\b(?:(?P<lead>from|between)\s+)?" + _CLOCK_OR_WORD.format("start")
+    + r"\s*(?:to|until|till|-|–|and)\s*" + _CLOCK_OR_WORD.format("end")
+    + r"(?!\s*(?:hours?|hrs?|h|minutes?|mins?)\b)"
+)
+DURATION_PATTERN = re.compile(
+    r"\b(?:for\s+)?(?:(?P<half>half an?\s+hour)|(?P<amount>\d+(?:\.\d+)?|an?|one|two|three|four|five|six)"
+    r"\s*(?P<unit>hours?|hrs?|h|minutes?|mins?)\b(?:\s+and\s+a\s+half)?)"
+)
+CLOCK_PATTERN = re.compile(
+    r"\b(?:at\s+)?(?:(?P<time_word>noon|midnight)|"
+    r"(?P<time_hour>\d{1,2})(?::(?P<time_minute>\d{2}))?" + _MERIDIEM.format("time_meridiem") + r"|"
+    r"(?P<clock24_hour>\d{1,2}):(?P<clock24_minute>\d{2})|at\s+(?P<bare_hour>\d{1,2})(?![\d:/.-]))"
+)
+PART_OF_DAY_PATTERN = re.compile(r"\b(?:in the\s+|this\s+)?(?P<part>morning|afternoon|evening|night)\b")
+
+class InvalidDateError(ValueError):
+    """A time phrase names a date that doesn't exist."""
+
+class TimeSpec(NamedTuple):
+    """What a phrase says about a booking time, before it is placed on the calendar."""
+    # ("relative", days) | ("weekday", weekday, next) | ("date", year, month, day) | ("invalid", date as written)
+    day: Optional[Tuple]
+    start: Optional[Tuple[int, int]]     # (hour, minute)
+    end: Optional[Tuple[int, int]]       # (hour, minute), for "from X to Y"
+    duration_minutes: Optional[int]
+    spans: Tuple[Tuple[int, int], ...]   # character spans of the matched pieces
+
+    def fields(self) -> List[str]:
+        """Names of the parts the phrase specifies."""
+        names = []
+        if self.day:
+            names.append("day")
+        if self.start:
+            names.append("start")
+        if self.end or self.duration_minutes:
+            names.append("length")
+        return names
+
+def _hour(hour: int, minute: int, meridiem: Optional[str], word: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """24-hour (hour, minute) from a clock reading, or None if it isn't a valid time."""
+    if word == "noon":
+        return 12, 0
+    if word == "midnight":
+        return 0, 0
+    if minute > 59:
+        return None
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        if meridiem == "p" and hour < 12:
+            hour += 12
+        elif meridiem == "a" and hour == 12:
+            hour = 0
+    elif hour > 23:
+        return None
+    return hour, minute
+
+def _bare_hour(hour: int) -> Optional[Tuple[int, int]]:
+    """Read "at 5" the way people book parking: 1-7 is afternoon or evening."""
+    if not 1 <= hour <= 12:
+        return None
+    return (hour + 12, 0) if hour <= 7 else (hour, 0)
+
+def _free(taken: List[Tuple[int, int]], start: int, end: int) -> bool:
+    return all(end <= taken_start or start >= taken_end for taken_start, taken_end in taken)
+
+def _amount(text: str) -> float:
+    return float(NUMBER_WORDS[text]) if text in NUMBER_WORDS else float(text)
+
+@lru_cache(maxsize=2048)
+def parse_time_phrase(text: str) -> Optional[TimeSpec]:
+    """Parse the time information in a text, or return None if it has none.
+
+    Matching is case-insensitive; spans refer to positions in the text.
+    """
+    text = text.lower()
+    taken: List[Tuple[int, int]] = []
+    day = start = end = None
+    duration = None
+
+    # Dates first, so their digits aren't read as times
+    for pattern in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            if day or not _free(taken, *match.span()):
+                continue
+            groups = match.groupdict()
+            if groups.get("separator") in ("-", ".") and not groups["year"]:
+                continue
+            month = MONTHS[groups["month_name"]] if groups.get("month_name") else int(groups["month"])
+            year = int(groups["year"]) if groups.get("year") else None
+            if year is not None and year < 100:
+                year += 2000
+            try:
+                date(year or 2000, month, int(groups["day"]))
+                day = ("date", year, month, int(groups["day"]))
+            except ValueError:
+                # Keep the date as written, so resolving it is rejected instead of dropping it
+                day = ("invalid", re.sub(r"^on\s+", "", match.group(0)))
+            taken.append(match.span())
+
+    for match in RANGE_PATTERN.finditer(text):
+        if not _free(taken, *match.span()):
+            continue
+        groups = match.groupdict()
+        # Bare numbers ("3-5") only count as a time range with a meridiem, a colon or "from"
+        explicit = groups["lead"] or groups["start_word"] or groups["end_word"] or any(
+            groups[name] for name in ("start_meridiem", "end_meridiem", "start_minute", "end_minute")
+        )
+        if not explicit:
+            continue
+        start_meridiem = groups["start_meridiem"] or (groups["end_meridiem"] if not groups["start_minute"] else None)
+        range_start = _hour(int(groups["start_hour"] or 0), int(groups["start_minute"] or 0), start_meridiem, groups["start_word"])
+        range_end = _hour(int(groups["end_hour"] or 0), int(groups["end_minute"] or 0), groups["end_meridiem"], groups["end_word"])
+        if not range_start or not range_end:
+            continue
+        if groups["start_meridiem"] is None and groups["end_meridiem"] and range_start >= range_end and range_start[0] >= 12:
+            # "11 to 1 pm" starts in the morning
+            range_start = (range_start[0] - 12, range_start[1])
+        if not groups["start_meridiem"] and not groups["end_meridiem"] and not groups["start_word"]:
+            # "from 5 to 7" without am/pm reads like the bare hours in "at 5"
+            if not groups["start_minute"] and range_start[0] <= 12:
+                range_start = _bare_hour(range_start[0]) or range_start
+            if not groups["end_minute"] and range_end[0] <= 12 and range_end <= range_start:
+                range_end = _bare_hour(range_end[0]) or range_end
+        start, end = range_start, range_end
+        taken.append(match.span())
+        break
+
+    for match in DURATION_PATTERN.finditer(text):
+        if not _free(taken, *match.span()):
+            continue
+        groups = match.groupdict()
+        if groups["half"]:
+            minutes = 30.0
+        else:
+            minutes = _amount(groups["amount"]) * (60 if groups["unit"].startswith("h") else 1)
+            if match.group(0).endswith("and a half"):
+                minutes += 30 if groups["unit"].startswith("h") else 0.5
+        duration = (duration or 0) + minutes
+        taken.append(match.span())
+
+    if start is None:
+        for match in CLOCK_PATTERN.finditer(text):
+            if not _free(taken, *match.span()):
+                continue
+            groups = match.groupdict()
+            if groups["bare_hour"]:
+                clock = _bare_hour(int(groups["bare_hour"]))
+            elif groups["clock24_hour"]:
+                clock = _hour(int(groups["clock24_hour"]), int(groups["clock24_minute"]), None)
+            else:
+                clock = _hour(int(groups["time_hour"] or 0), int(groups["time_minute"] or 0), groups["time_meridiem"], groups["time_word"])
+            if clock:
+                start = clock
+                taken.append(match.span())
+                break
+
+    if day is None:
+        match = RELATIVE_DAY_PATTERN.search(text)
+        if match and _free(taken, *match.span()):
+            groups = match.groupdict()
+            if groups["after"]:
+                day = ("relative", 2)
+            elif groups["today"]:
+                day = ("relative", 0)
+                if groups["today"] == "tonight" and start is None:
+                    start = (PARTS_OF_DAY["tonight"], 0)
+            elif groups["tomorrow"]:
+                day = ("relative", 1)
+            elif groups["next_week"]:
+                day = ("relative", 7)
+            else:
+                day = ("relative", int(_amount(groups["days"])))
+            taken.append(match.span())
+
+    if day is None:
+        match = WEEKDAY_PATTERN.search(text)
+        if match and _free(taken, *match.span()):
+            day = ("weekday", WEEKDAYS[match.group("weekday")], match.group("qualifier") == "next")
+            taken.append(match.span())
+
+    match = PART_OF_DAY_PATTERN.search(text)
+    if match and _free(taken, *match.span()):
+        part_hour = PARTS_OF_DAY[match.group("part")]
+        if start is None:
+            start = (part_hour, 0)
+        elif start[0] < 12 and part_hour >= 14 and not re.search(r"\b[ap]\.?m\b", text):
+            # "at 9 in the evening"
+            start = (start[0] + 12, start[1])
+            if end and end[0] < 12:
+                end = (end[0] + 12, end[1])
+        taken.append(match.span())
+
+    if not taken:
+        return None
+    duration_minutes = int(round(duration)) if duration else None
+    return TimeSpec(day, start, end, duration_minutes, tuple(sorted(taken)))
+
+def resolve_time_period(text: Optional[str], reference: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Get the (start, end) a time phrase means, relative to a reference time (default now).
+
+    Parts the phrase leaves out get the defaults: 5 pm, for 2 hours. Raises
+    InvalidDateError if the phrase names a date that doesn't exist.
+    """
+    reference = reference or datetime.now()
+    spec = parse_time_phrase(text) if text else None
+    if spec is None:
+        spec = TimeSpec(None, None, None, None, ())
+    if spec.day and spec.day[0] == "invalid":
+        raise InvalidDateError(f"{spec.day[1]} isn't a valid date")
+
+    hour, minute = spec.start or DEFAULT_START
+    day = spec.day
+    if day is None:
+        booking_date = reference.date()
+        if datetime.combine(booking_date, datetime.min.time()).replace(hour=hour, minute=minute) <= reference:
+            # The time has passed today, so it means tomorrow
+            booking_date += timedelta(days=1)
+    elif day[0] == "relative":
+        booking_date = reference.date() + timedelta(days=day[1])
+    elif day[0] == "weekday":
+        days_ahead = (day[1] - reference.weekday()) % 7
+        if days_ahead == 0:
+            passed = reference.replace(hour=hour, minute=minute, second=0, microsecond=0) <= reference
+            if day[2] or passed:
+                days_ahead = 7
+        booking_date = reference.date() + timedelta(days=days_ahead)
+    else:
+        _, year, month, day_of_month = day
+        if year is None:
+            booking_date = _next_occurrence(month, day_of_month, reference.date())
+        else:
+            booking_date = date(year, month, day_of_month)
+
+    start = datetime(booking_date.year, booking_date.month, booking_date.day, hour, minute)
+    if spec.end:
+        end = start.replace(hour=spec.end[0], minute=spec.end[1])
+        if end <= start:
+            # "10 pm to 1 am" ends the next day
+            end += timedelta(days=1)
+    else:
+        end = start + timedelta(minutes=spec.duration_minutes or DEFAULT_DURATION_MINUTES)
+    return start, end
+
+def _next_occurrence(month: int, day_of_month: int, today: date) -> date:
+    """Get the first date with this month and day that isn't in the past (29 February waits for a leap year)."""
+    year = today.year
+    while True:
+        try:
+            candidate = date(year, month, day_of_month)
+        except ValueError:
+            candidate = None
+        if candidate is not None and candidate >= today:
+            return candidate
+        year += 1
+
+def duration_hours(start: datetime, end: datetime) -> int:
+    """Whole hours billed for a booking, rounded up."""
+    return max(1, math.ceil((end - start).total_seconds() / 3600))
+
+def find_time_phrase(text: str) -> Optional[str]:
+    """Get the time phrase in a query (its matched pieces, in order), or None."""
+    spec = parse_time_phrase(text)
+    if spec is None:
+        return None
+    return " ".join(text[start:end].strip() for start, end in spec.spans)
+
+def combine_time_phrases(previous: Optional[str], new: str) -> str:
+    """Merge a new time phrase with the one already in the conversation.
+
+    "at 5 pm" after "tomorrow" means "tomorrow at 5 pm"; a phrase that
+    restates a part the previous one had replaces it.
+    """
+    if not previous:
+        return new
+    previous_spec, new_spec = parse_time_phrase(previous), parse_time_phrase(new)
+    if previous_spec is None or new_spec is None:
+        return new
+    if set(previous_spec.fields()) & set(new_spec.fields()):
+        return new
+    return f"{previous} {new}"
@@ -0,0 +1,172 @@
+"""
+Function-calling tools for the agent's LLM.
+
+With LLM_TOOL_CALLING=1 the system prompt no longer carries the mall list
+and up to 20 formatted slot lines on every turn. The model is given the
+tools below instead and the agent runs them only when the model asks, so
+turns that don't need live data (most of them) send a much smaller prompt.
+
+Tools are thin wrappers around the agent's existing get_available_slots,
+get_parking_rates and get_user_bookings methods; create_booking prepares a
+pending booking the same way the local booking flow does, so nothing is
+booked until the user replies "Yes". Results go back to the model as compact
+JSON.
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+from .gazetteer import VEHICLE_TYPES, get_gazetteer
+from .time_parser import InvalidDateError, resolve_time_period
+
+# Rounds of tool calls allowed before the model has to answer
+MAX_TOOL_ROUNDS = 4
+# Most slots returned to the model by one get_available_slots call
+MAX_TOOL_SLOTS = 10
+
+# Tools whose results depend on live availability or the user's bookings; answers using them aren't cached
+LIVE_DATA_TOOLS = {"get_available_slots", "get_user_bookings", "create_booking"}
+
+_MALL_PARAMETER = {"type": "string", "description": "Mall name (or ID); defaults to the mall already selected in the conversation"}
+_VEHICLE_PARAMETER = {"type": "string", "enum": VEHICLE_TYPES, "description": "Vehicle type"}
+_TIME_PARAMETER = {"type": "string", "description": "When, in the user's words, e.g. \"tomorrow at 5 pm for 2 hours\" or \"friday 3-5 pm\""}
+
+TOOL_DEFINITIONS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_available_slots",
+            "description": "List parking slots free for a time period",
+            "parameters": {
+                "type": "object",
+                "properties": {"mall": _MALL_PARAMETER, "vehicle_type": _VEHICLE_PARAMETER, "time_period": _TIME_PARAMETER}
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_parking_rates",
+            "description": "Get hourly parking rates per vehicle type, for one mall or all malls",
+            "parameters": {"type": "object", "properties": {"mall": _MALL_PARAMETER}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_user_bookings",
+            "description": "List the user's confirmed bookings",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_booking",
+            "description": "Hold a free slot for the user, who then confirms the booking by replying \"Yes\"",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "mall": _MALL_PARAMETER,
+                    "vehicle_type": _VEHICLE_PARAMETER,
+                    "license_plate": {"type": "string", "description": "Vehicle license plate, e.g. KA01AB1234"},
+                    "time_period": _TIME_PARAMETER,
+                    "slot_id": {"type": "integer", "description": "A specific slot ID, if the user picked one"}
+                }
+            }
+        }
+    },
+]
+
+TOOL_PARAMETERS = {
+    definition["function"]["name"]: set(definition["function"]["parameters"]["properties"])
+    for definition in TOOL_DEFINITIONS
+}
+
+def tool_calling_enabled() -> bool:
+    """Whether the agent should use function calling instead of the full system prompt."""
+    return os.getenv("LLM_TOOL_CALLING", "0").lower() in ("1", "true", "yes")
+
+def _resolve_mall(agent, mall: Optional[Any]) -> Optional[int]:
+    """Get a mall ID from a name, alias or ID given by the model, or None."""
+    if mall is None or mall == "":
+        return None
+    if isinstance(mall, int) or str(mall).strip().isdigit():
+        return int(mall)
+    entities = get_gazetteer(agent.db).extract(str(mall))
+    for key in ("mall_by_id", "mall_by_name", "mall_by_alias", "mall_by_fuzzy"):
+        if entities.get(key):
+            return entities[key][0]
+    return None
+
+def _get_available_slots(agent, mall=None, vehicle_type=None, time_period=None) -> Dict[str, Any]:
+    mall_id = _resolve_mall(agent, mall)
+    if mall and mall_id is None:
+        return {"success": False, "message": f"Unknown mall: {mall}"}
+    start_time = end_time = None
+    if time_period:
+        try:
+            start_time, end_time = resolve_time_period(time_period)
+        except InvalidDateError as e:
+            return {"success": False, "message": f"{e}; ask the user for the date again"}
+    result = agent.get_available_slots(mall_id=mall_id, vehicle_type=vehicle_type, start_time=start_time, end_time=end_time)
+    slots = [
+        {key: slot[key] for key in ("id", "mall_name", "slot_number", "vehicle_type", "hourly_rate")}
+        for slot in result["slots"][:MAX_TOOL_SLOTS]
+    ]
+    return {"success": result["success"], "count": result["count"], "slots": slots, "message": result["message"]}
+
+def _get_parking_rates(agent, mall=None) -> Dict[str, Any]:
+    mall_id = _resolve_mall(agent, mall)
+    if mall and mall_id is None:
+        return {"success": False, "message": f"Unknown mall: {mall}"}
+    return agent.get_parking_rates(mall_id=mall_id)
+
+def _get_user_bookings(agent) -> Dict[str, Any]:
+    return agent.get_user_bookings()
+
+def _create_booking(agent, mall=None, vehicle_type=None, license_plate=None, time_period=None, slot_id=None) -> Dict[str, Any]:
+    context = agent.conversation_context
+    if mall:
+        mall_id = _resolve_mall(agent, mall)
+        if mall_id is None or mall_id not in get_gazetteer(agent.db).mall_names_by_id:
+            return {"success": False, "message": f"Unknown mall: {mall}"}
+        context["selected_mall_id"] = mall_id
+        context["selected_mall"] = get_gazetteer(agent.db).mall_names_by_id[mall_id]
+    if vehicle_type:
+        context["selected_vehicle_type"] = vehicle_type
+    if license_plate:
+        context["selected_license_plate"] = license_plate.upper().replace(" ", "")
+    if time_period:
+        context["selected_time_period"] = time_period
+    if slot_id:
+        context["pending_slot_id"] = int(slot_id)
+    agent.store.set_conversation_context(agent.user_id, context)
+    # The local booking flow asks for anything missing and holds the slot for confirmation
+    previous_pending = agent.pending_booking
+    message = agent._create_booking_from_context().strip()
+    held = agent.pending_booking is not None and agent.pending_booking is not previous_pending
+    return {"message": message, "awaiting_confirmation": held}
+
+TOOL_FUNCTIONS = {
+    "get_available_slots": _get_available_slots,
+    "get_parking_rates": _get_parking_rates,
+    "get_user_bookings": _get_user_bookings,
+    "create_booking": _create_booking,
+}
+
+def run_tool(agent, name: str, arguments: str) -> str:
+    """Run a tool call for the model and return its result as JSON."""
+    function = TOOL_FUNCTIONS.get(name)
+    if function is None:
+        result = {"success": False, "message": f"Unknown tool: {name}"}
+    else:
+        try:
+            parsed = json.loads(arguments or "{}")
+            # Arguments the model invents are dropped rather than failing the call
+            result = function(agent, **{key: value for key, value in parsed.items() if key in TOOL_PARAMETERS[name]})
+        except Exception as e:
+            print(f"Error running tool {name}: {str(e)}")
+            result = {"success": False, "message": f"Error running {name}: {str(e)}"}
+    return json.dumps(result, separators=(",", ":"), ensure_ascii=False, default=str)
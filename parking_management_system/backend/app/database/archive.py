@@ -0,0 +1,153 @@
+"""
+Hot/cold split for bookings.
+
+Bookings that ended before the retention horizon are moved from the hot
+bookings table into bookings_archive in small batches, each in its own
+transaction, so writers are never blocked for long. Overlap checks and
+active-booking lookups only ever need the hot table. Archiving leaves the
+booking_view read model untouched, so booking listings still include archived
+bookings. The bulk delete bypasses the session's change tracking, so each batch
+writes its delete tombstones to change_log itself; delta /sync clients then drop
+archived bookings just like deleted ones.
+
+Archived ids must never be handed out again, or a new booking would replace
+the archived one in booking_view. On SQLite, bookings tables created before
+the table used AUTOINCREMENT are rebuilt with it before the first batch, and
+the id sequence is moved past every archived id. Bookings with a payment stay
+in the hot table, since payments reference them.
+
+Run periodically (e.g. from cron):
+    python -m app.database.archive --retention-days 90
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, insert, delete, exists, func, literal, text
+from sqlalchemy.orm import Session
+
+from .models import Booking, BookingArchive, BookingStatus, Payment, ChangeLog
+from .sync import ENTITY_BOOKING, OP_DELETE
+
+# Columns copied from bookings to bookings_archive
+ARCHIVED_COLUMNS = [
+    "id", "user_id", "vehicle_id", "parking_slot_id", "start_time", "end_time",
+    "status", "total_amount", "created_at", "updated_at"
+]
+
+def default_retention_days() -> int:
+    """Get the retention horizon (in days) for the hot bookings table."""
+    return int(os.getenv("BOOKING_RETENTION_DAYS", "90"))
+
+def ensure_booking_id_sequence(db: Session):
+    """Make sure SQLite never reuses booking ids, including archived ones.
+
+    Without AUTOINCREMENT SQLite hands out max(id) + 1, so deleting the newest
+    bookings would reuse their ids. Other backends' sequences never step back.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+
+    table_sql = db.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'bookings'")).scalar()
+    if table_sql and "AUTOINCREMENT" not in table_sql.upper():
+        print("Rebuilding the bookings table with AUTOINCREMENT")
+        columns = ", ".join(column.name for column in Booking.__table__.columns)
+        index_names = db.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'bookings' AND sql IS NOT NULL"
+        )).scalars().all()
+        try:
+            for index_name in index_names:
+                db.execute(text(f'DROP INDEX "{index_name}"'))
+            # Keep references to bookings in other tables (payments) pointing at the new table
+            db.execute(text("PRAGMA legacy_alter_table = ON"))
+            db.execute(text("ALTER TABLE bookings RENAME TO bookings_old"))
+            Booking.__table__.create(db.connection())
+            db.execute(text(f"INSERT INTO bookings ({columns}) SELECT {columns} FROM bookings_old"))
+            db.execute(text("DROP TABLE bookings_old"))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.execute(text("PRAGMA legacy_alter_table = OFF"))
+
+    # Move the sequence past archived ids too; it only tracks ids inserted into bookings
+    highest_id = max(
+        db.execute(select(func.max(Booking.id))).scalar() or 0,
+        db.execute(select(func.max(BookingArchive.id))).scalar() or 0
+    )
+    sequence = db.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'bookings'")).scalar()
+    if sequence is None:
+        db.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('bookings', :seq)"), {"seq": highest_id})
+    elif sequence < highest_id:
+        db.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'bookings'"), {"seq": highest_id})
+    db.commit()
+
+def archive_bookings(db: Session, retention_days: Optional[int] = None, batch_size: int = 1000) -> int:
+    """Move bookings that ended before the retention horizon into the archive.
+
+    Pending bookings and bookings with a payment are left alone. Returns the
+    number of bookings archived.
+    """
+    if retention_days is None:
+        retention_days = default_retention_days()
+    # Booking times are stored in server local time
+    horizon = datetime.now() - timedelta(days=retention_days)
+
+    ensure_booking_id_sequence(db)
+
+    archived = 0
+    while True:
+        rows = db.execute(
+            select(Booking.id, Booking.user_id)
+            .where(
+                Booking.end_time < horizon,
+                Booking.status != BookingStatus.PENDING,
+                ~exists().where(Payment.booking_id == Booking.id)
+            )
+            .order_by(Booking.id)
+            .limit(batch_size)
+        ).all()
+
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+
+        try:
+            # Copy then delete inside one transaction, so a booking is always in exactly one table
+            booking_columns = [getattr(Booking, column) for column in ARCHIVED_COLUMNS]
+            db.execute(
+                insert(BookingArchive).from_select(
+                    ARCHIVED_COLUMNS + ["archived_at"],
+                    select(*booking_columns, literal(datetime.utcnow())).where(Booking.id.in_(ids))
+                )
+            )
+            db.execute(delete(Booking).where(Booking.id.in_(ids)))
+            # Core deletes skip the after_flush hook in app.database.sync, so record the tombstones here
+            db.execute(insert(ChangeLog), [
+                {"entity_type": ENTITY_BOOKING, "entity_id": row.id, "user_id": row.user_id, "operation": OP_DELETE}
+                for row in rows
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        archived += len(ids)
+        print(f"Archived {archived} bookings so far")
+
+    return archived
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Archive bookings that ended before the retention horizon")
+    parser.add_argument("--retention-days", type=int, default=None, help="Keep bookings that ended within this many days in the hot table")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Bookings moved per transaction")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    count = archive_bookings(db, retention_days=args.retention_days, batch_size=args.batch_size)
+    db.close()
+    print(f"Archived {count} bookings")
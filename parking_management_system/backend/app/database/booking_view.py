@@ -0,0 +1,211 @@
+"""
+Maintenance of the booking_view read model.
+
+booking_view holds one row per booking with the mall, slot and vehicle
+details already joined in. It is written from the session's after_flush
+hook, so it commits (or rolls back) in the same transaction as the booking
+write that changed it. Changes to a vehicle, slot or mall are pushed to the
+rows that copy their details.
+
+Archiving a booking (archive.py) leaves its booking_view row in place, so
+the view covers booking history across the hot table and the archive.
+"""
+
+from datetime import datetime
+from typing import Dict, Any, Optional
+from sqlalchemy import event, select, insert, update, delete, func
+from sqlalchemy.orm import Session
+
+from .models import Booking, BookingArchive, BookingView, ParkingSlot, Mall, Vehicle
+from .archive import ARCHIVED_COLUMNS
+
+def _duration_hours(start_time: Optional[datetime], end_time: Optional[datetime]) -> float:
+    """Calculate a booking's duration in hours."""
+    if not start_time or not end_time:
+        return 0
+    return round((end_time - start_time).total_seconds() / 3600, 2)
+
+def _duration_hours_sql(dialect_name: str, start_time, end_time):
+    """SQL expression for a booking's duration in hours, or None if the dialect has none here."""
+    if dialect_name == "sqlite":
+        hours = (func.julianday(end_time) - func.julianday(start_time)) * 24
+    elif dialect_name == "postgresql":
+        hours = func.extract("epoch", end_time - start_time) / 3600
+    else:
+        return None
+    return func.coalesce(func.round(hours, 2), 0)
+
+def _slot_details(connection, slot_id: Optional[int]) -> Dict[str, Any]:
+    """Look up the slot and mall columns copied into the view."""
+    row = connection.execute(
+        select(
+            ParkingSlot.slot_number, ParkingSlot.floor, ParkingSlot.section,
+            Mall.id.label("mall_id"), Mall.name.label("mall_name")
+        )
+        .select_from(ParkingSlot)
+        .outerjoin(Mall, Mall.id == ParkingSlot.mall_id)
+        .where(ParkingSlot.id == slot_id)
+    ).first()
+    return dict(row._mapping) if row else {}
+
+def _vehicle_details(connection, vehicle_id: Optional[int]) -> Dict[str, Any]:
+    """Look up the vehicle columns copied into the view."""
+    row = connection.execute(
+        select(
+            Vehicle.license_plate, Vehicle.vehicle_type,
+            Vehicle.make.label("vehicle_make"), Vehicle.model.label("vehicle_model")
+        ).where(Vehicle.id == vehicle_id)
+    ).first()
+    return dict(row._mapping) if row else {}
+
+def build_view_row(connection, booking) -> Dict[str, Any]:
+    """Build the booking_view row for a booking (or an archived booking row)."""
+    view_row = {
+        "booking_id": booking.id,
+        "user_id": booking.user_id,
+        "vehicle_id": booking.vehicle_id,
+        "parking_slot_id": booking.parking_slot_id,
+        "start_time": booking.start_time,
+        "end_time": booking.end_time,
+        "duration_hours": _duration_hours(booking.start_time, booking.end_time),
+        "status": booking.status,
+        "total_amount": booking.total_amount,
+        "created_at": booking.created_at,
+        "updated_at": booking.updated_at,
+        "mall_id": None,
+        "mall_name": None,
+        "slot_number": None,
+        "floor": None,
+        "section": None,
+        "license_plate": None,
+        "vehicle_type": None,
+        "vehicle_make": None,
+        "vehicle_model": None
+    }
+    view_row.update(_slot_details(connection, booking.parking_slot_id))
+    view_row.update(_vehicle_details(connection, booking.vehicle_id))
+    return view_row
+
+def _upsert(connection, view_row: Dict[str, Any]):
+    """Replace a booking's row in the view."""
+    connection.execute(delete(BookingView).where(BookingView.booking_id == view_row["booking_id"]))
+    connection.execute(insert(BookingView).values(**view_row))
+
+@event.listens_for(Session, "after_flush")
+def _sync_booking_view(session: Session, flush_context):
+    """Apply this flush's booking, vehicle, slot and mall changes to the view."""
+    connection = None
+
+    for obj in list(session.new) + list(session.dirty):
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        connection = connection or session.connection()
+
+        if isinstance(obj, Booking):
+            _upsert(connection, build_view_row(connection, obj))
+        elif isinstance(obj, Vehicle) and obj in session.dirty:
+            connection.execute(
+                update(BookingView)
+                .where(BookingView.vehicle_id == obj.id)
+                .values(
+                    license_plate=obj.license_plate,
+                    vehicle_type=obj.vehicle_type,
+                    vehicle_make=obj.make,
+                    vehicle_model=obj.model
+                )
+            )
+        elif isinstance(obj, ParkingSlot) and obj in session.dirty:
+            values = {"slot_number": obj.slot_number, "floor": obj.floor, "section": obj.section}
+            values.update({
+                key: value
+                for key, value in _slot_details(connection, obj.id).items()
+                if key in ("mall_id", "mall_name")
+            })
+            connection.execute(
+                update(BookingView)
+                .where(BookingView.parking_slot_id == obj.id)
+                .values(**values)
+            )
+        elif isinstance(obj, Mall) and obj in session.dirty:
+            connection.execute(
+                update(BookingView)
+                .where(BookingView.mall_id == obj.id)
+                .values(mall_name=obj.name)
+            )
+
+    for obj in session.deleted:
+        if isinstance(obj, Booking):
+            connection = connection or session.connection()
+            connection.execute(delete(BookingView).where(BookingView.booking_id == obj.id))
+
+def rebuild_booking_view(db: Session, chunk_size: int = 50000) -> int:
+    """Rebuild the view from the bookings and bookings_archive tables.
+
+    Used to backfill databases created before the view existed and after bulk
+    loads that bypass the session hooks. Returns the number of rows written.
+    """
+    connection = db.connection()
+    connection.execute(delete(BookingView))
+
+    count = 0
+    for model in (Booking, BookingArchive):
+        # One joined query per table
+        joined = (
+            select(
+                *[getattr(model, column) for column in ARCHIVED_COLUMNS],
+                ParkingSlot.slot_number, ParkingSlot.floor, ParkingSlot.section,
+                Mall.id.label("mall_id"), Mall.name.label("mall_name"),
+                Vehicle.license_plate, Vehicle.vehicle_type,
+                Vehicle.make.label("vehicle_make"), Vehicle.model.label("vehicle_model")
+            )
+            .select_from(model)
+            .outerjoin(ParkingSlot, ParkingSlot.id == model.parking_slot_id)
+            .outerjoin(Mall, Mall.id == ParkingSlot.mall_id)
+            .outerjoin(Vehicle, Vehicle.id == model.vehicle_id)
+        )
+
+        duration = _duration_hours_sql(connection.dialect.name, model.start_time, model.end_time)
+        if duration is not None:
+            # Copy entirely inside the database
+            columns = ["booking_id"] + ARCHIVED_COLUMNS[1:] + [
+                "slot_number", "floor", "section", "mall_id", "mall_name",
+                "license_plate", "vehicle_type", "vehicle_make", "vehicle_model", "duration_hours"
+            ]
+            count += connection.execute(
+                insert(BookingView).from_select(columns, joined.add_columns(duration))
+            ).rowcount
+            continue
+
+        # Otherwise compute durations here and write back in executemany chunks
+        result = connection.execute(joined)
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            view_rows = []
+            for row in rows:
+                view_row = dict(row._mapping)
+                view_row["booking_id"] = view_row.pop("id")
+                view_row["duration_hours"] = _duration_hours(row.start_time, row.end_time)
+                view_rows.append(view_row)
+            connection.execute(insert(BookingView), view_rows)
+            count += len(view_rows)
+
+    db.commit()
+    return count
+
+def ensure_booking_view(db: Session):
+    """Backfill the view if it is empty but bookings exist."""
+    if db.query(func.count(BookingView.booking_id)).scalar() > 0:
+        return
+    if db.query(func.count(Booking.id)).scalar() == 0 and db.query(func.count(BookingArchive.id)).scalar() == 0:
+        return
+    count = rebuild_booking_view(db)
+    print(f"Backfilled booking_view with {count} bookings")
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    print(f"Rebuilt booking_view with {rebuild_booking_view(db)} bookings")
+    db.close()
@@ -1,11 +1,30 @@
+from sqlalchemy import select, lambda_stmt
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import List, Optional
 from . import models
 
+# Hot lookups use lambda statements: the statement is built and its SQL compiled
+# once per call site, and later calls only bind new parameter values. Values
+# computed per call (like the current time) must be taken outside the lambda.
+
+def booking_conflicts_stmt(slot_id: int, start_time: datetime, end_time: datetime):
+    """Cached statement for confirmed bookings of a slot overlapping a time range.
+
+    Works with both Session and AsyncSession.
+    """
+    return lambda_stmt(lambda: select(models.Booking).where(
+        models.Booking.parking_slot_id == slot_id,
+        models.Booking.status == models.BookingStatus.CONFIRMED,
+        models.Booking.start_time < end_time,
+        models.Booking.end_time > start_time
+    ))
+
 # User CRUD operations
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.execute(
+        lambda_stmt(lambda: select(models.User).where(models.User.id == user_id))
+    ).scalars().first()
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
@@ -40,7 +59,9 @@ def delete_user(db: Session, user_id: int):
 
 # Vehicle CRUD operations
 def get_vehicle(db: Session, vehicle_id: int):
-    return db.query(models.Vehicle).filter(models.Vehicle.id == vehicle_id).first()
+    return db.execute(
+        lambda_stmt(lambda: select(models.Vehicle).where(models.Vehicle.id == vehicle_id))
+    ).scalars().first()
 
 def get_vehicle_by_license_plate(db: Session, license_plate: str):
     return db.query(models.Vehicle).filter(models.Vehicle.license_plate == license_plate).first()
@@ -75,7 +96,9 @@ def delete_vehicle(db: Session, vehicle_id: int):
 
 # ParkingSlot CRUD operations
 def get_parking_slot(db: Session, slot_id: int):
-    return db.query(models.ParkingSlot).filter(models.ParkingSlot.id == slot_id).first()
+    return db.execute(
+        lambda_stmt(lambda: select(models.ParkingSlot).where(models.ParkingSlot.id == slot_id))
+    ).scalars().first()
 
 def get_parking_slot_by_number(db: Session, slot_number: str):
     return db.query(models.ParkingSlot).filter(models.ParkingSlot.slot_number == slot_number).first()
@@ -113,17 +136,28 @@ def delete_parking_slot(db: Session, slot_id: int):
 
 # Booking CRUD operations
 def get_booking(db: Session, booking_id: int):
-    return db.query(models.Booking).filter(models.Booking.id == booking_id).first()
+    return db.execute(
+        lambda_stmt(lambda: select(models.Booking).where(models.Booking.id == booking_id))
+    ).scalars().first()
 
 def get_user_bookings(db: Session, user_id: int):
     return db.query(models.Booking).filter(models.Booking.user_id == user_id).all()
 
+def get_user_booking_views(db: Session, user_id: int):
+    return db.query(models.BookingView).filter(
+        models.BookingView.user_id == user_id
+    ).order_by(models.BookingView.booking_id).all()
+
 def get_active_bookings_for_slot(db: Session, slot_id: int):
-    return db.query(models.Booking).filter(
+    now = datetime.utcnow()
+    return db.execute(lambda_stmt(lambda: select(models.Booking).where(
         models.Booking.parking_slot_id == slot_id,
         models.Booking.status == models.BookingStatus.CONFIRMED,
-        models.Booking.end_time > datetime.utcnow()
-    ).all()
+        models.Booking.end_time > now
+    ))).scalars().all()
+
+def get_conflicting_bookings(db: Session, slot_id: int, start_time: datetime, end_time: datetime):
+    return db.execute(booking_conflicts_stmt(slot_id, start_time, end_time)).scalars().all()
 
 def create_booking(db: Session, booking_data: dict):
     db_booking = models.Booking(**booking_data)
@@ -1,38 +1,136 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from fastapi import Request
 import os
 from dotenv import load_dotenv
 
+from .storage_profile import engine_options, apply_storage_profile, async_database_url
+from .routing import read_database_url, request_user_id, should_read_primary, SESSION_USER_KEY, SESSION_REQUEST_STATE_KEY
+
 # Load environment variables
 load_dotenv()
 
 # Use SQLite instead of MySQL for simplicity
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./parking_management.db")
 
-# Create SQLAlchemy engine with SQLite
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+# Create SQLAlchemy engine with the storage profile (pragmas and pool sizing) for its backend
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+apply_storage_profile(engine, DATABASE_URL)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for async routes (aiosqlite for SQLite, asyncpg/aiomysql for server databases)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+apply_storage_profile(async_engine.sync_engine, ASYNC_DATABASE_URL)
+
+# Create async session factory. Objects stay loaded after commit, since an
+# expired attribute can't be lazy-loaded outside of an await.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read engines: a replica (READ_DATABASE_URL) or, for SQLite, a read-only pool on the same file.
+# Without either, reads share the primary engines.
+READ_DATABASE_URL = read_database_url(DATABASE_URL)
+if READ_DATABASE_URL:
+    read_engine = create_engine(READ_DATABASE_URL, **engine_options(READ_DATABASE_URL))
+    apply_storage_profile(read_engine, READ_DATABASE_URL)
+
+    ASYNC_READ_DATABASE_URL = async_database_url(READ_DATABASE_URL)
+    async_read_engine = create_async_engine(ASYNC_READ_DATABASE_URL, **engine_options(ASYNC_READ_DATABASE_URL, is_async=True))
+    apply_storage_profile(async_read_engine.sync_engine, ASYNC_READ_DATABASE_URL)
+else:
+    read_engine = engine
+    async_read_engine = async_engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
-# Dependency to get database session
-def get_db():
+# Dependency to get database session (primary, for writes)
+def get_db(request: Request):
     db = SessionLocal()
+    # Attribute writes to the user and the response so their following reads can be routed to the primary
+    db.info[SESSION_USER_KEY] = request_user_id(request)
+    db.info[SESSION_REQUEST_STATE_KEY] = request.state
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency to get an async database session (primary, for writes)
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info[SESSION_USER_KEY] = request_user_id(request)
+        db.info[SESSION_REQUEST_STATE_KEY] = request.state
+        yield db
+
+# Dependency to get a read-only database session
+def get_read_db(request: Request):
+    # Users who just wrote read from the primary until the replica has caught up
+    if should_read_primary(request):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+# Dependency to get an async read-only database session
+async def get_async_read_db(request: Request):
+    if should_read_primary(request):
+        session_factory = AsyncSessionLocal
+    else:
+        session_factory = AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
+
+# Bump whenever tables are added so existing databases get them on the next startup
+SCHEMA_VERSION = 1
+
+def stored_schema_version() -> int:
+    """Get the schema version recorded in the database (0 if there is none yet)."""
+    from .models import SchemaVersion
+    try:
+        with engine.connect() as connection:
+            return connection.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+    except SQLAlchemyError:
+        # schema_version table doesn't exist yet
+        return 0
+
+def ensure_schema() -> bool:
+    """Create tables and sample data unless the database is already at SCHEMA_VERSION.
+
+    The check is a single query, so worker boots don't pay for create_all and
+    the seeding counts. Returns True if the schema was (re)applied.
+    """
+    if stored_schema_version() >= SCHEMA_VERSION:
+        return False
+
+    from .models import SchemaVersion
+    Base.metadata.create_all(bind=engine)
+    init_database()
+
+    db = SessionLocal()
+    try:
+        db.merge(SchemaVersion(version=SCHEMA_VERSION))
+        db.commit()
+    finally:
+        db.close()
+    return True
+
 # Initialize database with sample data
 def init_database():
     from . import init_db
+    from .booking_view import ensure_booking_view
     db = SessionLocal()
     init_db.init_db(db)
+    # Backfill the booking read model for databases created before it existed
+    ensure_booking_view(db)
     db.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Enum
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -101,6 +101,8 @@ class ParkingSlot(Base):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    # Never reuse ids of bookings moved to the archive
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -119,6 +121,52 @@ class Booking(Base):
     parking_slot = relationship("ParkingSlot", back_populates="bookings")
     payment = relationship("Payment", back_populates="booking", uselist=False)
 
+# Cold storage for bookings that ended before the retention horizon. Same columns
+# as bookings (ids are kept), so history queries can union both tables.
+class BookingArchive(Base):
+    __tablename__ = "bookings_archive"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=False)
+    user_id = Column(Integer, index=True)
+    vehicle_id = Column(Integer)
+    parking_slot_id = Column(Integer)
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    status = Column(Enum(BookingStatus))
+    total_amount = Column(Float)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+# Denormalized read model of bookings, kept in step with every booking write
+# (see booking_view.py) so listings don't need the bookings/slots/malls/vehicles join
+class BookingView(Base):
+    __tablename__ = "booking_view"
+    __table_args__ = (
+        Index("ix_booking_view_user_status", "user_id", "status"),
+    )
+
+    booking_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, index=True)
+    vehicle_id = Column(Integer, index=True)
+    parking_slot_id = Column(Integer, index=True)
+    mall_id = Column(Integer, index=True)
+    mall_name = Column(String(100))
+    slot_number = Column(String(10))
+    floor = Column(Integer)
+    section = Column(String(50))
+    license_plate = Column(String(20))
+    vehicle_type = Column(Enum(VehicleType))
+    vehicle_make = Column(String(100))
+    vehicle_model = Column(String(100))
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    duration_hours = Column(Float)
+    status = Column(Enum(BookingStatus))
+    total_amount = Column(Float)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
 class Payment(Base):
     __tablename__ = "payments"
 
@@ -136,3 +184,21 @@ class Payment(Base):
     # Relationships
     booking = relationship("Booking", back_populates="payment")
     user = relationship("User", back_populates="payments")
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+
+    # The autoincrementing id doubles as the monotonically increasing change sequence
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String(20), index=True)  # booking, slot
+    entity_id = Column(Integer, index=True)
+    user_id = Column(Integer, index=True, nullable=True)  # Owner of the row, set for bookings
+    operation = Column(String(10))  # upsert, delete
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Marker of the schema version the database was last created/seeded for (see database.ensure_schema)
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,154 @@
+"""
+Read/write session routing.
+
+Writes always go to the primary database. Read-only endpoints use the read
+engine: a replica when READ_DATABASE_URL is set, or for a file-based SQLite
+database a separate pool of read-only connections to the same file.
+
+Replicas can lag behind the primary, so a user who has just written is
+routed back to the primary for their reads until the lag window has passed
+(read-your-writes). A write is recorded when a session that made changes
+commits, in two places:
+
+* the response sets a short-lived cookie holding the end of the window, so
+  the client's next reads go to the primary whichever worker serves them;
+* this process remembers the writer, recognised from the X-User-ID header or
+  the user_id query parameter, for clients that don't keep cookies. That
+  only holds while their reads land on the same worker.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+from .storage_profile import is_sqlite, is_sqlite_memory
+
+# Session.info keys used to attribute writes to a user
+SESSION_USER_KEY = "user_id"
+SESSION_WRITES_KEY = "has_writes"
+# Session.info key holding the request's state, where a committed write is noted for the response
+SESSION_REQUEST_STATE_KEY = "request_state"
+
+# Cookie carrying the end of the read-your-writes window (Unix time)
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+def read_database_url(database_url: str) -> Optional[str]:
+    """Get the URL reads should use, or None if reads should share the primary engine."""
+    replica_url = os.getenv("READ_DATABASE_URL")
+    if replica_url:
+        return replica_url
+
+    # File-based SQLite: open the same file read-only through SQLite's URI syntax
+    if is_sqlite(database_url) and not is_sqlite_memory(database_url):
+        scheme, _, path = database_url.partition(":///")
+        if path.startswith("file:"):
+            return None
+        return f"{scheme}:///file:{os.path.abspath(path)}?mode=ro&uri=true"
+
+    return None
+
+def request_user_id(request: Request) -> Optional[str]:
+    """Identify the user making a request, if it names one."""
+    return request.headers.get("x-user-id") or request.query_params.get("user_id")
+
+class ReadYourWritesTracker:
+    """Remembers which users wrote recently, so their reads can follow the primary."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ReadYourWritesTracker, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            # Oldest write first, so expired writers are dropped from the front
+            cls._instance._last_writes = OrderedDict()
+            cls._instance.window = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+        return cls._instance
+
+    def mark_write(self, user_id: str):
+        """Record that a user has just committed a write."""
+        now = time.monotonic()
+        with self._lock:
+            self._last_writes.pop(str(user_id), None)
+            self._last_writes[str(user_id)] = now
+
+            # Forget writers whose window has passed so the map stays small
+            cutoff = now - self.window
+            while self._last_writes:
+                user, written_at = next(iter(self._last_writes.items()))
+                if written_at > cutoff:
+                    break
+                del self._last_writes[user]
+
+    def should_read_primary(self, user_id: Optional[str]) -> bool:
+        """Check whether a user's reads must go to the primary."""
+        if user_id is None:
+            return False
+        with self._lock:
+            written_at = self._last_writes.get(str(user_id))
+        return written_at is not None and time.monotonic() - written_at < self.window
+
+def should_read_primary(request: Request) -> bool:
+    """Check whether a request's reads must go to the primary (its client wrote recently)."""
+    try:
+        if float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    return ReadYourWritesTracker().should_read_primary(request_user_id(request))
+
+class ReadYourWritesMiddleware:
+    """Set the read-your-writes cookie on responses to requests that committed a write."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Request.state is backed by this dict, which the write hooks fill in
+        state = scope.setdefault("state", {})
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and READ_PRIMARY_COOKIE in state:
+                window = ReadYourWritesTracker().window
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{READ_PRIMARY_COOKIE}={state[READ_PRIMARY_COOKIE]:.3f}; "
+                    f"Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+@event.listens_for(Session, "after_flush")
+def _note_writes(session: Session, flush_context):
+    """Flag request sessions that have flushed changes."""
+    if session.info.get(SESSION_USER_KEY) is not None or SESSION_REQUEST_STATE_KEY in session.info:
+        session.info[SESSION_WRITES_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _record_write(session: Session):
+    """Record the user's write once it has committed."""
+    if session.info.pop(SESSION_WRITES_KEY, False):
+        tracker = ReadYourWritesTracker()
+        if session.info.get(SESSION_USER_KEY) is not None:
+            tracker.mark_write(session.info[SESSION_USER_KEY])
+        state = session.info.get(SESSION_REQUEST_STATE_KEY)
+        if state is not None:
+            setattr(state, READ_PRIMARY_COOKIE, time.time() + tracker.window)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_writes(session: Session):
+    """Forget writes that were rolled back."""
+    session.info.pop(SESSION_WRITES_KEY, None)
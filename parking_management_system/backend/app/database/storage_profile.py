@@ -0,0 +1,106 @@
+"""
+Storage profile: connection-level tuning applied to the SQLAlchemy engine.
+
+For SQLite every new DBAPI connection gets the pragmas below through a
+"connect" event hook. WAL lets readers proceed while a booking is being
+written, and synchronous=NORMAL drops the fsync on every commit (WAL stays
+crash-safe; only the last transactions before a power loss can be lost).
+Pool sizing is chosen per backend.
+
+Every setting can be overridden through environment variables.
+"""
+
+import os
+from typing import Dict, Any
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """Get the SQLite pragmas applied (in this order) on every new connection."""
+    return {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        # Negative values are in KiB, so this is a 64 MiB page cache per connection
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+        "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    }
+
+def pool_settings(database_url: str) -> Dict[str, Any]:
+    """Get the connection pool settings for a database URL's backend."""
+    if is_sqlite(database_url):
+        # SQLite connections are cheap and the write lock is database-wide, so a
+        # small pool per worker is enough
+        return {
+            "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        }
+
+    # Server databases: keep connections warm and drop stale ones
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+def is_sqlite(database_url: str) -> bool:
+    """Check whether a database URL points at SQLite."""
+    return database_url.startswith("sqlite")
+
+def is_sqlite_memory(database_url: str) -> bool:
+    """Check whether a database URL points at an in-memory SQLite database."""
+    return is_sqlite(database_url) and (":memory:" in database_url or database_url.rstrip("/").endswith(":"))
+
+# Async drivers for each sync database URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def async_database_url(database_url: str) -> str:
+    """Convert a sync database URL to the equivalent URL for its async driver."""
+    scheme, separator, rest = database_url.partition("://")
+    backend = scheme.split("+")[0]
+    if backend in ASYNC_DRIVERS:
+        return f"{ASYNC_DRIVERS[backend]}{separator}{rest}"
+    return database_url
+
+def engine_options(database_url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Get the create_engine (or create_async_engine) keyword arguments for a database URL."""
+    if is_sqlite(database_url):
+        options = {"connect_args": {"check_same_thread": False}}
+        # In-memory databases use a single shared connection, so pool sizing doesn't apply
+        if not is_sqlite_memory(database_url):
+            options.update(pool_settings(database_url))
+            if is_async:
+                # aiosqlite defaults to opening a new connection per checkout
+                options["poolclass"] = AsyncAdaptedQueuePool
+        return options
+
+    return pool_settings(database_url)
+
+def apply_storage_profile(engine: Engine, database_url: str) -> Engine:
+    """Register the connection-level tuning hooks for the engine's backend."""
+    if is_sqlite(database_url):
+        pragmas = sqlite_pragmas()
+        if "mode=ro" in database_url:
+            # Read-only connections can't change the journal mode; they use the writer's WAL
+            pragmas.pop("journal_mode")
+
+        @event.listens_for(engine, "connect")
+        def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {pragma}={value}")
+            finally:
+                cursor.close()
+
+    return engine
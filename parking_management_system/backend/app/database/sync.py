@@ -0,0 +1,167 @@
+"""
+Change tracking for incremental (delta) sync of parking slots and bookings.
+
+Every flush that inserts, updates or deletes a Booking or ParkingSlot appends a
+row to the change_log table. The autoincrementing id of that table is the sync
+cursor: clients remember the last cursor they saw and ask only for what changed
+after it. Deletes are recorded as tombstones, so hard-deleted bookings still
+reach clients that replicate them locally.
+"""
+
+from typing import Dict, Any, List, Optional
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from .models import Booking, ParkingSlot, ChangeLog
+
+# Entity type names used in the change log
+ENTITY_BOOKING = "booking"
+ENTITY_SLOT = "slot"
+
+# Operations recorded in the change log
+OP_UPSERT = "upsert"
+OP_DELETE = "delete"
+
+def _change_for(obj, operation: str) -> Optional[Dict[str, Any]]:
+    """Build a change log row for a tracked object, or None if it isn't tracked."""
+    if isinstance(obj, Booking):
+        return {
+            "entity_type": ENTITY_BOOKING,
+            "entity_id": obj.id,
+            "user_id": obj.user_id,
+            "operation": operation
+        }
+    if isinstance(obj, ParkingSlot):
+        return {
+            "entity_type": ENTITY_SLOT,
+            "entity_id": obj.id,
+            "user_id": None,
+            "operation": operation
+        }
+    return None
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session: Session, flush_context):
+    """Append a change log entry for every tracked row touched by this flush."""
+    changes = []
+
+    for obj in session.new:
+        change = _change_for(obj, OP_UPSERT)
+        if change:
+            changes.append(change)
+
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            change = _change_for(obj, OP_UPSERT)
+            if change:
+                changes.append(change)
+
+    for obj in session.deleted:
+        change = _change_for(obj, OP_DELETE)
+        if change:
+            changes.append(change)
+
+    if changes:
+        # Write through the flush's connection so the entries commit (or roll back) with the data
+        session.connection().execute(ChangeLog.__table__.insert(), changes)
+
+def get_current_cursor(db: Session) -> int:
+    """Get the latest change sequence number (0 if nothing has been recorded yet)."""
+    return db.query(func.max(ChangeLog.id)).scalar() or 0
+
+def serialize_slot(slot: ParkingSlot) -> Dict[str, Any]:
+    """Convert a parking slot into its sync representation."""
+    return {
+        "id": slot.id,
+        "mall_id": slot.mall_id,
+        "slot_number": slot.slot_number,
+        "floor": slot.floor,
+        "section": slot.section,
+        "vehicle_type": slot.vehicle_type.value if slot.vehicle_type else None,
+        "is_available": slot.is_available,
+        "hourly_rate": slot.hourly_rate,
+        "updated_at": slot.updated_at.isoformat() if slot.updated_at else None
+    }
+
+def serialize_booking(booking: Booking) -> Dict[str, Any]:
+    """Convert a booking into its sync representation."""
+    return {
+        "id": booking.id,
+        "user_id": booking.user_id,
+        "vehicle_id": booking.vehicle_id,
+        "parking_slot_id": booking.parking_slot_id,
+        "start_time": booking.start_time.isoformat() if booking.start_time else None,
+        "end_time": booking.end_time.isoformat() if booking.end_time else None,
+        "status": booking.status.value if booking.status else None,
+        "total_amount": booking.total_amount,
+        "created_at": booking.created_at.isoformat() if booking.created_at else None,
+        "updated_at": booking.updated_at.isoformat() if booking.updated_at else None
+    }
+
+def _latest_operations(db: Session, since: int, until: int, user_id: str) -> Dict[str, Dict[int, str]]:
+    """Collapse the change log in (since, until] to the last operation per entity."""
+    entries = db.query(ChangeLog).filter(
+        ChangeLog.id > since,
+        ChangeLog.id <= until,
+        (ChangeLog.entity_type == ENTITY_SLOT) | (ChangeLog.user_id == user_id)
+    ).order_by(ChangeLog.id).all()
+
+    latest = {ENTITY_SLOT: {}, ENTITY_BOOKING: {}}
+    for entry in entries:
+        latest[entry.entity_type][entry.entity_id] = entry.operation
+
+    return latest
+
+def get_changes(db: Session, user_id: str, since: Optional[int] = None) -> Dict[str, Any]:
+    """Get the slots and bookings that changed after the given cursor.
+
+    Bookings are scoped to the requesting user. Without a cursor (or with a
+    cursor of 0) a full snapshot is returned along with the current cursor.
+    So is a cursor ahead of the current one, which a client keeps after the
+    database was reset; its local copy can't be patched with deltas.
+    """
+    # Read the cursor first so changes committed while we read are picked up by the next sync
+    cursor = get_current_cursor(db)
+    if not since or since <= 0 or since > cursor:
+        slots = db.query(ParkingSlot).all()
+        bookings = db.query(Booking).filter(Booking.user_id == user_id).all()
+        return {
+            "cursor": cursor,
+            "full_sync": True,
+            "slots": [serialize_slot(slot) for slot in slots],
+            "bookings": [serialize_booking(booking) for booking in bookings],
+            "deleted_slots": [],
+            "deleted_bookings": []
+        }
+
+    latest = _latest_operations(db, since, cursor, user_id)
+
+    result = {
+        "cursor": cursor,
+        "full_sync": False,
+        "slots": [],
+        "bookings": [],
+        "deleted_slots": [],
+        "deleted_bookings": []
+    }
+
+    for entity_type, model, serialize, rows_key, deleted_key in (
+        (ENTITY_SLOT, ParkingSlot, serialize_slot, "slots", "deleted_slots"),
+        (ENTITY_BOOKING, Booking, serialize_booking, "bookings", "deleted_bookings"),
+    ):
+        operations = latest[entity_type]
+        upserted_ids = [entity_id for entity_id, op in operations.items() if op == OP_UPSERT]
+        deleted_ids = [entity_id for entity_id, op in operations.items() if op == OP_DELETE]
+
+        rows: List = []
+        if upserted_ids:
+            rows = db.query(model).filter(model.id.in_(upserted_ids)).all()
+
+        # A row that vanished without a tombstone (e.g. deleted outside the ORM) is reported as deleted
+        found_ids = {row.id for row in rows}
+        deleted_ids.extend(entity_id for entity_id in upserted_ids if entity_id not in found_ids)
+
+        result[rows_key] = [serialize(row) for row in rows]
+        result[deleted_key] = sorted(deleted_ids)
+
+    return result
@@ -0,0 +1,386 @@
+"""
+Synthetic data generator for development databases and benchmarks.
+
+Creates malls, parking slots, users, vehicles and a history of bookings at any
+scale. Rows are written with bulk (executemany) inserts, one transaction per
+table, so a million bookings load in well under a minute rather than the
+tens of minutes ORM objects would take. Bookings are generated and inserted a
+chunk at a time, so memory stays flat on long histories. Booking arrivals follow
+a weekday and time-of-day profile within mall opening hours, and durations are
+log-normal per vehicle type.
+
+The generator expects empty tables. Bulk inserts bypass the session hooks, so
+the booking_view read model is rebuilt once the bookings are in place.
+"""
+
+import enum
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session
+
+from . import models
+
+# List of mall names
+MALL_NAMES = [
+    "Phoenix Mall of Asia",
+    "Phoenix Market City",
+    "UB City Mall",
+    "Nexus Mall",
+    "Mantri Square Mall",
+    "Orion Mall",
+    "Lulu Mall",
+    "VR Mall",
+    "Royal Meenakshi Mall",
+    "Nexus Shantiniketan Mall"
+]
+
+# Vehicle type distribution per 10 slots (3 for trucks, 3 for cars, 4 for bikes)
+VEHICLE_DISTRIBUTION = {
+    models.VehicleType.TRUCK: 3,
+    models.VehicleType.CAR: 3,
+    models.VehicleType.BIKE: 4
+}
+
+# Hourly rates by vehicle type
+HOURLY_RATES = {
+    models.VehicleType.TRUCK: 100.0,
+    models.VehicleType.CAR: 50.0,
+    models.VehicleType.BIKE: 20.0
+}
+
+# Share of each vehicle type among users' vehicles
+VEHICLE_OWNERSHIP = {
+    models.VehicleType.CAR: 0.5,
+    models.VehicleType.BIKE: 0.3,
+    models.VehicleType.TRUCK: 0.2
+}
+
+VEHICLE_MODELS = {
+    models.VehicleType.CAR: [("Toyota", "Innova"), ("Maruti", "Swift"), ("Hyundai", "Creta"), ("Honda", "City")],
+    models.VehicleType.BIKE: [("Honda", "Activa"), ("TVS", "Jupiter"), ("Bajaj", "Pulsar"), ("Royal Enfield", "Classic")],
+    models.VehicleType.TRUCK: [("Tata", "Prima"), ("Ashok Leyland", "Dost"), ("Eicher", "Pro"), ("Mahindra", "Blazo")]
+}
+
+VEHICLE_COLORS = ["White", "Black", "Silver", "Red", "Blue", "Grey"]
+
+STATE_CODES = ["KA", "TN", "MH", "DL", "KL", "AP"]
+
+# The first vehicles are always these, so the sample database keeps its familiar plates
+SAMPLE_VEHICLES = [
+    ("TN01AB1234", "Toyota", "Innova", "White", models.VehicleType.CAR),
+    ("KA02CD5678", "Honda", "Activa", "Black", models.VehicleType.BIKE),
+    ("MH03EF9012", "Tata", "Prima", "Blue", models.VehicleType.TRUCK),
+    ("DL04GH3456", "Maruti", "Swift", "Red", models.VehicleType.CAR)
+]
+
+# Malls are open 10 AM to 10 PM; arrival weight for each opening hour
+OPENING_HOUR = 10
+CLOSING_HOUR = 22
+HOURLY_ARRIVALS = [0.6, 0.8, 1.2, 1.3, 1.0, 0.8, 0.8, 1.0, 1.3, 1.4, 1.1, 0.6]
+
+# Relative demand Monday..Sunday
+WEEKDAY_DEMAND = [0.8, 0.8, 0.85, 0.9, 1.1, 1.4, 1.35]
+
+# Median stay (hours) and log-normal spread per vehicle type
+STAY_DURATIONS = {
+    models.VehicleType.BIKE: (1.5, 0.5),
+    models.VehicleType.CAR: (2.0, 0.5),
+    models.VehicleType.TRUCK: (3.0, 0.6)
+}
+
+CANCELLATION_RATE = 0.04
+
+# Rows per executemany call, to bound memory on large runs
+INSERT_CHUNK = 50000
+
+PASSWORD_HASH = "$2b$12$EixZaYVK1fsbw1ZfbX3OXePaWxn96p36WQoeG6Lruj3vjPGga31lW"  # "password"
+
+def _sqlite_converter(sample) -> Optional[Callable]:
+    """Get the conversion SQLAlchemy applies when binding a column's values for SQLite."""
+    if isinstance(sample, datetime):
+        return lambda value: value.isoformat(" ", "microseconds") if value is not None else None
+    if isinstance(sample, enum.Enum):
+        # Enum columns store member names
+        return lambda value: value.name if value is not None else None
+    return None
+
+def _insert_rows(db: Session, model, rows: List[Dict]):
+    """Insert rows into a model's table in chunks, without committing."""
+    if not rows:
+        return
+    connection = db.connection()
+    statement = insert(model.__table__)
+
+    if connection.dialect.name == "sqlite":
+        # SQLAlchemy's per-value DateTime processing dominates large SQLite loads,
+        # so rows are converted here and handed straight to the driver
+        keys = list(rows[0])
+        sql = str(statement.compile(dialect=connection.dialect, column_keys=keys))
+        converters = [
+            (index, converter)
+            for index, converter in enumerate(_sqlite_converter(rows[0][key]) for key in keys)
+            if converter
+        ]
+        for start in range(0, len(rows), INSERT_CHUNK):
+            chunk = []
+            for row in rows[start:start + INSERT_CHUNK]:
+                values = [row[key] for key in keys]
+                for index, converter in converters:
+                    values[index] = converter(values[index])
+                chunk.append(tuple(values))
+            connection.exec_driver_sql(sql, chunk)
+    else:
+        for start in range(0, len(rows), INSERT_CHUNK):
+            connection.execute(statement, rows[start:start + INSERT_CHUNK])
+
+def _bulk_insert(db: Session, model, rows: List[Dict]):
+    """Insert rows into a model's table and commit them as one transaction."""
+    _insert_rows(db, model, rows)
+    db.commit()
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    """Draw from a Poisson distribution (Knuth's method, fine for small means)."""
+    limit = math.exp(-mean)
+    count = 0
+    product = rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+def _mall_name(index: int) -> str:
+    """Name the index-th mall, numbering repeats once the base names run out."""
+    base = MALL_NAMES[index % len(MALL_NAMES)]
+    round_number = index // len(MALL_NAMES)
+    return base if round_number == 0 else f"{base} {round_number + 1}"
+
+def _slot_types(slots_per_mall: int) -> List[models.VehicleType]:
+    """Spread a mall's slots across vehicle types following VEHICLE_DISTRIBUTION."""
+    total = sum(VEHICLE_DISTRIBUTION.values())
+    types = []
+    for vehicle_type, share in VEHICLE_DISTRIBUTION.items():
+        types.extend([vehicle_type] * round(slots_per_mall * share / total))
+    # Rounding can leave the list short or long; bikes take up the difference
+    types = types[:slots_per_mall]
+    types.extend([models.VehicleType.BIKE] * (slots_per_mall - len(types)))
+    return types
+
+def _stay_hours(rng: random.Random, log_median: float, sigma: float) -> float:
+    """Draw a stay duration, rounded to a quarter hour."""
+    hours = rng.lognormvariate(log_median, sigma)
+    return min(max(round(hours * 4) / 4, 0.5), 12.0)
+
+def generate_malls(db: Session, malls: int, slots_per_mall: int) -> Dict[str, int]:
+    """Create malls and their parking slots."""
+    now = datetime.utcnow()
+    _bulk_insert(db, models.Mall, [
+        {
+            "name": _mall_name(i),
+            "address": f"{i + 1} Mall Road",
+            "city": "Bangalore",
+            "state": "Karnataka",
+            "zip_code": f"56{i + 1:04d}",
+            "contact_number": f"080-12345{i + 1}",
+            "email": f"info@{_mall_name(i).lower().replace(' ', '')}.com",
+            "opening_time": "10:00 AM",
+            "closing_time": "10:00 PM",
+            "created_at": now,
+            "updated_at": now
+        }
+        for i in range(malls)
+    ])
+
+    slot_types = _slot_types(slots_per_mall)
+    mall_ids = db.execute(select(models.Mall.id).order_by(models.Mall.id)).scalars().all()
+    _bulk_insert(db, models.ParkingSlot, [
+        {
+            "mall_id": mall_id,
+            "slot_number": f"{number}",
+            # 50 slots per floor
+            "floor": (number - 1) // 50 + 1,
+            "section": f"Section {vehicle_type.value.capitalize()}",
+            "vehicle_type": vehicle_type,
+            "is_available": True,
+            "hourly_rate": HOURLY_RATES[vehicle_type],
+            "created_at": now,
+            "updated_at": now
+        }
+        for mall_id in mall_ids
+        for number, vehicle_type in enumerate(slot_types, 1)
+    ])
+
+    return {"malls": len(mall_ids), "parking_slots": len(mall_ids) * slots_per_mall}
+
+def generate_users(db: Session, users: int, vehicles: int, rng: random.Random) -> Dict[str, int]:
+    """Create an admin, regular users and their vehicles."""
+    now = datetime.utcnow()
+    user_rows = [{
+        "email": "admin@example.com",
+        "hashed_password": PASSWORD_HASH,
+        "first_name": "Admin",
+        "last_name": "User",
+        "phone_number": "1234567890",
+        "role": models.UserRole.ADMIN,
+        "is_active": True,
+        "created_at": now,
+        "updated_at": now
+    }]
+    user_rows.extend({
+        "email": f"user{i}@example.com",
+        "hashed_password": PASSWORD_HASH,
+        "first_name": f"User{i}",
+        "last_name": "Test",
+        "phone_number": f"98765{i}4321" if i < 10 else f"9{i:09d}",
+        "role": models.UserRole.USER,
+        "is_active": True,
+        "created_at": now,
+        "updated_at": now
+    } for i in range(1, users + 1))
+    _bulk_insert(db, models.User, user_rows)
+
+    # Vehicles go round-robin over all users, so every user has at least one when vehicles >= users
+    user_ids = db.execute(select(models.User.id).order_by(models.User.id)).scalars().all()
+    vehicle_types = list(VEHICLE_OWNERSHIP)
+    ownership = list(VEHICLE_OWNERSHIP.values())
+    vehicle_rows = []
+    for i in range(vehicles):
+        if i < len(SAMPLE_VEHICLES):
+            license_plate, make, model, color, vehicle_type = SAMPLE_VEHICLES[i]
+        else:
+            vehicle_type = rng.choices(vehicle_types, weights=ownership)[0]
+            make, model = rng.choice(VEHICLE_MODELS[vehicle_type])
+            color = rng.choice(VEHICLE_COLORS)
+            state = STATE_CODES[i % len(STATE_CODES)]
+            series = chr(65 + (i // 10000) % 26) + chr(65 + (i // 260000) % 26)
+            license_plate = f"{state}{(i // 10000) % 100:02d}{series}{i % 10000:04d}"
+        vehicle_rows.append({
+            "user_id": user_ids[i % len(user_ids)],
+            "license_plate": license_plate,
+            "make": make,
+            "model": model,
+            "color": color,
+            "vehicle_type": vehicle_type,
+            "created_at": now,
+            "updated_at": now
+        })
+    _bulk_insert(db, models.Vehicle, vehicle_rows)
+
+    return {"users": len(user_rows), "vehicles": len(vehicle_rows)}
+
+def generate_bookings(
+    db: Session,
+    months: float,
+    bookings_per_slot_day: float,
+    future_days: int,
+    rng: random.Random
+) -> Dict[str, int]:
+    """Create bookings for every slot from `months` ago until `future_days` ahead."""
+    vehicles_by_type: Dict[models.VehicleType, List] = {}
+    all_vehicles = []
+    for vehicle_id, user_id, vehicle_type in db.execute(
+        select(models.Vehicle.id, models.Vehicle.user_id, models.Vehicle.vehicle_type)
+    ):
+        vehicles_by_type.setdefault(vehicle_type, []).append((vehicle_id, user_id))
+        all_vehicles.append((vehicle_id, user_id))
+    if not all_vehicles:
+        return {"bookings": 0}
+
+    slots = db.execute(select(models.ParkingSlot.id, models.ParkingSlot.vehicle_type, models.ParkingSlot.hourly_rate)).all()
+
+    # Booking times are stored in server local time
+    now = datetime.now()
+    first_day = (now - timedelta(days=round(months * 30))).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = (now.date() - first_day.date()).days + future_days
+    hours = list(range(OPENING_HOUR, CLOSING_HOUR))
+
+    day_starts = [first_day + timedelta(days=day_offset) for day_offset in range(days)]
+    day_demand = [bookings_per_slot_day * WEEKDAY_DEMAND[day.weekday()] for day in day_starts]
+
+    # Rows go to the table every INSERT_CHUNK bookings and are committed together at the end
+    rows = []
+    inserted = 0
+    for slot_id, vehicle_type, hourly_rate in slots:
+        drivers = vehicles_by_type.get(vehicle_type) or all_vehicles
+        median, sigma = STAY_DURATIONS[vehicle_type]
+        log_median = math.log(median)
+
+        for day, demand in zip(day_starts, day_demand):
+            arrivals = _poisson(rng, demand)
+            if not arrivals:
+                continue
+
+            arrival_hours = sorted(
+                hour + rng.random()
+                for hour in rng.choices(hours, weights=HOURLY_ARRIVALS, k=arrivals)
+            )
+
+            # A slot holds one vehicle at a time: later arrivals wait for the previous stay
+            free_at = OPENING_HOUR
+            for arrival in arrival_hours:
+                # Bookings start on the minute
+                start_minute = round(max(arrival, free_at) * 60)
+                start_hour = start_minute / 60
+                if start_hour >= CLOSING_HOUR:
+                    break
+                stay = min(_stay_hours(rng, log_median, sigma), CLOSING_HOUR - start_hour)
+                free_at = start_hour + stay
+
+                start_time = day + timedelta(minutes=start_minute)
+                end_time = start_time + timedelta(hours=stay)
+                if end_time < now:
+                    status = models.BookingStatus.COMPLETED
+                else:
+                    status = models.BookingStatus.CONFIRMED
+                if rng.random() < CANCELLATION_RATE:
+                    status = models.BookingStatus.CANCELLED
+
+                created_at = min(start_time - timedelta(hours=rng.uniform(0, 72)), now)
+                vehicle_id, user_id = rng.choice(drivers)
+                rows.append({
+                    "user_id": user_id,
+                    "vehicle_id": vehicle_id,
+                    "parking_slot_id": slot_id,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "status": status,
+                    "total_amount": round(hourly_rate * stay, 2),
+                    "created_at": created_at,
+                    "updated_at": created_at
+                })
+                if len(rows) >= INSERT_CHUNK:
+                    _insert_rows(db, models.Booking, rows)
+                    inserted += len(rows)
+                    rows = []
+
+    _bulk_insert(db, models.Booking, rows)
+    return {"bookings": inserted + len(rows)}
+
+def generate_synthetic_data(
+    db: Session,
+    malls: int = 10,
+    slots_per_mall: int = 10,
+    users: int = 3,
+    vehicles: int = 4,
+    booking_months: float = 0,
+    bookings_per_slot_day: float = 4.0,
+    future_days: int = 7,
+    seed: Optional[int] = 42
+) -> Dict[str, int]:
+    """Populate empty tables with synthetic data and return the row counts.
+
+    `users` counts regular users; an admin user is always created as well.
+    Bookings are only generated when booking_months > 0.
+    """
+    from .booking_view import rebuild_booking_view
+
+    rng = random.Random(seed)
+    counts = {}
+    counts.update(generate_users(db, users, vehicles, rng))
+    counts.update(generate_malls(db, malls, slots_per_mall))
+    if booking_months > 0:
+        counts.update(generate_bookings(db, booking_months, bookings_per_slot_day, future_days, rng))
+        rebuild_booking_view(db)
+    return counts
@@ -0,0 +1,206 @@
+"""
+In-process pub/sub fan-out of slot availability changes.
+
+Booking writes are captured from the SQLAlchemy session (after_flush) and
+published once the transaction commits. Each published event is built once
+and handed to the subscribers whose filter matches it, so a thousand open
+availability pages cost one broadcast rather than a thousand queries. Pages
+apply each event to the slots they show; a subscriber that falls too far
+behind gets a resync message instead, telling it to fetch the list again.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from ..database.models import Booking, BookingStatus, ParkingSlot
+
+# Event types sent to subscribers
+BOOKING_CREATED = "booking_created"
+BOOKING_UPDATED = "booking_updated"
+BOOKING_CANCELLED = "booking_cancelled"
+BOOKING_DELETED = "booking_deleted"
+SLOT_UPDATED = "slot_updated"
+
+# Events a slow subscriber may fall behind by before its queue is replaced with a resync
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Queued in place of dropped events; subscribers have to refetch what they show
+RESYNC_MESSAGE = "resync"
+
+# Key under session.info where events wait for the transaction to commit
+_PENDING_EVENTS_KEY = "availability_events"
+
+class Subscription:
+    """A single subscriber's queue, bound to the event loop that consumes it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, mall_id: Optional[int], vehicle_type: Optional[str]):
+        self.loop = loop
+        self.mall_id = mall_id
+        self.vehicle_type = vehicle_type
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    @property
+    def key(self) -> Tuple[Optional[int], Optional[str]]:
+        return (self.mall_id, self.vehicle_type)
+
+    def _put(self, message: str):
+        """Enqueue a message, or a resync if the subscriber has fallen too far behind."""
+        if self.queue.full():
+            # A missed event would leave the subscriber's view wrong, so drop them all and say so
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_MESSAGE)
+            return
+        self.queue.put_nowait(message)
+
+    def deliver(self, message: str):
+        """Deliver a message from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The subscriber's loop has been closed
+            pass
+
+class AvailabilityBroadcaster:
+    """Process-wide registry of availability subscribers."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AvailabilityBroadcaster, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            # Subscribers are indexed by their (mall_id, vehicle_type) filter so a
+            # publish only touches the four buckets that can match an event
+            cls._instance._subscribers = {}
+        return cls._instance
+
+    def subscribe(self, mall_id: Optional[int] = None, vehicle_type: Optional[str] = None) -> Subscription:
+        """Register a subscriber on the running event loop."""
+        subscription = Subscription(asyncio.get_running_loop(), mall_id, vehicle_type)
+        with self._lock:
+            self._subscribers.setdefault(subscription.key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber."""
+        with self._lock:
+            bucket = self._subscribers.get(subscription.key)
+            if bucket:
+                bucket.discard(subscription)
+                if not bucket:
+                    del self._subscribers[subscription.key]
+
+    def subscriber_count(self) -> int:
+        """Get the number of connected subscribers."""
+        with self._lock:
+            return sum(len(bucket) for bucket in self._subscribers.values())
+
+    def publish(self, availability_event: Dict[str, Any]):
+        """Serialize an event once and deliver it to every matching subscriber."""
+        mall_id = availability_event.get("mall_id")
+        vehicle_type = availability_event.get("vehicle_type")
+        keys = {(mall_id, vehicle_type), (mall_id, None), (None, vehicle_type), (None, None)}
+
+        with self._lock:
+            targets = [
+                subscription
+                for key in keys
+                for subscription in self._subscribers.get(key, ())
+            ]
+
+        if not targets:
+            return
+
+        message = json.dumps(availability_event)
+        for subscription in targets:
+            subscription.deliver(message)
+
+# Slot id -> (mall_id, vehicle_type); slots are effectively static, so this saves
+# a lookup per booking write. Entries are dropped whenever the slot itself changes.
+_slot_cache: Dict[int, Tuple[int, Optional[str]]] = {}
+
+def _slot_details(session: Session, slot_id: Optional[int]) -> Tuple[Optional[int], Optional[str]]:
+    """Look up the mall and vehicle type of a slot, using the cache when possible."""
+    if slot_id is None:
+        return None, None
+
+    if slot_id not in _slot_cache:
+        row = session.connection().execute(
+            select(ParkingSlot.mall_id, ParkingSlot.vehicle_type).where(ParkingSlot.id == slot_id)
+        ).first()
+        if not row:
+            return None, None
+        vehicle_type = row.vehicle_type.value if row.vehicle_type else None
+        _slot_cache[slot_id] = (row.mall_id, vehicle_type)
+
+    return _slot_cache[slot_id]
+
+def _booking_event(session: Session, booking: Booking, event_type: str) -> Dict[str, Any]:
+    """Build the compact event sent for a booking change."""
+    mall_id, vehicle_type = _slot_details(session, booking.parking_slot_id)
+    return {
+        "type": event_type,
+        "booking_id": booking.id,
+        "slot_id": booking.parking_slot_id,
+        "mall_id": mall_id,
+        "vehicle_type": vehicle_type,
+        "status": booking.status.value if booking.status else None,
+        "start_time": booking.start_time.isoformat() if booking.start_time else None,
+        "end_time": booking.end_time.isoformat() if booking.end_time else None
+    }
+
+def _slot_event(slot: ParkingSlot) -> Dict[str, Any]:
+    """Build the compact event sent for a slot change."""
+    return {
+        "type": SLOT_UPDATED,
+        "slot_id": slot.id,
+        "mall_id": slot.mall_id,
+        "vehicle_type": slot.vehicle_type.value if slot.vehicle_type else None,
+        "is_available": slot.is_available
+    }
+
+@event.listens_for(Session, "after_flush")
+def _collect_events(session: Session, flush_context):
+    """Collect availability events for the rows touched by this flush."""
+    pending: List[Dict[str, Any]] = session.info.setdefault(_PENDING_EVENTS_KEY, [])
+
+    for obj in session.new:
+        if isinstance(obj, Booking):
+            pending.append(_booking_event(session, obj, BOOKING_CREATED))
+
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Booking):
+            event_type = BOOKING_CANCELLED if obj.status == BookingStatus.CANCELLED else BOOKING_UPDATED
+            pending.append(_booking_event(session, obj, event_type))
+        elif isinstance(obj, ParkingSlot):
+            _slot_cache.pop(obj.id, None)
+            pending.append(_slot_event(obj))
+
+    for obj in session.deleted:
+        if isinstance(obj, Booking):
+            pending.append(_booking_event(session, obj, BOOKING_DELETED))
+        elif isinstance(obj, ParkingSlot):
+            _slot_cache.pop(obj.id, None)
+
+@event.listens_for(Session, "after_commit")
+def _publish_events(session: Session):
+    """Publish the collected events now that they are durable."""
+    pending = session.info.pop(_PENDING_EVENTS_KEY, None)
+    if not pending:
+        return
+
+    broadcaster = AvailabilityBroadcaster()
+    for availability_event in pending:
+        broadcaster.publish(availability_event)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_events(session: Session):
+    """Drop events for writes that never committed."""
+    session.info.pop(_PENDING_EVENTS_KEY, None)
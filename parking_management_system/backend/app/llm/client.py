@@ -0,0 +1,231 @@
+"""
+Pooled HTTP client for the OpenAI-compatible chat completions API (Groq).
+
+One client per process keeps TLS connections alive between calls instead of
+opening a new one per request. Every call has connect and read timeouts, and
+429 and 5xx responses (and connection failures) are retried with exponential
+backoff and full jitter, honouring Retry-After when the provider sends it.
+
+The API is synchronous: the agent runs in FastAPI's threadpool, so each call
+blocks a pool thread rather than the event loop. complete() returns the whole
+reply message, for function calling; the other calls return just its text.
+
+Settings come from the environment:
+    LLM_BASE_URL          API root (default https://api.groq.com/openai/v1); point
+                          it at a local stub for tests
+    LLM_API_KEY           API key (falls back to GROQ_API_KEY)
+    LLM_CONNECT_TIMEOUT   seconds (default 5)
+    LLM_READ_TIMEOUT      seconds (default 60)
+    LLM_MAX_RETRIES       retries after the first attempt (default 3)
+    LLM_MAX_CONNECTIONS   pool size (default 20)
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+DEFAULT_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class LLMError(Exception):
+    """The LLM API could not produce a response (after retries)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: str = ""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+class LLMClient:
+    """Chat completions client with a keep-alive connection pool, timeouts and retries."""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0
+    ):
+        self.base_url = (base_url or os.getenv("LLM_BASE_URL", DEFAULT_BASE_URL)).rstrip("/")
+        self.api_key = api_key or os.getenv("LLM_API_KEY") or os.getenv("GROQ_API_KEY")
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        connect_timeout = connect_timeout if connect_timeout is not None else float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+        read_timeout = read_timeout if read_timeout is not None else float(os.getenv("LLM_READ_TIMEOUT", "60"))
+        max_connections = max_connections if max_connections is not None else int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+        self._sync_client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    # Request building
+
+    @property
+    def completions_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    @staticmethod
+    def _payload(messages: List[Dict[str, Any]], model: str, temperature: float, max_tokens: int, stream: bool = False,
+                 tools: Optional[List[Dict[str, Any]]] = None, tool_choice: str = "auto") -> Dict:
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if stream:
+            payload["stream"] = True
+        if tools:
+            payload["tools"] = tools
+            payload["tool_choice"] = tool_choice
+        return payload
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)."""
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _parse_content(response: httpx.Response) -> str:
+        return response.json()["choices"][0]["message"]["content"]
+
+    @staticmethod
+    def _parse_message(response: httpx.Response) -> Dict[str, Any]:
+        return response.json()["choices"][0]["message"]
+
+    @staticmethod
+    def _parse_stream_line(line: str) -> Optional[str]:
+        """Get the content token from one OpenAI-style SSE line, "" at the end of the stream."""
+        if not line or not line.startswith("data: "):
+            return None
+        payload = line[len("data: "):]
+        if payload == "[DONE]":
+            return ""
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            return None
+        choices = chunk.get("choices") or []
+        if not choices:
+            return None
+        return choices[0].get("delta", {}).get("content") or None
+
+    @staticmethod
+    def _status_error(response: httpx.Response) -> LLMError:
+        return LLMError(
+            f"LLM API returned {response.status_code}",
+            status_code=response.status_code,
+            body=response.text
+        )
+
+    # Sync API
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = httpx.Client(timeout=self.timeout, limits=self.limits)
+        return self._sync_client
+
+    def _send(self, payload: Dict, stream: bool = False) -> httpx.Response:
+        """Send a request, retrying retryable failures. Streamed responses must be closed by the caller."""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                request = self.sync_client.build_request("POST", self.completions_url, headers=self._headers(), json=payload)
+                response = self.sync_client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise LLMError(f"LLM API request failed: {e}") from e
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code == 200:
+                return response
+
+            if stream:
+                response.read()
+                response.close()
+            if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                raise self._status_error(response)
+            time.sleep(self._retry_delay(attempt, response))
+
+    def chat(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.2, max_tokens: int = 1000) -> str:
+        """Get a chat completion. Raises LLMError if it fails after retries."""
+        response = self._send(self._payload(messages, model, temperature, max_tokens))
+        return self._parse_content(response)
+
+    def complete(self, messages: List[Dict[str, Any]], model: str, tools: Optional[List[Dict[str, Any]]] = None,
+                 tool_choice: str = "auto", temperature: float = 0.2, max_tokens: int = 1000) -> Dict[str, Any]:
+        """Get a chat completion's reply message, including any tool calls. Raises LLMError if it fails after retries."""
+        response = self._send(self._payload(messages, model, temperature, max_tokens, tools=tools, tool_choice=tool_choice))
+        return self._parse_message(response)
+
+    def stream_chat(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.2, max_tokens: int = 1000) -> Iterator[str]:
+        """Stream a chat completion's content tokens.
+
+        Only the initial request is retried; a stream that breaks midway raises LLMError.
+        """
+        response = self._send(self._payload(messages, model, temperature, max_tokens, stream=True), stream=True)
+        try:
+            for line in response.iter_lines():
+                token = self._parse_stream_line(line)
+                if token == "":
+                    break
+                if token:
+                    yield token
+        except httpx.TransportError as e:
+            raise LLMError(f"LLM stream interrupted: {e}") from e
+        finally:
+            response.close()
+
+    def close(self):
+        """Close the connection pool."""
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+_default_client: Optional[LLMClient] = None
+_default_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """Get the process-wide LLM client, configured from the environment."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = LLMClient()
+    return _default_client
+
+def set_llm_client(client: Optional[LLMClient]):
+    """Replace the process-wide LLM client (e.g. with one pointed at a local stub)."""
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
@@ -0,0 +1,126 @@
+"""
+Cache of LLM answers to repeated FAQ-style questions.
+
+"What are the rates at Orion" or "what time does Nexus Mall open" get asked
+over and over, by many users, and each one used to cost a full LLM call.
+Answers are cached under the normalized query, the conversation's resolved
+intent and entities (mall, vehicle type, time, plate) and a version stamp of
+the data the answer was built from (mall catalog and slot/rate card
+versions). A catalog or rate change therefore never serves a stale answer;
+it just stops matching. The key has no user in it: the agent builds the
+prompt for a cacheable question without the user's ID, name or matched past
+questions, so the answer is the same for everyone.
+
+Requests that depend on live availability or on the user's own bookings
+bypass the cache, as does anything while a booking is pending. So do
+questions in a conversation that already has turns: "what about tomorrow?"
+means something different in every conversation, so only opening questions
+are cached.
+
+Entries expire after LLM_CACHE_TTL seconds (default 3600) and the cache is
+LRU-bounded to LLM_CACHE_SIZE entries (default 1000).
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Intents whose answers depend on live availability or the user's bookings
+UNCACHEABLE_INTENTS = {"check_available_slots", "check_user_bookings", "create_booking", "cancel_booking"}
+
+# Replies that report a failure rather than answer the question
+ERROR_PREFIXES = ("Error calling Groq API", "I encountered an error")
+
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and strip punctuation and extra whitespace."""
+    return " ".join(PUNCTUATION_PATTERN.sub(" ", query.lower()).split())
+
+def cache_key(query: str, context: Dict[str, Any], data_version: Hashable) -> Tuple:
+    """Build the cache key for a query in a conversation context, shared by all users."""
+    return (
+        normalize_query(query),
+        context.get("intent"),
+        context.get("selected_mall_id"),
+        context.get("selected_vehicle_type"),
+        context.get("selected_time_period"),
+        context.get("selected_license_plate"),
+        data_version
+    )
+
+def bypass_reason(context: Dict[str, Any], pending_booking: Optional[Dict[str, Any]], has_prior_turns: bool = False) -> Optional[str]:
+    """Get why a request must not use the cache, or None if it may."""
+    if pending_booking:
+        return "pending_booking"
+    if has_prior_turns:
+        return "conversation_history"
+    if context.get("intent") in UNCACHEABLE_INTENTS:
+        return context["intent"]
+    return None
+
+class LLMResponseCache:
+    """Process-wide TTL + LRU cache of LLM responses."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LLMResponseCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._entries = OrderedDict()
+            cls._instance.max_size = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+            cls._instance.ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+            cls._instance.stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "expired": 0, "evictions": 0}
+        return cls._instance
+
+    def get(self, key: Tuple) -> Optional[str]:
+        """Get a cached response, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: Tuple, response: str):
+        """Cache a response, unless it reports an error."""
+        if not response or response.startswith(ERROR_PREFIXES):
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def record_bypass(self):
+        """Count a request that skipped the cache."""
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def clear(self):
+        """Drop all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> Dict[str, Any]:
+        """Get size, hit/miss counters and the hit rate of cacheable requests."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "size": len(self._entries),
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,156 @@
+"""
+Process-wide admission control for LLM calls.
+
+Every LLM call holds one of LLM_MAX_CONCURRENCY slots (default 8) for its
+whole duration, streaming included. When all slots are busy, callers wait in
+a bounded priority queue (LLM_MAX_QUEUE, default 100): booking-related calls
+are admitted before general questions, which are admitted before small talk,
+first come first served within a priority. A caller that can't get a slot
+within LLM_QUEUE_TIMEOUT seconds (default 10), or that finds the queue full,
+gets LLMOverloaded carrying a Retry-After estimate, which the API turns into a
+503 instead of letting every request slow down together.
+
+Callers are threads (the agent runs in FastAPI's threadpool), so waiting
+blocks the calling thread only.
+"""
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Dict, Iterator
+
+class LLMPriority(IntEnum):
+    """Admission priority of an LLM call; lower values are admitted first."""
+    BOOKING = 0
+    DEFAULT = 1
+    SMALL_TALK = 2
+
+class LLMOverloaded(Exception):
+    """No LLM slot became available within the queue deadline (or the queue is full)."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(f"LLM is overloaded ({reason}), retry in {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+class LLMScheduler:
+    """Concurrency limit plus bounded priority queue shared by all LLM calls in the process."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LLMScheduler, cls).__new__(cls)
+            cls._instance.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+            cls._instance.max_queue = int(os.getenv("LLM_MAX_QUEUE", "100"))
+            cls._instance.queue_timeout = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+            cls._instance._condition = threading.Condition()
+            cls._instance._waiting = []
+            cls._instance._sequence = itertools.count()
+            cls._instance._active = 0
+            cls._instance.reset_stats()
+        return cls._instance
+
+    def reset_stats(self):
+        """Zero the counters reported by info()."""
+        self.stats = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_queue_full": 0,
+            "timed_out": 0,
+            "max_queue_depth": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "total_hold_seconds": 0.0,
+            "completed": 0
+        }
+
+    @contextmanager
+    def slot(self, priority: LLMPriority = LLMPriority.DEFAULT) -> Iterator[None]:
+        """Hold an LLM slot for the duration of the block. Raises LLMOverloaded."""
+        self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def acquire(self, priority: LLMPriority = LLMPriority.DEFAULT):
+        """Wait for an LLM slot. Raises LLMOverloaded. Must be paired with release()."""
+        queued_at = time.monotonic()
+        with self._condition:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._admit(0.0)
+                return
+
+            if len(self._waiting) >= self.max_queue:
+                self.stats["rejected_queue_full"] += 1
+                raise LLMOverloaded(self._retry_after(), "queue full")
+
+            entry = (int(priority), next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            self.stats["queued"] += 1
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._waiting))
+            deadline = queued_at + self.queue_timeout
+
+            while True:
+                if self._waiting[0] is entry and self._active < self.max_concurrency:
+                    heapq.heappop(self._waiting)
+                    self._admit(time.monotonic() - queued_at)
+                    # The next waiter may fit too if several slots are free
+                    self._condition.notify_all()
+                    return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self.stats["timed_out"] += 1
+                    self._condition.notify_all()
+                    raise LLMOverloaded(self._retry_after(), "queue deadline exceeded")
+                self._condition.wait(remaining)
+
+    def release(self, held_seconds: float = 0.0):
+        """Return a slot taken with acquire()."""
+        with self._condition:
+            self._active -= 1
+            self.stats["completed"] += 1
+            self.stats["total_hold_seconds"] += held_seconds
+            self._condition.notify_all()
+
+    def _admit(self, waited_seconds: float):
+        """Take a slot (caller holds the condition)."""
+        self._active += 1
+        self.stats["admitted"] += 1
+        self.stats["total_wait_seconds"] += waited_seconds
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited_seconds)
+
+    def _retry_after(self) -> int:
+        """Estimate when a slot will be free, from the queue depth and the average call time."""
+        average_hold = self.stats["total_hold_seconds"] / self.stats["completed"] if self.stats["completed"] else 1.0
+        estimate = average_hold * (len(self._waiting) + 1) / max(self.max_concurrency, 1)
+        return min(max(1, math.ceil(estimate)), 60)
+
+    def info(self) -> Dict[str, Any]:
+        """Get current load and queueing counters."""
+        with self._condition:
+            waiting_by_priority = {priority.name.lower(): 0 for priority in LLMPriority}
+            for priority, _ in self._waiting:
+                waiting_by_priority[LLMPriority(priority).name.lower()] += 1
+            admitted = self.stats["admitted"]
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout_seconds": self.queue_timeout,
+                "active": self._active,
+                "queue_depth": len(self._waiting),
+                "queue_depth_by_priority": waiting_by_priority,
+                "avg_wait_ms": round(1000 * self.stats["total_wait_seconds"] / admitted, 2) if admitted else 0.0,
+                "max_wait_ms": round(1000 * self.stats["max_wait_seconds"], 2),
+                **{key: value for key, value in self.stats.items() if not key.endswith("_seconds")}
+            }
@@ -1,23 +1,42 @@
 from fastapi import FastAPI, Depends, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional, List
 from pydantic import BaseModel
 from datetime import datetime, timedelta
-
-from .database.database import engine, Base, get_db, init_database
-from .database.models import Mall, ParkingSlot, VehicleType, Vehicle, Booking, BookingStatus, User, UserRole
-from .agent.agent import ParkingAgent
-from .routers import chat_history
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-# Initialize database with sample data
-init_database()
+from contextlib import asynccontextmanager
+import json
+import threading
+
+from .database.database import async_engine, async_read_engine, get_db, get_async_db, get_async_read_db, ensure_schema
+from .database.models import Mall, ParkingSlot, VehicleType, Vehicle, Booking, BookingStatus, BookingView, User, UserRole
+from .database import booking_view  # keeps booking_view in step with booking writes
+from .database.crud import booking_conflicts_stmt
+from .database.routing import ReadYourWritesMiddleware
+from .agent.stage_timings import StageTimings
+from .agent.session_cache import AgentSessionCache
+from .llm.client import get_llm_client
+from .llm.response_cache import LLMResponseCache
+from .llm.scheduler import LLMOverloaded, LLMScheduler
+from .routers import chat_history, sync, events
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables and sample data on first start (and after schema changes);
+    # otherwise this is a single schema-version lookup
+    ensure_schema()
+    yield
+    # Close pooled async connections (their worker threads would otherwise keep the process alive)
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+    get_llm_client().close()
 
 # Create FastAPI app
-app = FastAPI(title="Parking Management System API")
+app = FastAPI(title="Parking Management System API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -26,10 +45,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the chat UI read the conversation ID of a streamed response
+    expose_headers=["X-Conversation-ID"],
 )
 
+# Tell clients that just wrote to read from the primary, whichever worker they reach next
+app.add_middleware(ReadYourWritesMiddleware)
+
 # Include routers
 app.include_router(chat_history.router)
+app.include_router(sync.router)
+app.include_router(events.router)
 
 # Define request and response models
 class ChatRequest(BaseModel):
@@ -61,6 +87,8 @@ class ParkingSlotResponse(BaseModel):
     mall_name: str
     booking_status: Optional[str] = None
     booking_id: Optional[int] = None
+    # Every confirmed booking overlapping the requested period, so clients can apply availability events
+    booking_ids: Optional[List[int]] = None
     booking_start_time: Optional[str] = None
     booking_end_time: Optional[str] = None
     vehicle_number: Optional[str] = None
@@ -92,6 +120,14 @@ def health_check():
     """Health check endpoint to verify the API is running"""
     return {"status": "ok", "message": "API is running"}
 
+def llm_overloaded_error(error: LLMOverloaded) -> HTTPException:
+    """503 telling the client when to retry a chat request the LLM scheduler turned away."""
+    return HTTPException(
+        status_code=503,
+        detail=f"The assistant is busy, please retry in {error.retry_after} seconds",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 @app.post("/chat", response_model=ChatResponse)
 def chat_endpoint(
     request: ChatRequest,
@@ -100,19 +136,27 @@ def chat_endpoint(
     db: Session = Depends(get_db)
 ):
     try:
-        # Create agent for user with vector store disabled to avoid download issues
-        agent = ParkingAgent(db=db, user_id=x_user_id, use_vector_store=False)
-
-        # Set user name if provided
-        if x_user_name:
-            agent.user_name = x_user_name
+        # Get the user's cached agent for this conversation (vector store disabled to avoid download issues)
+        session = AgentSessionCache().checkout(
+            db, x_user_id,
+            conversation_id=request.conversation_id,
+            user_name=x_user_name,
+            use_vector_store=False
+        )
+    except Exception as e:
+        print(f"Error in chat endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
 
+    agent = session.agent
+    try:
         # Process query with optional conversation ID
         try:
             response = agent.process_query(
                 query=request.query,
                 conversation_id=request.conversation_id
             )
+        except LLMOverloaded:
+            raise
         except Exception as agent_error:
             print(f"Agent error: {str(agent_error)}")
             # Fallback to direct processing without memory
@@ -128,32 +172,143 @@ def chat_endpoint(
         # Return the response
         return ChatResponse(response=response)
 
+    except LLMOverloaded as e:
+        raise llm_overloaded_error(e)
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
+    finally:
+        AgentSessionCache().release(session)
+
+@app.post("/chat/stream")
+def chat_stream_endpoint(
+    request: ChatRequest,
+    x_user_id: str = Header(..., description="User ID for conversation tracking"),
+    x_user_name: Optional[str] = Header(None, description="User name for personalized responses"),
+    db: Session = Depends(get_db)
+):
+    """Streaming variant of /chat.
+
+    Sends the response as Server-Sent Events: a `token` event per chunk of
+    text as the LLM produces it, then a single `done` event carrying the full
+    response once the interaction has been saved to chat history.
+    """
+    session = AgentSessionCache().checkout(
+        db, x_user_id,
+        conversation_id=request.conversation_id,
+        user_name=x_user_name,
+        use_vector_store=False
+    )
+    agent = session.agent
+    stream = agent.process_query_stream(
+        query=request.query,
+        conversation_id=request.conversation_id
+    )
+
+    # Wait for the first chunk before answering, so an overloaded LLM is still reported as a 503
+    try:
+        first_chunk = next(stream, None)
+    except LLMOverloaded as e:
+        AgentSessionCache().release(session)
+        raise llm_overloaded_error(e)
+    except Exception:
+        AgentSessionCache().release(session)
+        raise
+
+    def event_stream():
+        chunks = []
+        try:
+            if first_chunk is not None:
+                chunks.append(first_chunk)
+                yield f"event: token\ndata: {json.dumps({'token': first_chunk})}\n\n"
+            for chunk in stream:
+                chunks.append(chunk)
+                yield f"event: token\ndata: {json.dumps({'token': chunk})}\n\n"
+        except Exception as e:
+            print(f"Error in chat stream: {str(e)}")
+            error_message = f"Error processing chat request: {str(e)}"
+            chunks.append(error_message)
+            yield f"event: token\ndata: {json.dumps({'token': error_message})}\n\n"
+
+        yield f"event: done\ndata: {json.dumps({'response': ''.join(chunks)})}\n\n"
+
+    # The body is advanced on threadpool threads; the lock keeps finish_stream from
+    # touching the agent while a chunk is still being produced
+    iteration_lock = threading.Lock()
+    body = event_stream()
+
+    def locked_body():
+        while True:
+            with iteration_lock:
+                event = next(body, None)
+            if event is None:
+                return
+            yield event
+
+    def finish_stream():
+        """Run the agent to the end if the client left early, then release the session.
+
+        Runs as the response's background task, which Starlette also runs after a
+        disconnect, so the interaction is saved and the agent is idle before
+        another request can check it out.
+        """
+        with iteration_lock:
+            body.close()
+            try:
+                for _ in stream:
+                    pass
+            except Exception as e:
+                print(f"Error finishing chat stream: {str(e)}")
+        AgentSessionCache().release(session)
+
+    # The agent starts a new conversation when the request names none; tell the client its ID
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "X-Conversation-ID": agent.conversation_id
+    }
+
+    return StreamingResponse(
+        locked_body(),
+        media_type="text/event-stream",
+        headers=headers,
+        background=BackgroundTask(finish_stream)
+    )
+
+@app.get("/llm/metrics")
+def llm_metrics():
+    """LLM scheduler load (active calls, queue depth, wait times), LLM calls saved by local routing and the response cache, and agent stage timings."""
+    from .agent.intent_classifier import get_intent_classifier
+    return {
+        **LLMScheduler().info(),
+        "local_routing": get_intent_classifier().info(),
+        "response_cache": LLMResponseCache().info(),
+        "stage_timings": StageTimings().info()
+    }
 
 @app.get("/malls/", response_model=List[MallResponse])
-def get_malls(db: Session = Depends(get_db)):
+async def get_malls(db: AsyncSession = Depends(get_async_read_db)):
     """Get all malls"""
-    malls = db.query(Mall).all()
+    result = await db.execute(select(Mall))
+    malls = result.scalars().all()
     return malls
 
 @app.get("/malls/{mall_id}/parking-slots", response_model=List[ParkingSlotResponse])
-def get_mall_parking_slots(mall_id: int, vehicle_type: Optional[str] = None, db: Session = Depends(get_db)):
+async def get_mall_parking_slots(mall_id: int, vehicle_type: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
     """Get parking slots for a specific mall, optionally filtered by vehicle type"""
-    query = db.query(ParkingSlot).join(Mall).filter(ParkingSlot.mall_id == mall_id)
+    query = select(ParkingSlot).join(Mall).where(ParkingSlot.mall_id == mall_id)
 
     if vehicle_type:
         try:
             vehicle_type_enum = VehicleType(vehicle_type.lower())
-            query = query.filter(ParkingSlot.vehicle_type == vehicle_type_enum)
+            query = query.where(ParkingSlot.vehicle_type == vehicle_type_enum)
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid vehicle type: {vehicle_type}")
 
-    slots = query.all()
+    slots = (await db.execute(query)).scalars().all()
 
     # Get mall name for each slot
-    mall = db.query(Mall).filter(Mall.id == mall_id).first()
+    mall = await db.get(Mall, mall_id)
     if not mall:
         raise HTTPException(status_code=404, detail=f"Mall with ID {mall_id} not found")
 
@@ -175,34 +330,34 @@ def get_mall_parking_slots(mall_id: int, vehicle_type: Optional[str] = None, db:
     return result
 
 @app.get("/available-slots", response_model=List[ParkingSlotResponse])
-def get_available_slots(
+async def get_available_slots(
     vehicle_type: Optional[str] = None,
     start_time: Optional[str] = None,
     end_time: Optional[str] = None,
     include_booked: bool = False,  # Parameter to include booked slots
     mall_id: Optional[int] = None,  # New parameter to filter by mall
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get all parking slots, optionally filtered by vehicle type, mall, and time period.
     Can include booked slots with their booking status."""
     try:
         # Get all slots matching vehicle type, regardless of availability
-        query = db.query(ParkingSlot)
+        query = select(ParkingSlot)
 
         # Apply vehicle type filter if provided
         if vehicle_type:
             try:
                 vehicle_type_enum = VehicleType(vehicle_type.lower())
-                query = query.filter(ParkingSlot.vehicle_type == vehicle_type_enum)
+                query = query.where(ParkingSlot.vehicle_type == vehicle_type_enum)
             except ValueError:
                 raise HTTPException(status_code=400, detail=f"Invalid vehicle type: {vehicle_type}")
 
         # Apply mall filter if provided
         if mall_id:
-            query = query.filter(ParkingSlot.mall_id == mall_id)
+            query = query.where(ParkingSlot.mall_id == mall_id)
 
         # Execute query to get all matching slots
-        all_slots = query.all()
+        all_slots = (await db.execute(query)).scalars().all()
 
         # Initialize variables for time filtering
         start_datetime = None
@@ -229,7 +384,7 @@ def get_available_slots(
         for slot in all_slots:
             try:
                 # Get mall for this slot
-                mall = db.query(Mall).filter(Mall.id == slot.mall_id).first()
+                mall = await db.get(Mall, slot.mall_id)
                 if not mall:
                     # Skip slots with no associated mall
                     continue
@@ -244,22 +399,22 @@ def get_available_slots(
 
                 # If time parameters are provided, check for conflicts in that time period
                 if start_datetime and end_datetime:
-                    conflicting_bookings = db.query(Booking).filter(
+                    conflicting_bookings = (await db.execute(select(Booking).where(
                         Booking.parking_slot_id == slot.id,
                         Booking.status == BookingStatus.CONFIRMED,
                         Booking.start_time < end_datetime,
                         Booking.end_time > start_datetime
-                    ).all()
+                    ))).scalars().all()
                 else:
                     # If no time period is specified, check for current bookings
                     # This is just to show current status, not for actual availability checking
                     now = datetime.now()
-                    conflicting_bookings = db.query(Booking).filter(
+                    conflicting_bookings = (await db.execute(select(Booking).where(
                         Booking.parking_slot_id == slot.id,
                         Booking.status == BookingStatus.CONFIRMED,
                         Booking.start_time <= now,
                         Booking.end_time >= now
-                    ).all()
+                    ))).scalars().all()
 
                 # If there are conflicting bookings, mark as booked
                 if conflicting_bookings:
@@ -277,9 +432,9 @@ def get_available_slots(
                 # Get vehicle information if booked
                 vehicle_number = None
                 if booking_status == "BOOKED" and booking_id:
-                    booking = db.query(Booking).filter(Booking.id == booking_id).first()
+                    booking = await db.get(Booking, booking_id)
                     if booking and booking.vehicle_id:
-                        vehicle = db.query(Vehicle).filter(Vehicle.id == booking.vehicle_id).first()
+                        vehicle = await db.get(Vehicle, booking.vehicle_id)
                         if vehicle:
                             vehicle_number = vehicle.license_plate
 
@@ -296,6 +451,7 @@ def get_available_slots(
                     "mall_name": mall.name,
                     "booking_status": booking_status,
                     "booking_id": booking_id,
+                    "booking_ids": [booking.id for booking in conflicting_bookings],
                     "vehicle_number": vehicle_number,
                     "features": ["CCTV", "Covered"] if slot.id % 2 == 0 else ["Open"],
                     "location": mall.address if hasattr(mall, 'address') else None
@@ -319,19 +475,19 @@ def get_available_slots(
 
 # Create booking endpoint
 @app.post("/bookings", response_model=BookingResponse)
-def create_booking(
+async def create_booking(
     slot_id: int,
     x_user_id: str = Header(..., description="User ID for booking"),
     start_time: Optional[str] = None,
     end_time: Optional[str] = None,
     duration: Optional[int] = None,
     license_plate: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new booking for a parking slot"""
     try:
         # Check if slot exists
-        slot = db.query(ParkingSlot).filter(ParkingSlot.id == slot_id).first()
+        slot = await db.get(ParkingSlot, slot_id)
         if not slot:
             raise HTTPException(status_code=404, detail=f"Parking slot with ID {slot_id} not found")
 
@@ -361,12 +517,9 @@ def create_booking(
 
         # Check for conflicting bookings if times are provided
         if booking_start_time and booking_end_time:
-            conflicting_bookings = db.query(Booking).filter(
-                Booking.parking_slot_id == slot_id,
-                Booking.status == BookingStatus.CONFIRMED,
-                Booking.start_time < booking_end_time,
-                Booking.end_time > booking_start_time
-            ).all()
+            conflicting_bookings = (await db.execute(
+                booking_conflicts_stmt(slot_id, booking_start_time, booking_end_time)
+            )).scalars().all()
 
             if conflicting_bookings:
                 raise HTTPException(
@@ -375,7 +528,7 @@ def create_booking(
                 )
 
         # Get user (for demo purposes, create a user if not exists)
-        user = db.query(User).filter(User.id == x_user_id).first()
+        user = (await db.execute(select(User).where(User.id == x_user_id))).scalars().first()
         if not user:
             # Create a simple user for demo
             user = User(
@@ -388,16 +541,16 @@ def create_booking(
                 role=UserRole.USER
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
 
         # Create a vehicle for the user if needed (for demo)
         if license_plate:
             # Try to find vehicle with the provided license plate
-            vehicle = db.query(Vehicle).filter(
+            vehicle = (await db.execute(select(Vehicle).where(
                 Vehicle.user_id == user.id,
                 Vehicle.license_plate == license_plate
-            ).first()
+            ))).scalars().first()
 
             # If not found, create a new vehicle with the provided license plate
             if not vehicle:
@@ -410,14 +563,14 @@ def create_booking(
                     vehicle_type=slot.vehicle_type
                 )
                 db.add(vehicle)
-                db.commit()
-                db.refresh(vehicle)
+                await db.commit()
+                await db.refresh(vehicle)
         else:
             # Try to find any vehicle of the right type
-            vehicle = db.query(Vehicle).filter(
+            vehicle = (await db.execute(select(Vehicle).where(
                 Vehicle.user_id == user.id,
                 Vehicle.vehicle_type == slot.vehicle_type
-            ).first()
+            ))).scalars().first()
 
             # If not found, create a demo vehicle
             if not vehicle:
@@ -431,8 +584,8 @@ def create_booking(
                     vehicle_type=slot.vehicle_type
                 )
                 db.add(vehicle)
-                db.commit()
-                db.refresh(vehicle)
+                await db.commit()
+                await db.refresh(vehicle)
 
         # Use provided times or default to current time + 2 hours
         if not booking_start_time:
@@ -502,11 +655,11 @@ def create_booking(
         # The slot is still available for other time periods
 
         db.add(booking)
-        db.commit()
-        db.refresh(booking)
+        await db.commit()
+        await db.refresh(booking)
 
         # Get mall for response
-        mall = db.query(Mall).filter(Mall.id == slot.mall_id).first()
+        mall = await db.get(Mall, slot.mall_id)
 
         # Calculate duration in hours
         duration_hours = (booking.end_time - booking.start_time).total_seconds() / 3600
@@ -529,62 +682,42 @@ def create_booking(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error in create_booking: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Bookings endpoint
 @app.get("/bookings", response_model=List[BookingResponse])
-def get_bookings(user_id: str, include_cancelled: bool = False, db: Session = Depends(get_db)):
+async def get_bookings(user_id: str, include_cancelled: bool = False, db: AsyncSession = Depends(get_async_read_db)):
     """Get all bookings for a user, with option to exclude cancelled bookings"""
     try:
-        # Check if user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            # For demo purposes, we'll return mock bookings if user doesn't exist
-            return []
-
-        # Get bookings for user, optionally filtering out cancelled bookings
-        query = db.query(Booking).filter(Booking.user_id == user_id)
+        # Get bookings for user from the booking read model, which covers both the
+        # hot table and the archive, optionally filtering out cancelled bookings
+        query = select(BookingView).where(BookingView.user_id == user_id)
         if not include_cancelled:
-            query = query.filter(Booking.status != BookingStatus.CANCELLED)
-
-        bookings = query.all()
+            query = query.where(BookingView.status != BookingStatus.CANCELLED)
+        bookings = (await db.execute(query.order_by(BookingView.booking_id))).scalars().all()
 
         # Format bookings for response
         result = []
         for booking in bookings:
-            # Get parking slot
-            slot = db.query(ParkingSlot).filter(ParkingSlot.id == booking.parking_slot_id).first()
-            if not slot:
+            # Skip bookings whose slot, mall or vehicle no longer exists
+            if booking.slot_number is None or booking.mall_name is None or booking.license_plate is None:
                 continue
 
-            # Get mall
-            mall = db.query(Mall).filter(Mall.id == slot.mall_id).first()
-            if not mall:
-                continue
-
-            # Get vehicle
-            vehicle = db.query(Vehicle).filter(Vehicle.id == booking.vehicle_id).first()
-            if not vehicle:
-                continue
-
-            # Calculate duration in hours
-            duration_hours = (booking.end_time - booking.start_time).total_seconds() / 3600 if booking.end_time else 0
-
             result.append({
-                "id": booking.id,
-                "mall_name": mall.name,
-                "slot_number": slot.slot_number,
-                "vehicle_type": vehicle.vehicle_type.value,
-                "vehicle_number": vehicle.license_plate,
+                "id": booking.booking_id,
+                "mall_name": booking.mall_name,
+                "slot_number": booking.slot_number,
+                "vehicle_type": booking.vehicle_type.value,
+                "vehicle_number": booking.license_plate,
                 "start_time": booking.start_time.isoformat(),
                 "end_time": booking.end_time.isoformat() if booking.end_time else None,
                 "total_amount": booking.total_amount if booking.total_amount is not None else 0.0,
                 "status": booking.status.value,
-                "floor": slot.floor,
-                "section": slot.section,
-                "duration_hours": round(duration_hours, 2),
+                "floor": booking.floor,
+                "section": booking.section,
+                "duration_hours": booking.duration_hours,
                 "created_at": booking.created_at.isoformat()
             })
 
@@ -595,15 +728,15 @@ def get_bookings(user_id: str, include_cancelled: bool = False, db: Session = De
 
 # Cancel booking endpoint
 @app.post("/bookings/{booking_id}/cancel")
-def cancel_booking(
+async def cancel_booking(
     booking_id: int,
     x_user_id: str = Header(..., description="User ID for booking"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cancel a booking"""
     try:
         # Check if booking exists
-        booking = db.query(Booking).filter(Booking.id == booking_id).first()
+        booking = await db.get(Booking, booking_id)
         if not booking:
             raise HTTPException(status_code=404, detail=f"Booking with ID {booking_id} not found")
 
@@ -619,8 +752,8 @@ def cancel_booking(
         # Just delete the booking and the slot will be available for that time period
 
         # Delete the booking directly instead of just marking it as cancelled
-        db.delete(booking)
-        db.commit()
+        await db.delete(booking)
+        await db.commit()
 
         return {
             "id": booking_id,
@@ -629,21 +762,21 @@ def cancel_booking(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error in cancel_booking: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Delete booking endpoint
 @app.delete("/bookings/{booking_id}")
-def delete_booking(
+async def delete_booking(
     booking_id: int,
     x_user_id: str = Header(..., description="User ID for booking"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a booking (only allowed for cancelled bookings)"""
     try:
         # Check if booking exists
-        booking = db.query(Booking).filter(Booking.id == booking_id).first()
+        booking = await db.get(Booking, booking_id)
         if not booking:
             raise HTTPException(status_code=404, detail=f"Booking with ID {booking_id} not found")
 
@@ -654,14 +787,14 @@ def delete_booking(
         # Allow deletion of any booking (not just cancelled ones)
         # Make the parking slot available if the booking is active
         if booking.status == BookingStatus.CONFIRMED:
-            slot = db.query(ParkingSlot).filter(ParkingSlot.id == booking.parking_slot_id).first()
+            slot = await db.get(ParkingSlot, booking.parking_slot_id)
             if slot:
                 slot.is_available = True
                 slot.updated_at = datetime.now()
 
         # Delete the booking
-        db.delete(booking)
-        db.commit()
+        await db.delete(booking)
+        await db.commit()
 
         return {
             "id": booking_id,
@@ -670,35 +803,35 @@ def delete_booking(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error in delete_booking: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Get parking rates endpoint
 @app.get("/parking-rates")
-def get_parking_rates(mall_id: Optional[int] = None, db: Session = Depends(get_db)):
+async def get_parking_rates(mall_id: Optional[int] = None, db: AsyncSession = Depends(get_async_read_db)):
     """Get parking rates for all vehicle types, optionally filtered by mall"""
     try:
         # Base query for parking slots
-        query = db.query(ParkingSlot)
+        query = select(ParkingSlot)
 
         # Apply mall filter if provided
         if mall_id:
-            query = query.filter(ParkingSlot.mall_id == mall_id)
+            query = query.where(ParkingSlot.mall_id == mall_id)
 
             # Check if mall exists
-            mall = db.query(Mall).filter(Mall.id == mall_id).first()
+            mall = await db.get(Mall, mall_id)
             if not mall:
                 raise HTTPException(status_code=404, detail=f"Mall with ID {mall_id} not found")
 
         # Get all slots
-        slots = query.all()
+        slots = (await db.execute(query)).scalars().all()
 
         # Group rates by mall and vehicle type
         rates_by_mall = {}
 
         for slot in slots:
-            mall = db.query(Mall).filter(Mall.id == slot.mall_id).first()
+            mall = await db.get(Mall, slot.mall_id)
             if not mall:
                 continue
 
@@ -1,11 +1,11 @@
 from typing import List, Dict, Any, Optional
 import os
-from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.messages import HumanMessage, AIMessage
 from datetime import datetime, timezone
 import json
 import uuid
 
+from app.memory.file_lock import user_lock, write_json, file_stamp
+
 # Custom implementation of memory to avoid deprecation warnings
 class CustomConversationMemory:
     def __init__(self, memory_key="chat_history"):
@@ -18,14 +18,18 @@ class CustomConversationMemory:
     def add_ai_message(self, message: str) -> None:
         self.chat_memory.add_ai_message(message)
 
-class CustomChatMessageHistory(BaseChatMessageHistory):
+# Message buffer with the BaseChatMessageHistory interface. langchain_core is
+# imported when the first message is added rather than when the app starts.
+class CustomChatMessageHistory:
     def __init__(self):
         self.messages = []
 
     def add_user_message(self, message: str) -> None:
+        from langchain_core.messages import HumanMessage
         self.messages.append(HumanMessage(content=message))
 
     def add_ai_message(self, message: str) -> None:
+        from langchain_core.messages import AIMessage
         self.messages.append(AIMessage(content=message))
 
     def clear(self) -> None:
@@ -38,6 +42,8 @@ class ChatMemoryManager:
         self.persist_directory = os.path.join(persist_directory, f"user_{user_id}")
         self.memory = CustomConversationMemory(memory_key="chat_history")
         self.conversation_history = []
+        self.history_file = os.path.join(self.persist_directory, "conversation_history.json")
+        self._history_stamp = None
 
         # Create directory if it doesn't exist
         os.makedirs(self.persist_directory, exist_ok=True)
@@ -47,10 +53,10 @@ class ChatMemoryManager:
 
     def _load_conversation_history(self):
         """Load conversation history from file if it exists."""
-        history_file = os.path.join(self.persist_directory, "conversation_history.json")
-        if os.path.exists(history_file):
+        self._history_stamp = file_stamp(self.history_file)
+        if os.path.exists(self.history_file):
             try:
-                with open(history_file, "r") as f:
+                with open(self.history_file, "r") as f:
                     self.conversation_history = json.load(f)
 
                 # Rebuild memory from history
@@ -62,12 +68,32 @@ class ChatMemoryManager:
                 print(f"Error loading conversation history: {str(e)}")
                 self.conversation_history = []
 
-    def _save_conversation_history(self):
-        """Save conversation history to file."""
-        history_file = os.path.join(self.persist_directory, "conversation_history.json")
+    def _read_saved_history(self) -> List[Dict[str, Any]]:
+        """Read the conversation history other agents or workers have saved."""
+        if not os.path.exists(self.history_file):
+            return []
+        try:
+            with open(self.history_file, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading conversation history: {str(e)}")
+            return []
+
+    def _current_history(self) -> List[Dict[str, Any]]:
+        """Get the conversation history, rereading it if it was saved elsewhere since."""
+        stamp = file_stamp(self.history_file)
+        if stamp != self._history_stamp:
+            self.conversation_history = self._read_saved_history()
+            self._history_stamp = stamp
+        return self.conversation_history
+
+    def _save_conversation_history(self, history: Optional[List[Dict[str, Any]]] = None):
+        """Save conversation history to file (caller holds the user lock)."""
+        if history is not None:
+            self.conversation_history = history
         try:
-            with open(history_file, "w") as f:
-                json.dump(self.conversation_history, f, indent=2)
+            write_json(self.history_file, self.conversation_history)
+            self._history_stamp = file_stamp(self.history_file)
         except Exception as e:
             print(f"Error saving conversation history: {str(e)}")
 
@@ -89,11 +115,12 @@ class ChatMemoryManager:
             "user_id": self.user_id
         }
 
-        # Add to conversation history
-        self.conversation_history.append(entry)
-
-        # Save conversation history
-        self._save_conversation_history()
+        # Add to the latest saved conversation history, which the user's other
+        # agents and other workers also append to
+        with user_lock(self.persist_directory):
+            history = self._read_saved_history()
+            history.append(entry)
+            self._save_conversation_history(history)
 
     def get_relevant_history(self, query: str, k: int = 5) -> List[str]:
         """Retrieve relevant conversation history based on the query.
@@ -101,12 +128,13 @@ class ChatMemoryManager:
         This is a simple implementation that returns the most recent conversations.
         In a production environment, you would want to use a proper vector store.
         """
-        if not self.conversation_history:
+        history = self._current_history()
+        if not history:
             return []
 
         # Sort by timestamp (newest first) and take the k most recent conversations
         sorted_history = sorted(
-            self.conversation_history,
+            history,
             key=lambda x: x.get("timestamp", ""),
             reverse=True
         )[:k]
@@ -124,8 +152,8 @@ class ChatMemoryManager:
     def clear_memory(self) -> None:
         """Clear the conversation memory."""
         self.memory = CustomConversationMemory(memory_key="chat_history")
-        self.conversation_history = []
-        self._save_conversation_history()
+        with user_lock(self.persist_directory):
+            self._save_conversation_history([])
 
     def save_memory_to_file(self, file_path: Optional[str] = None) -> str:
         """Save the current conversation memory to a file."""
@@ -169,8 +197,8 @@ class ChatMemoryManager:
 
             # Load conversation history if available
             if "conversation_history" in memory_dict:
-                self.conversation_history = memory_dict["conversation_history"]
-                self._save_conversation_history()
+                with user_lock(self.persist_directory):
+                    self._save_conversation_history(memory_dict["conversation_history"])
 
             return True
         except Exception as e:
@@ -1,5 +1,9 @@
 """
 Simple file-based chat history implementation that doesn't rely on vector stores.
+
+One instance is shared by all of a user's cached agents and the chat history
+routes, and other workers write the same files, so every change re-reads
+metadata.json under the user's lock before saving it (see app.memory.file_lock).
 """
 
 import os
@@ -8,6 +12,8 @@ import uuid
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
 
+from app.memory.file_lock import user_lock, write_json, file_stamp
+
 class FileChatHistory:
     """Chat history manager that uses simple JSON files."""
 
@@ -26,8 +32,17 @@ class FileChatHistory:
 
         # Metadata file for conversation names and other metadata
         self.metadata_file = os.path.join(self.persist_directory, "metadata.json")
+        self._metadata_stamp = file_stamp(self.metadata_file)
         self.metadata = self._load_metadata()
 
+    def _current_metadata(self) -> Dict[str, Any]:
+        """Get the metadata, reloading it if another agent or worker has saved it since."""
+        stamp = file_stamp(self.metadata_file)
+        if stamp != self._metadata_stamp:
+            self.metadata = self._load_metadata()
+            self._metadata_stamp = stamp
+        return self.metadata
+
     def _load_metadata(self) -> Dict[str, Any]:
         """Load metadata from file if it exists."""
         if os.path.exists(self.metadata_file):
@@ -45,12 +60,17 @@ class FileChatHistory:
             "updated_at": datetime.now(timezone.utc).isoformat()
         }
 
-    def _save_metadata(self):
-        """Save metadata to file."""
+    def _save_metadata(self, metadata: Dict[str, Any]):
+        """Save metadata to file (caller holds the user lock).
+
+        The saved dict replaces self.metadata rather than being changed in place,
+        so readers iterating the previous one aren't affected.
+        """
         try:
-            self.metadata["updated_at"] = datetime.now(timezone.utc).isoformat()
-            with open(self.metadata_file, "w") as f:
-                json.dump(self.metadata, f, indent=2)
+            metadata["updated_at"] = datetime.now(timezone.utc).isoformat()
+            write_json(self.metadata_file, metadata)
+            self._metadata_stamp = file_stamp(self.metadata_file)
+            self.metadata = metadata
         except Exception as e:
             print(f"Error saving metadata: {str(e)}")
 
@@ -86,44 +106,50 @@ class FileChatHistory:
         # Get conversation file
         conversation_file = self._get_conversation_file(conversation_id)
 
-        # Load existing interactions or create new list
-        interactions = []
-        if os.path.exists(conversation_file):
+        with user_lock(self.persist_directory):
+            # Load existing interactions or create new list
+            interactions = self._read_conversation_file(conversation_file)
+
+            # Add new interaction
+            interactions.append(interaction)
+
+            # Save interactions
             try:
-                with open(conversation_file, "r") as f:
-                    interactions = json.load(f)
+                write_json(conversation_file, interactions)
             except Exception as e:
-                print(f"Error loading conversation file: {str(e)}")
+                print(f"Error saving conversation file: {str(e)}")
+
+            # Update the latest saved metadata
+            metadata = self._load_metadata()
+            if conversation_id not in metadata["conversations"]:
+                metadata["conversations"][conversation_id] = {
+                    "name": conversation_name or f"Conversation {len(metadata['conversations']) + 1}",
+                    "created_at": timestamp,
+                    "updated_at": timestamp,
+                    "interactions": []
+                }
+
+            metadata["conversations"][conversation_id]["interactions"].append({
+                "interaction_id": interaction_id,
+                "timestamp": timestamp
+            })
+            metadata["conversations"][conversation_id]["updated_at"] = timestamp
+
+            # Save metadata
+            self._save_metadata(metadata)
 
-        # Add new interaction
-        interactions.append(interaction)
+        return interaction_id
 
-        # Save interactions
+    def _read_conversation_file(self, conversation_file: str) -> List[Dict[str, str]]:
+        """Load a conversation's interactions, or an empty list if it has none."""
+        if not os.path.exists(conversation_file):
+            return []
         try:
-            with open(conversation_file, "w") as f:
-                json.dump(interactions, f, indent=2)
+            with open(conversation_file, "r") as f:
+                return json.load(f)
         except Exception as e:
-            print(f"Error saving conversation file: {str(e)}")
-
-        # Update metadata
-        if conversation_id not in self.metadata["conversations"]:
-            self.metadata["conversations"][conversation_id] = {
-                "name": conversation_name or f"Conversation {len(self.metadata['conversations']) + 1}",
-                "created_at": timestamp,
-                "updated_at": timestamp,
-                "interactions": []
-            }
-
-        self.metadata["conversations"][conversation_id]["interactions"].append({
-            "interaction_id": interaction_id,
-            "timestamp": timestamp
-        })
-        self.metadata["conversations"][conversation_id]["updated_at"] = timestamp
-
-        # Save metadata
-        self._save_metadata()
-
-        return interaction_id
+            print(f"Error loading conversation file: {str(e)}")
+            return []
 
     def get_conversation_history(self, conversation_id: str) -> List[Dict[str, str]]:
         """Get the complete history of a specific conversation.
@@ -134,26 +160,49 @@ class FileChatHistory:
         Returns:
             List of interactions in the conversation
         """
-        if conversation_id not in self.metadata["conversations"]:
+        if conversation_id not in self._current_metadata()["conversations"]:
             return []
 
-        # Get conversation file
-        conversation_file = self._get_conversation_file(conversation_id)
-
         # Load interactions
-        interactions = []
-        if os.path.exists(conversation_file):
-            try:
-                with open(conversation_file, "r") as f:
-                    interactions = json.load(f)
-            except Exception as e:
-                print(f"Error loading conversation file: {str(e)}")
+        interactions = self._read_conversation_file(self._get_conversation_file(conversation_id))
 
         # Sort by timestamp
         interactions.sort(key=lambda x: x.get("timestamp", ""))
 
         return interactions
 
+    def get_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Get the stored rolling summary of a conversation's older turns.
+
+        Args:
+            conversation_id: ID of the conversation
+
+        Returns:
+            The summary record, or None if there is none
+        """
+        conversation = self._current_metadata()["conversations"].get(conversation_id)
+        return conversation.get("summary") if conversation else None
+
+    def has_interactions(self, conversation_id: str) -> bool:
+        """Check whether a conversation has any saved interactions."""
+        conversation = self._current_metadata()["conversations"].get(conversation_id)
+        return bool(conversation and conversation["interactions"])
+
+    def set_summary(self, conversation_id: str, summary: Dict[str, Any]):
+        """Store the rolling summary of a conversation's older turns.
+
+        Args:
+            conversation_id: ID of the conversation
+            summary: Summary record (see app.memory.history_window)
+        """
+        with user_lock(self.persist_directory):
+            metadata = self._load_metadata()
+            conversation = metadata["conversations"].get(conversation_id)
+            if conversation is None:
+                return
+            conversation["summary"] = summary
+            self._save_metadata(metadata)
+
     def list_conversations(self) -> List[Dict[str, Any]]:
         """List all conversations for the user.
 
@@ -168,7 +217,7 @@ class FileChatHistory:
                 "updated_at": conv_data["updated_at"],
                 "interaction_count": len(conv_data["interactions"])
             }
-            for conv_id, conv_data in self.metadata["conversations"].items()
+            for conv_id, conv_data in self._current_metadata()["conversations"].items()
         ]
 
     def rename_conversation(self, conversation_id: str, new_name: str) -> bool:
@@ -181,12 +230,14 @@ class FileChatHistory:
         Returns:
             True if successful, False otherwise
         """
-        if conversation_id not in self.metadata["conversations"]:
-            return False
+        with user_lock(self.persist_directory):
+            metadata = self._load_metadata()
+            if conversation_id not in metadata["conversations"]:
+                return False
 
-        self.metadata["conversations"][conversation_id]["name"] = new_name
-        self.metadata["conversations"][conversation_id]["updated_at"] = datetime.now(timezone.utc).isoformat()
-        self._save_metadata()
+            metadata["conversations"][conversation_id]["name"] = new_name
+            metadata["conversations"][conversation_id]["updated_at"] = datetime.now(timezone.utc).isoformat()
+            self._save_metadata(metadata)
 
         return True
 
@@ -199,20 +250,22 @@ class FileChatHistory:
         Returns:
             True if successful, False otherwise
         """
-        if conversation_id not in self.metadata["conversations"]:
-            return False
-
-        # Delete conversation file
-        conversation_file = self._get_conversation_file(conversation_id)
-        if os.path.exists(conversation_file):
-            try:
-                os.remove(conversation_file)
-            except Exception as e:
-                print(f"Error deleting conversation file: {str(e)}")
-
-        # Delete from metadata
-        del self.metadata["conversations"][conversation_id]
-        self._save_metadata()
+        with user_lock(self.persist_directory):
+            metadata = self._load_metadata()
+            if conversation_id not in metadata["conversations"]:
+                return False
+
+            # Delete conversation file
+            conversation_file = self._get_conversation_file(conversation_id)
+            if os.path.exists(conversation_file):
+                try:
+                    os.remove(conversation_file)
+                except Exception as e:
+                    print(f"Error deleting conversation file: {str(e)}")
+
+            # Delete from metadata
+            del metadata["conversations"][conversation_id]
+            self._save_metadata(metadata)
 
         return True
 
@@ -231,7 +284,7 @@ class FileChatHistory:
         """
         # Get all conversations
         all_interactions = []
-        for conversation_id in self.metadata["conversations"]:
+        for conversation_id in list(self._current_metadata()["conversations"]):
             interactions = self.get_conversation_history(conversation_id)
             all_interactions.extend(interactions)
 
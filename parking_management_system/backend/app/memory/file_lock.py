@@ -0,0 +1,73 @@
+"""
+Locking and atomic writes for the per-user JSON files under chat_history/ and memory_db/.
+
+A user's memory objects are shared by all of their cached conversation agents
+and, with several uvicorn workers, the same files are written by more than one
+process. Writers therefore hold user_lock() while they re-read the file, apply
+their change and write it back with write_json(), so no update is lost and
+readers never see a half-written file.
+"""
+
+import os
+import json
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; the thread lock still covers a single worker
+    fcntl = None
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _thread_lock(directory: str) -> threading.Lock:
+    """Get the process-wide lock for a directory."""
+    key = os.path.abspath(directory)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def user_lock(directory: str):
+    """Hold the lock on a user's directory, across threads and worker processes.
+
+    Not reentrant: don't call another locked method while holding it.
+    """
+    with _thread_lock(directory):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_json(path: str, data: Any):
+    """Write JSON to a temporary file and move it into place."""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def file_stamp(path: str):
+    """Get a value that changes whenever the file is replaced, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
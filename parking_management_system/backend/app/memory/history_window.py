@@ -0,0 +1,150 @@
+"""
+Token-budgeted conversation history for LLM prompts.
+
+Replaying every turn of a long conversation makes each prompt bigger, slower
+and more expensive than the last. The history window keeps the newest turns
+that fit in HISTORY_TOKEN_BUDGET tokens (default 2000) and folds older turns
+into a rolling summary: one condensed line per turn, stored next to the
+conversation in the chat history metadata so each turn is condensed once.
+The summary is only rewritten when it grows past SUMMARY_TOKEN_BUDGET tokens
+(default 400); its oldest lines are then collapsed into a count.
+
+Tokens are estimated locally (about four characters per token for words,
+one per punctuation mark), which tracks BPE tokenizers closely enough for
+budgeting without loading one.
+"""
+
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Tokens kept from each side of a turn when it is folded into the summary
+SUMMARY_LINE_QUERY_TOKENS = 40
+SUMMARY_LINE_RESPONSE_TOKENS = 40
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text."""
+    return sum((len(token) + 3) // 4 for token in TOKEN_PATTERN.findall(text or ""))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text to roughly max_tokens tokens, on a token boundary."""
+    used = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        used += (len(match.group(0)) + 3) // 4
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + " ..."
+    return text
+
+def turn_tokens(interaction: Dict[str, Any]) -> int:
+    """Estimate the prompt tokens of one user/agent turn."""
+    return count_tokens(interaction.get("user_query", "")) + count_tokens(interaction.get("agent_response", ""))
+
+def summarize_turn(interaction: Dict[str, Any]) -> str:
+    """Condense a turn to a single summary line."""
+    query = " ".join((interaction.get("user_query") or "").split())
+    response_lines = [line.strip(" *-") for line in (interaction.get("agent_response") or "").splitlines()]
+    response = next((line for line in response_lines if line), "")
+    return (
+        f"* User: {truncate_tokens(query, SUMMARY_LINE_QUERY_TOKENS)}"
+        f" | Assistant: {truncate_tokens(response, SUMMARY_LINE_RESPONSE_TOKENS)}"
+    )
+
+class HistoryWindow:
+    """Selects the history sent to the LLM for a conversation."""
+
+    def __init__(self, summary_store=None, token_budget: Optional[int] = None, summary_budget: Optional[int] = None):
+        """
+        Args:
+            summary_store: Object with get_summary(conversation_id) and
+                set_summary(conversation_id, summary) (e.g. FileChatHistory);
+                summaries are kept in memory when None
+            token_budget: Tokens allowed for the verbatim recent turns
+            summary_budget: Tokens the rolling summary may grow to before it is compacted
+        """
+        self.summary_store = summary_store
+        self.token_budget = token_budget if token_budget is not None else int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+        self.summary_budget = summary_budget if summary_budget is not None else int(os.getenv("SUMMARY_TOKEN_BUDGET", "400"))
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def recent_turns(self, interactions: List[Dict[str, Any]]) -> int:
+        """Get the index of the first turn that fits in the budget, counting back from the newest."""
+        used = 0
+        start = len(interactions)
+        while start > 0:
+            tokens = turn_tokens(interactions[start - 1])
+            if used + tokens > self.token_budget:
+                break
+            used += tokens
+            start -= 1
+        return start
+
+    def build(self, conversation_id: Optional[str], interactions: List[Dict[str, Any]]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """Split a conversation's turns (oldest first) into a summary of the older turns and the recent turns.
+
+        Returns (summary text or None, recent turns oldest first).
+        """
+        start = self.recent_turns(interactions)
+        if start == 0:
+            return None, interactions
+        if conversation_id is None:
+            # Nothing to cache the summary under
+            return None, interactions[start:]
+
+        summary = self._load_summary(conversation_id)
+        folded = summary["turns"]
+        if folded > start:
+            # The window has grown past what was folded (e.g. a bigger budget); start over
+            summary, folded = {"turns": 0, "omitted": 0, "lines": []}, 0
+
+        if folded < start:
+            summary["lines"].extend(summarize_turn(interaction) for interaction in interactions[folded:start])
+            summary["turns"] = start
+            self._compact(summary)
+            self._save_summary(conversation_id, summary)
+
+        return self.format_summary(summary), interactions[start:]
+
+    def _compact(self, summary: Dict[str, Any]):
+        """Collapse the oldest summary lines into a count once the summary is over budget."""
+        if sum(count_tokens(line) for line in summary["lines"]) <= self.summary_budget:
+            return
+        # Keep the newest lines within half the budget, so compaction stays rare
+        kept, used = [], 0
+        for line in reversed(summary["lines"]):
+            used += count_tokens(line)
+            if used > self.summary_budget // 2:
+                break
+            kept.append(line)
+        kept.reverse()
+        summary["omitted"] += len(summary["lines"]) - len(kept)
+        summary["lines"] = kept
+
+    @staticmethod
+    def format_summary(summary: Dict[str, Any]) -> str:
+        """Render a stored summary for the prompt."""
+        lines = []
+        if summary["omitted"]:
+            lines.append(f"* ({summary['omitted']} earlier exchanges not shown)")
+        lines.extend(summary["lines"])
+        return "Summary of earlier messages in this conversation:\n" + "\n".join(lines)
+
+    def _load_summary(self, conversation_id: str) -> Dict[str, Any]:
+        if self.summary_store is not None:
+            stored = self.summary_store.get_summary(conversation_id)
+        else:
+            with self._lock:
+                stored = self._summaries.get(conversation_id)
+        if not stored:
+            return {"turns": 0, "omitted": 0, "lines": []}
+        return {"turns": stored["turns"], "omitted": stored.get("omitted", 0), "lines": list(stored["lines"])}
+
+    def _save_summary(self, conversation_id: str, summary: Dict[str, Any]):
+        if self.summary_store is not None:
+            self.summary_store.set_summary(conversation_id, summary)
+        else:
+            with self._lock:
+                self._summaries[conversation_id] = summary
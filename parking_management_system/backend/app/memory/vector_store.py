@@ -2,36 +2,48 @@ from typing import List, Dict, Any, Optional
 import os
 import json
 import uuid
+from functools import lru_cache
 from datetime import datetime, timezone
 
-# Try different import paths based on what's available
-try:
-    from langchain_chroma import Chroma
-except ImportError:
+from app.memory.file_lock import user_lock, write_json, file_stamp
+
+@lru_cache(maxsize=None)
+def _langchain_classes():
+    """Import Chroma, HuggingFaceEmbeddings and Document on first use.
+
+    These pull in chromadb, sentence-transformers and torch, which take seconds
+    to import, so they are only loaded once a vector store is actually created.
+    """
+    # Try different import paths based on what's available
     try:
-        from langchain_community.vectorstores import Chroma
+        from langchain_chroma import Chroma
     except ImportError:
-        from langchain.vectorstores import Chroma
+        try:
+            from langchain_community.vectorstores import Chroma
+        except ImportError:
+            from langchain.vectorstores import Chroma
 
-try:
-    from langchain_huggingface import HuggingFaceEmbeddings
-except ImportError:
     try:
-        from langchain_community.embeddings import HuggingFaceEmbeddings
+        from langchain_huggingface import HuggingFaceEmbeddings
     except ImportError:
-        from langchain.embeddings import HuggingFaceEmbeddings
+        try:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+        except ImportError:
+            from langchain.embeddings import HuggingFaceEmbeddings
 
-try:
-    from langchain_core.documents import Document
-except ImportError:
     try:
-        from langchain.schema import Document
+        from langchain_core.documents import Document
     except ImportError:
-        # Define a simple Document class if all else fails
-        class Document:
-            def __init__(self, page_content, metadata=None):
-                self.page_content = page_content
-                self.metadata = metadata or {}
+        try:
+            from langchain.schema import Document
+        except ImportError:
+            # Define a simple Document class if all else fails
+            class Document:
+                def __init__(self, page_content, metadata=None):
+                    self.page_content = page_content
+                    self.metadata = metadata or {}
+
+    return Chroma, HuggingFaceEmbeddings, Document
 
 class VectorChatHistory:
     """Chat history manager that uses vector database for semantic search."""
@@ -50,6 +62,7 @@ class VectorChatHistory:
         os.makedirs(self.persist_directory, exist_ok=True)
 
         # Initialize embeddings model
+        _, HuggingFaceEmbeddings, _ = _langchain_classes()
         self.embeddings = HuggingFaceEmbeddings(
             model_name="all-MiniLM-L6-v2",
             cache_folder=os.path.join(persist_directory, "models")
@@ -60,10 +73,12 @@ class VectorChatHistory:
 
         # Metadata file for conversation names and other metadata
         self.metadata_file = os.path.join(self.persist_directory, "metadata.json")
+        self._metadata_stamp = file_stamp(self.metadata_file)
         self.metadata = self._load_metadata()
 
     def _initialize_vector_store(self):
         """Initialize or load the vector store."""
+        Chroma, _, _ = _langchain_classes()
         try:
             # Try to load existing vector store
             self.vector_store = Chroma(
@@ -95,12 +110,21 @@ class VectorChatHistory:
             "updated_at": datetime.now(timezone.utc).isoformat()
         }
 
-    def _save_metadata(self):
-        """Save metadata to file."""
+    def _current_metadata(self) -> Dict[str, Any]:
+        """Get the metadata, reloading it if another agent or worker has saved it since."""
+        stamp = file_stamp(self.metadata_file)
+        if stamp != self._metadata_stamp:
+            self.metadata = self._load_metadata()
+            self._metadata_stamp = stamp
+        return self.metadata
+
+    def _save_metadata(self, metadata: Dict[str, Any]):
+        """Save metadata to file (caller holds the user lock), replacing self.metadata."""
         try:
-            self.metadata["updated_at"] = datetime.now(timezone.utc).isoformat()
-            with open(self.metadata_file, "w") as f:
-                json.dump(self.metadata, f, indent=2)
+            metadata["updated_at"] = datetime.now(timezone.utc).isoformat()
+            write_json(self.metadata_file, metadata)
+            self._metadata_stamp = file_stamp(self.metadata_file)
+            self.metadata = metadata
         except Exception as e:
             print(f"Error saving metadata: {str(e)}")
 
@@ -122,6 +146,7 @@ class VectorChatHistory:
         timestamp = datetime.now(timezone.utc).isoformat()
 
         # Create documents for vector store
+        _, _, Document = _langchain_classes()
         user_doc = Document(
             page_content=user_query,
             metadata={
@@ -147,23 +172,26 @@ class VectorChatHistory:
         # Add documents to vector store
         self.vector_store.add_documents([user_doc, agent_doc])
 
-        # Update metadata
-        if conversation_id not in self.metadata["conversations"]:
-            self.metadata["conversations"][conversation_id] = {
-                "name": conversation_name or f"Conversation {len(self.metadata['conversations']) + 1}",
-                "created_at": timestamp,
-                "updated_at": timestamp,
-                "interactions": []
-            }
+        # Update the latest saved metadata, which the user's other agents and
+        # other workers also write
+        with user_lock(self.persist_directory):
+            metadata = self._load_metadata()
+            if conversation_id not in metadata["conversations"]:
+                metadata["conversations"][conversation_id] = {
+                    "name": conversation_name or f"Conversation {len(metadata['conversations']) + 1}",
+                    "created_at": timestamp,
+                    "updated_at": timestamp,
+                    "interactions": []
+                }
 
-        self.metadata["conversations"][conversation_id]["interactions"].append({
-            "interaction_id": interaction_id,
-            "timestamp": timestamp
-        })
-        self.metadata["conversations"][conversation_id]["updated_at"] = timestamp
+            metadata["conversations"][conversation_id]["interactions"].append({
+                "interaction_id": interaction_id,
+                "timestamp": timestamp
+            })
+            metadata["conversations"][conversation_id]["updated_at"] = timestamp
 
-        # Save metadata
-        self._save_metadata()
+            # Save metadata
+            self._save_metadata(metadata)
 
         # Note: persist() is no longer needed in Chroma 0.4.x as docs are automatically persisted
         # self.vector_store.persist()
@@ -228,13 +256,14 @@ class VectorChatHistory:
         Returns:
             List of interactions in the conversation
         """
-        if conversation_id not in self.metadata["conversations"]:
+        conversation = self._current_metadata()["conversations"].get(conversation_id)
+        if conversation is None:
             return []
 
         # Get interaction IDs for the conversation
         interaction_ids = [
             interaction["interaction_id"]
-            for interaction in self.metadata["conversations"][conversation_id]["interactions"]
+            for interaction in conversation["interactions"]
         ]
 
         # Query vector store for each interaction
@@ -297,7 +326,7 @@ class VectorChatHistory:
                 "updated_at": conv_data["updated_at"],
                 "interaction_count": len(conv_data["interactions"])
             }
-            for conv_id, conv_data in self.metadata["conversations"].items()
+            for conv_id, conv_data in self._current_metadata()["conversations"].items()
         ]
 
     def rename_conversation(self, conversation_id: str, new_name: str) -> bool:
@@ -310,12 +339,14 @@ class VectorChatHistory:
         Returns:
             True if successful, False otherwise
         """
-        if conversation_id not in self.metadata["conversations"]:
-            return False
+        with user_lock(self.persist_directory):
+            metadata = self._load_metadata()
+            if conversation_id not in metadata["conversations"]:
+                return False
 
-        self.metadata["conversations"][conversation_id]["name"] = new_name
-        self.metadata["conversations"][conversation_id]["updated_at"] = datetime.now(timezone.utc).isoformat()
-        self._save_metadata()
+            metadata["conversations"][conversation_id]["name"] = new_name
+            metadata["conversations"][conversation_id]["updated_at"] = datetime.now(timezone.utc).isoformat()
+            self._save_metadata(metadata)
 
         return True
 
@@ -328,24 +359,26 @@ class VectorChatHistory:
         Returns:
             True if successful, False otherwise
         """
-        if conversation_id not in self.metadata["conversations"]:
-            return False
-
-        # Get interaction IDs for the conversation
-        interaction_ids = [
-            interaction["interaction_id"]
-            for interaction in self.metadata["conversations"][conversation_id]["interactions"]
-        ]
-
-        # Delete documents from vector store
-        for interaction_id in interaction_ids:
-            self.vector_store.delete(
-                where={"interaction_id": interaction_id}
-            )
-
-        # Delete from metadata
-        del self.metadata["conversations"][conversation_id]
-        self._save_metadata()
+        with user_lock(self.persist_directory):
+            metadata = self._load_metadata()
+            if conversation_id not in metadata["conversations"]:
+                return False
+
+            # Get interaction IDs for the conversation
+            interaction_ids = [
+                interaction["interaction_id"]
+                for interaction in metadata["conversations"][conversation_id]["interactions"]
+            ]
+
+            # Delete documents from vector store
+            for interaction_id in interaction_ids:
+                self.vector_store.delete(
+                    where={"interaction_id": interaction_id}
+                )
+
+            # Delete from metadata
+            del metadata["conversations"][conversation_id]
+            self._save_metadata(metadata)
 
         # Note: persist() is no longer needed in Chroma 0.4.x as docs are automatically persisted
         # self.vector_store.persist()
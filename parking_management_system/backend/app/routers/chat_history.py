@@ -1,11 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Header
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 import uuid
 
-from ..database.database import get_db
-from ..memory.file_chat_history import FileChatHistory
+from ..agent.session_cache import AgentSessionCache
 
 router = APIRouter(
     prefix="/chat-history",
@@ -32,14 +30,14 @@ class InteractionResponse(BaseModel):
     agent_response: str
     timestamp: str
 
-# Helper function to get chat history
+# Helper function to get chat history (shared with the user's cached agents, so
+# renames and deletes aren't overwritten by an agent's stale copy)
 def get_chat_history(user_id: str):
-    return FileChatHistory(user_id=user_id)
+    return AgentSessionCache().get_file_chat(user_id)
 
 @router.get("/conversations", response_model=List[ConversationResponse])
 def list_conversations(
-    x_user_id: str = Header(..., description="User ID for conversation tracking"),
-    db: Session = Depends(get_db)
+    x_user_id: str = Header(..., description="User ID for conversation tracking")
 ):
     """List all conversations for the user."""
     try:
@@ -52,8 +50,7 @@ def list_conversations(
 @router.post("/conversations", response_model=ConversationResponse)
 def create_conversation(
     conversation: ConversationCreate,
-    x_user_id: str = Header(..., description="User ID for conversation tracking"),
-    db: Session = Depends(get_db)
+    x_user_id: str = Header(..., description="User ID for conversation tracking")
 ):
     """Create a new conversation."""
     try:
@@ -84,8 +81,7 @@ def create_conversation(
 @router.get("/conversations/{conversation_id}", response_model=List[InteractionResponse])
 def get_conversation_history(
     conversation_id: str,
-    x_user_id: str = Header(..., description="User ID for conversation tracking"),
-    db: Session = Depends(get_db)
+    x_user_id: str = Header(..., description="User ID for conversation tracking")
 ):
     """Get the complete history of a specific conversation."""
     try:
@@ -108,8 +104,7 @@ def get_conversation_history(
 def rename_conversation(
     conversation_id: str,
     conversation: ConversationRename,
-    x_user_id: str = Header(..., description="User ID for conversation tracking"),
-    db: Session = Depends(get_db)
+    x_user_id: str = Header(..., description="User ID for conversation tracking")
 ):
     """Rename a conversation."""
     try:
@@ -134,8 +129,7 @@ def rename_conversation(
 @router.delete("/conversations/{conversation_id}")
 def delete_conversation(
     conversation_id: str,
-    x_user_id: str = Header(..., description="User ID for conversation tracking"),
-    db: Session = Depends(get_db)
+    x_user_id: str = Header(..., description="User ID for conversation tracking")
 ):
     """Delete a conversation and all its interactions."""
     try:
@@ -155,8 +149,7 @@ def delete_conversation(
 def search_conversations(
     query: str,
     limit: int = 5,
-    x_user_id: str = Header(..., description="User ID for conversation tracking"),
-    db: Session = Depends(get_db)
+    x_user_id: str = Header(..., description="User ID for conversation tracking")
 ):
     """Search for relevant interactions across all conversations."""
     try:
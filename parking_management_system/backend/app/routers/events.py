@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+
+from ..database.models import VehicleType
+from ..events.availability import RESYNC_MESSAGE, AvailabilityBroadcaster
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+)
+
+# Seconds between keep-alive comments, so proxies don't close idle streams
+HEARTBEAT_INTERVAL = 15
+
+@router.get("/availability")
+async def stream_availability(
+    request: Request,
+    mall_id: Optional[int] = None,
+    vehicle_type: Optional[str] = None
+):
+    """Server-Sent Events stream of slot availability changes.
+
+    Emits one `availability` event whenever a booking is created, updated,
+    cancelled or deleted (or a slot changes), optionally filtered by mall and
+    vehicle type. A `resync` event means events were dropped and the client
+    should fetch the slots again.
+    """
+    if vehicle_type:
+        try:
+            vehicle_type = VehicleType(vehicle_type.lower()).value
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid vehicle type: {vehicle_type}")
+
+    broadcaster = AvailabilityBroadcaster()
+    subscription = broadcaster.subscribe(mall_id=mall_id, vehicle_type=vehicle_type)
+
+    async def event_stream():
+        try:
+            # Tell the browser how long to wait before reconnecting
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_INTERVAL)
+                    if message == RESYNC_MESSAGE:
+                        yield "event: resync\ndata: {}\n\n"
+                    else:
+                        yield f"event: availability\ndata: {message}\n\n"
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
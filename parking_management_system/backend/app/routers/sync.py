@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Header
+from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel
+
+from ..database.database import get_read_db
+from ..database import sync as change_tracking
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["sync"],
+)
+
+# Response model
+class SyncResponse(BaseModel):
+    cursor: int
+    full_sync: bool
+    slots: List[Dict[str, Any]]
+    bookings: List[Dict[str, Any]]
+    deleted_slots: List[int]
+    deleted_bookings: List[int]
+
+@router.get("", response_model=SyncResponse)
+def sync_changes(
+    since: Optional[int] = None,
+    x_user_id: str = Header(..., description="User ID whose bookings are synced"),
+    db: Session = Depends(get_read_db)
+):
+    """Get slots and bookings created, updated or deleted since the given cursor.
+
+    Pass the `cursor` from the previous response as `since` on the next call.
+    Omitting `since` returns a full snapshot to seed the client's local copy,
+    as does a cursor the server hasn't reached (e.g. after a database reset).
+    """
+    try:
+        return change_tracking.get_changes(db, user_id=x_user_id, since=since)
+    except Exception as e:
+        print(f"Error in sync_changes: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error syncing changes: {str(e)}")
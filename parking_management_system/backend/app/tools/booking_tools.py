@@ -47,10 +47,9 @@ class BookingCreationTool(BaseTool):
                 return f"Parking slot with ID {parking_slot_id} is not available"
             
             # Check for conflicting bookings
-            conflicting_bookings = crud.get_active_bookings_for_slot(self.db, parking_slot_id)
-            for booking in conflicting_bookings:
-                if (booking.start_time < end_datetime and booking.end_time > start_datetime):
-                    return f"Parking slot is already booked for the requested time period"
+            conflicting_bookings = crud.get_conflicting_bookings(self.db, parking_slot_id, start_datetime, end_datetime)
+            if conflicting_bookings:
+                return f"Parking slot is already booked for the requested time period"
             
             # Calculate total amount
             duration_hours = (end_datetime - start_datetime).total_seconds() / 3600
@@ -150,8 +149,8 @@ class BookingInquiryTool(BaseTool):
             if not user:
                 return f"User with ID {user_id} not found"
             
-            # Get user bookings
-            bookings = crud.get_user_bookings(self.db, user_id)
+            # Get user bookings, with slot and vehicle details already joined in
+            bookings = crud.get_user_booking_views(self.db, user_id)
             
             if not bookings:
                 return f"No bookings found for user with ID {user_id}"
@@ -160,16 +159,10 @@ class BookingInquiryTool(BaseTool):
             response = f"Bookings for user {user.first_name} {user.last_name} (ID: {user_id}):\n\n"
             
             for booking in bookings:
-                # Get parking slot details
-                parking_slot = crud.get_parking_slot(self.db, booking.parking_slot_id)
-                
-                # Get vehicle details
-                vehicle = crud.get_vehicle(self.db, booking.vehicle_id)
-                
-                response += f"Booking ID: {booking.id}\n"
+                response += f"Booking ID: {booking.booking_id}\n"
                 response += f"Status: {booking.status.value}\n"
-                response += f"Vehicle: {vehicle.make} {vehicle.model} ({vehicle.license_plate})\n"
-                response += f"Parking Slot: #{parking_slot.slot_number} (Floor: {parking_slot.floor}, Section: {parking_slot.section})\n"
+                response += f"Vehicle: {booking.vehicle_make} {booking.vehicle_model} ({booking.license_plate})\n"
+                response += f"Parking Slot: #{booking.slot_number} (Floor: {booking.floor}, Section: {booking.section})\n"
                 response += f"Start Time: {booking.start_time.strftime('%Y-%m-%d %H:%M')}\n"
                 response += f"End Time: {booking.end_time.strftime('%Y-%m-%d %H:%M')}\n"
                 response += f"Total Amount: ${booking.total_amount:.2f}\n\n"
@@ -0,0 +1,162 @@
+"""
+Load test the full chat pipeline against the local LLM stand-in.
+
+Starts benchmarks/llm_stub_server.py and the backend (uvicorn, on a scratch
+SQLite database and chat history directory) as subprocesses, with the
+backend's LLM_BASE_URL pointed at the stub. Concurrent simulated clients then
+send a mix of FAQ, rate, availability and small-talk queries to /chat for
+the given duration.
+
+Every request comes from a new user in a new conversation. The agent keeps a
+user's last detected intent, so after one "show my bookings" a reused user's
+questions would all go to the direct handlers and never reach the LLM. The
+response cache is keyed per user, so with new users every LLM-bound question
+is a cache miss.
+
+Reported: throughput, latency percentiles, response status counts, how many
+requests were answered directly, from the response cache or by the LLM, the
+stub's view of upstream traffic (outcomes, prompt tokens) and the backend's
+/llm/metrics. Options not listed below are passed through to the stub, e.g.
+--latency lognormal --latency-ms 600 --rate-429 0.05.
+
+Usage:
+    python benchmarks/chat_load_test.py --users 16 --duration 30 -- --latency lognormal --latency-ms 500
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import httpx
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "What time does Nexus Mall open?",
+    "Is there a food court at Phoenix Market City?",
+    "How do I get to Orion Mall?",
+    "what are the rates",
+    "How much does parking cost for a bike?",
+    "Are there any free spots for a car?",
+    "show available slots",
+    "hello",
+    "thanks a lot",
+    "Can I pay by card?",
+    "Do you have EV charging?",
+    "show my bookings",
+]
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    """Poll a URL until it answers or the process exits."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+def run_client(base_url: str, client_id: int, deadline: float, seed: int, latencies, statuses, lock):
+    """Send queries, each as a new user in a new conversation, until the deadline."""
+    rng = random.Random(seed)
+    with httpx.Client(base_url=base_url, timeout=120.0) as client:
+        request_number = 0
+        while time.perf_counter() < deadline:
+            request_number += 1
+            user_id = client_id * 1_000_000 + request_number
+            headers = {"X-User-ID": str(user_id), "X-User-Name": f"Load User {user_id}"}
+            started = time.perf_counter()
+            try:
+                response = client.post("/chat", json={"query": rng.choice(QUERIES), "conversation_id": f"load-{user_id}"}, headers=headers)
+                status = response.status_code
+            except httpx.TransportError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="Concurrent simulated clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to send load")
+    parser.add_argument("--backend-port", type=int, default=8200)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--no-response-cache", action="store_true", help="Send every cacheable question to the stub")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Show the backend's output")
+    args, stub_args = parser.parse_known_args()
+    stub_args = [arg for arg in stub_args if arg != "--"]
+
+    workdir = tempfile.mkdtemp(prefix="chat_load_")
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    backend_url = f"http://127.0.0.1:{args.backend_port}"
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIRECTORY,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        "LLM_BASE_URL": f"{stub_url}/v1",
+        "LLM_API_KEY": "stub",
+    }
+    if args.no_response_cache:
+        env["LLM_CACHE_SIZE"] = "0"
+
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIRECTORY, "benchmarks", "llm_stub_server.py"),
+         "--port", str(args.stub_port), "--seed", str(args.seed), *stub_args],
+        env=env
+    )
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.backend_port), "--log-level", "warning"],
+        env=env, cwd=workdir,
+        stdout=None if args.verbose else subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(f"{stub_url}/stats", stub)
+        wait_until_ready(f"{backend_url}/health-check", backend)
+        httpx.post(f"{stub_url}/stats/reset")
+
+        latencies, statuses, lock = [], Counter(), threading.Lock()
+        deadline = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(target=run_client, args=(backend_url, client_id, deadline, args.seed * 1000 + client_id, latencies, statuses, lock))
+            for client_id in range(1, args.users + 1)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        print(f"{args.users} clients for {elapsed:.1f}s: {len(latencies)} requests, {len(latencies) / elapsed:.1f} req/s")
+        print(f"  latency p50 {1000 * percentile(latencies, 0.5):.0f} ms, p95 {1000 * percentile(latencies, 0.95):.0f} ms, "
+              f"p99 {1000 * percentile(latencies, 0.99):.0f} ms")
+        print(f"  statuses: {dict(statuses)}")
+        metrics = httpx.get(f"{backend_url}/llm/metrics").json()
+        paths = {path: metrics["stage_timings"].get(path, {}).get("requests", 0) for path in ["direct", "cached", "llm"]}
+        print(f"  answered: {paths['direct']} directly, {paths['cached']} from the response cache, {paths['llm']} by the LLM")
+        print(f"  upstream (stub): {httpx.get(f'{stub_url}/stats').json()}")
+        print(f"  backend /llm/metrics: {metrics}")
+    finally:
+        for process in (backend, stub):
+            process.terminate()
+            process.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark per-call overhead of the cached crud.py statements.
+
+Each hot lookup is timed twice against the same seeded in-memory database:
+once built as a fresh ORM query on every call (the previous crud.py style)
+and once through the crud.py function, which uses a cached lambda statement.
+Both run the same SQL, so the difference is statement construction and
+compilation overhead.
+
+Usage:
+    python benchmarks/crud_statement_benchmark.py --iterations 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.database import Base
+from app.database import crud, models
+from app.database.init_db import init_db
+
+def fresh_get_parking_slot(db, slot_id):
+    return db.query(models.ParkingSlot).filter(models.ParkingSlot.id == slot_id).first()
+
+def fresh_get_booking(db, booking_id):
+    return db.query(models.Booking).filter(models.Booking.id == booking_id).first()
+
+def fresh_get_active_bookings_for_slot(db, slot_id):
+    return db.query(models.Booking).filter(
+        models.Booking.parking_slot_id == slot_id,
+        models.Booking.status == models.BookingStatus.CONFIRMED,
+        models.Booking.end_time > datetime.utcnow()
+    ).all()
+
+def fresh_get_conflicting_bookings(db, slot_id, start_time, end_time):
+    return db.query(models.Booking).filter(
+        models.Booking.parking_slot_id == slot_id,
+        models.Booking.status == models.BookingStatus.CONFIRMED,
+        models.Booking.start_time < end_time,
+        models.Booking.end_time > start_time
+    ).all()
+
+def time_calls(func, args_list, iterations: int) -> float:
+    """Time a lookup over the argument list and return microseconds per call."""
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(*args_list[i % len(args_list)])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000, help="Calls per lookup and style")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    init_db(db)
+
+    slot_ids = [slot_id for (slot_id,) in db.query(models.ParkingSlot.id).all()]
+    booking_ids = [booking_id for (booking_id,) in db.query(models.Booking.id).all()] or [1]
+    now = datetime.now()
+    windows = [
+        (slot_id, now + timedelta(hours=offset), now + timedelta(hours=offset + 2))
+        for offset, slot_id in enumerate(slot_ids)
+    ]
+
+    lookups = [
+        ("get_parking_slot", fresh_get_parking_slot, crud.get_parking_slot, [(db, slot_id) for slot_id in slot_ids]),
+        ("get_booking", fresh_get_booking, crud.get_booking, [(db, booking_id) for booking_id in booking_ids]),
+        ("get_active_bookings_for_slot", fresh_get_active_bookings_for_slot, crud.get_active_bookings_for_slot, [(db, slot_id) for slot_id in slot_ids]),
+        ("get_conflicting_bookings", fresh_get_conflicting_bookings, crud.get_conflicting_bookings, [(db,) + window for window in windows]),
+    ]
+
+    print(f"{args.iterations} calls per lookup, microseconds per call\n")
+    print(f"{'lookup':<30}{'fresh':>10}{'cached':>10}{'saved':>10}")
+    for name, fresh, cached, args_list in lookups:
+        # Warm up both paths so the cached statements are compiled before timing
+        time_calls(fresh, args_list, 100)
+        time_calls(cached, args_list, 100)
+
+        fresh_us = time_calls(fresh, args_list, args.iterations)
+        cached_us = time_calls(cached, args_list, args.iterations)
+        print(f"{name:<30}{fresh_us:>10.1f}{cached_us:>10.1f}{1 - cached_us / fresh_us:>10.0%}")
+
+    db.close()
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Import-time budget check for the API process.
+
+Imports app.main in a fresh interpreter with `python -X importtime` and
+fails (exit code 1) if the cumulative import time exceeds the budget or if
+any of the heavy optional dependencies (LangChain, Chroma, sentence-
+transformers, torch) were imported. Those are only needed by the vector
+store and the LangChain tools, and must stay deferred until first use so
+workers become ready quickly.
+
+Usage:
+    python benchmarks/import_time_budget.py --budget-ms 1500 --runs 3
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level packages that must not be imported by app.main
+HEAVY_PACKAGES = [
+    "langchain", "langchain_core", "langchain_community", "langchain_chroma", "langchain_huggingface",
+    "chromadb", "sentence_transformers", "transformers", "torch"
+]
+
+def measure_import(module: str):
+    """Import a module in a fresh interpreter and return (total microseconds, imported module names)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors))
+
+    total_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        # Lines look like: "import time:   self [us] | cumulative | module"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported.add(name.strip())
+        # Nested imports are indented further; only top-level entries add up to the total
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us, imported
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500")), help="Maximum import time")
+    parser.add_argument("--runs", type=int, default=3, help="Runs to take the best of (the first can include disk cache misses)")
+    args = parser.parse_args()
+
+    timings = []
+    imported = set()
+    for _ in range(args.runs):
+        total_us, imported = measure_import(args.module)
+        timings.append(total_us / 1000)
+    best_ms = min(timings)
+
+    heavy = sorted(
+        name for name in imported
+        if name.split(".")[0] in HEAVY_PACKAGES
+    )
+
+    print(f"import {args.module}: best {best_ms:.0f} ms of {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy[:10])}")
+        failed = True
+    if best_ms > args.budget_ms:
+        print(f"FAIL: import time over budget by {best_ms - args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Measure how much LLM traffic the local intent classifier removes.
+
+A held-out set of labelled queries (none of them in the classifier's seed
+examples) is routed twice, starting from an empty conversation context:
+
+- keyword routing only: exact commands, then the gazetteer's intent keywords
+  (what _route_query did before the classifier)
+- keyword routing plus the classifier at the given confidence threshold
+
+For each, the share of queries answered without the LLM is reported, along
+with how many of those went to the wrong handler. Prediction latency is
+measured as well.
+
+Usage:
+    python benchmarks/intent_routing_benchmark.py --threshold 0.75
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agent.gazetteer import Gazetteer
+from app.agent.intent_classifier import OTHER, IntentClassifier, default_threshold, training_examples
+from tests.test_intent_routing import HELD_OUT
+
+# Exact commands _route_query handles before looking at intents
+COMMANDS = {
+    "check my bookings": "check_user_bookings", "show my bookings": "check_user_bookings",
+    "view my bookings": "check_user_bookings", "my bookings": "check_user_bookings",
+    "check bookings": "check_user_bookings",
+    "check parking rates": "check_parking_rates", "show rates": "check_parking_rates",
+    "parking rates": "check_parking_rates", "what are the rates": "check_parking_rates",
+    "how much does it cost": "check_parking_rates",
+    "check available slots": "check_available_slots", "show available slots": "check_available_slots",
+    "available slots": "check_available_slots", "find slots": "check_available_slots",
+    "find parking": "check_available_slots",
+}
+
+# Intents with a handler that needs nothing beyond the query (booking also needs a mall and vehicle)
+DIRECT_INTENTS = {"check_available_slots", "check_parking_rates", "check_user_bookings"}
+
+
+def keyword_route(gazetteer, query):
+    """The handler intent keyword routing picks, or None for the LLM."""
+    if query.lower() in COMMANDS:
+        return COMMANDS[query.lower()]
+    intent = gazetteer.extract(query)["intent"]
+    if intent and intent[1] in DIRECT_INTENTS:
+        return intent[1]
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=default_threshold(), help="Classifier confidence needed to route")
+    parser.add_argument("--iterations", type=int, default=5000, help="Predictions timed for the latency figure")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    classifier = IntentClassifier().train(training_examples(chat_history_directory=None))
+    print(f"Trained on {len(training_examples(chat_history_directory=None))} seed examples in {1000 * (time.perf_counter() - started):.0f} ms")
+
+    gazetteer = Gazetteer([])
+    keyword_routed = keyword_wrong = combined_routed = combined_wrong = 0
+    for query, expected in HELD_OUT:
+        routed = keyword_route(gazetteer, query)
+        if routed:
+            keyword_routed += 1
+            keyword_wrong += routed != expected
+        else:
+            intent, confidence = classifier.predict(query)
+            # Bookings also need a mall and vehicle in context, so they are counted as routable here
+            if intent != OTHER and confidence >= args.threshold:
+                routed = intent
+        if routed:
+            combined_routed += 1
+            combined_wrong += routed != expected
+
+    total = len(HELD_OUT)
+    print(f"{total} held-out queries, threshold {args.threshold}")
+    print(f"  keyword routing:        {keyword_routed:3d} answered without the LLM ({100 * keyword_routed / total:.0f}%), {keyword_wrong} misrouted")
+    print(f"  keyword + classifier:   {combined_routed:3d} answered without the LLM ({100 * combined_routed / total:.0f}%), {combined_wrong} misrouted")
+    print(f"  LLM calls removed:      {combined_routed - keyword_routed} ({100 * (combined_routed - keyword_routed) / total:.0f}% of traffic)")
+
+    started = time.perf_counter()
+    for i in range(args.iterations):
+        classifier.predict(HELD_OUT[i % total][0])
+    print(f"  prediction latency:     {1e6 * (time.perf_counter() - started) / args.iterations:.0f} us")
+
+if __name__ == "__main__":
+    main()
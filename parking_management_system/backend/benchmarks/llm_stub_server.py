@@ -0,0 +1,331 @@
+"""
+Local stand-in for the OpenAI-compatible chat completions API.
+
+Load testing /chat against Groq burns quota and measures Groq's weather as
+much as our own code. This server answers POST /v1/chat/completions (plain
+and streamed) deterministically, with upstream behaviour that can be tuned:
+
+- latency before the first token, drawn from a fixed, uniform, normal,
+  lognormal or exponential distribution
+- output pacing in tokens per second
+- injected 429 (with Retry-After), 500 and timeout responses
+- scripted replies: a JSON list of {"match": "<regex>", "response": "<text>"}
+  checked in order against the last user message; other messages get a
+  generic reply padded to --response-tokens tokens
+- scripted tool calls: an entry with "tool" (and optional "arguments")
+  answers a request that offers tools with that function call; once the
+  tool result comes back, the entry's "response" (or the generic reply) is
+  the answer
+
+Random draws come from a generator seeded with --seed and the request's
+sequence number, so a run with the same request order behaves the same.
+
+GET /stats reports request outcomes, tool calls and prompt/completion token
+totals (estimated like the history window does, tool definitions included);
+POST /stats/reset clears them.
+
+Point the backend at it with:
+    LLM_BASE_URL=http://127.0.0.1:8100/v1
+
+Usage:
+    python benchmarks/llm_stub_server.py --port 8100 --latency lognormal --latency-ms 400 \\
+        --tokens-per-second 150 --rate-429 0.02 --rate-500 0.01 --script replies.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.memory.history_window import count_tokens
+
+LATENCY_DISTRIBUTIONS = ["fixed", "uniform", "normal", "lognormal", "exponential"]
+
+DEFAULT_REPLY = "I can help you find and book parking at any of our malls."
+FILLER_WORDS = "Let me know the mall vehicle type and time you have in mind and I will check the options for you".split()
+
+def load_script(path: Optional[str]) -> List[Tuple[re.Pattern, Dict[str, Any]]]:
+    """Load scripted replies as (compiled pattern, entry) pairs."""
+    if not path:
+        return []
+    with open(path, "r") as f:
+        entries = json.load(f)
+    return [(re.compile(entry["match"], re.IGNORECASE), entry) for entry in entries]
+
+def tool_tokens(tools: List[Dict[str, Any]]) -> int:
+    """Estimate the tokens of tool definitions from the text providers render into the prompt.
+
+    Counting the raw JSON would charge every brace and quote as a token.
+    """
+    tokens = 0
+    for tool in tools:
+        function = tool.get("function", {})
+        tokens += count_tokens(f"{function.get('name', '')} {function.get('description', '')}")
+        for name, parameter in function.get("parameters", {}).get("properties", {}).items():
+            enum = " ".join(parameter.get("enum", []))
+            tokens += count_tokens(f"{name} {parameter.get('type', '')} {parameter.get('description', '')} {enum}")
+    return tokens
+
+def prompt_tokens(payload: Dict[str, Any]) -> int:
+    """Estimate the prompt tokens of a request, counting tool definitions and calls."""
+    tokens = 0
+    for message in payload.get("messages") or []:
+        tokens += count_tokens(message.get("content") or "")
+        for tool_call in message.get("tool_calls") or []:
+            tokens += count_tokens(f"{tool_call['function']['name']} {tool_call['function'].get('arguments', '')}")
+    if payload.get("tools"):
+        tokens += tool_tokens(payload["tools"])
+    return tokens
+
+class StubBehaviour:
+    """How the stand-in responds; built from the command-line options."""
+
+    def __init__(
+        self,
+        latency: str = "fixed",
+        latency_ms: float = 300.0,
+        latency_spread_ms: float = 100.0,
+        tokens_per_second: float = 200.0,
+        response_tokens: int = 60,
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        rate_timeout: float = 0.0,
+        timeout_seconds: float = 120.0,
+        retry_after: float = 1.0,
+        script: Optional[List[Tuple[re.Pattern, Dict[str, Any]]]] = None,
+        seed: int = 0
+    ):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency}")
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_spread_ms = latency_spread_ms
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.rate_timeout = rate_timeout
+        self.timeout_seconds = timeout_seconds
+        self.retry_after = retry_after
+        self.script = script or []
+        self.seed = seed
+
+    def first_token_delay(self, rng: random.Random) -> float:
+        """Seconds before the first token, drawn from the latency distribution."""
+        mean, spread = self.latency_ms, self.latency_spread_ms
+        if self.latency == "uniform":
+            delay = rng.uniform(mean - spread, mean + spread)
+        elif self.latency == "normal":
+            delay = rng.gauss(mean, spread)
+        elif self.latency == "lognormal":
+            # Parameterised so the distribution has the given mean and standard deviation
+            sigma_squared = math.log1p((spread / mean) ** 2) if mean > 0 else 0.0
+            delay = rng.lognormvariate(math.log(mean) - sigma_squared / 2, math.sqrt(sigma_squared)) if mean > 0 else 0.0
+        elif self.latency == "exponential":
+            delay = rng.expovariate(1 / mean) if mean > 0 else 0.0
+        else:
+            delay = mean
+        return max(delay, 0.0) / 1000
+
+    def outcome(self, rng: random.Random) -> str:
+        """Pick "429", "500", "timeout" or "ok" for a request."""
+        draw = rng.random()
+        for name, rate in (("429", self.rate_429), ("500", self.rate_500), ("timeout", self.rate_timeout)):
+            if draw < rate:
+                return name
+            draw -= rate
+        return "ok"
+
+    def reply(self, messages: List[Dict[str, Any]], tools_offered: bool = False) -> Dict[str, Any]:
+        """Reply message for a request: a scripted tool call, a scripted reply or the padded default reply."""
+        query = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        awaiting_tool_result = bool(messages) and messages[-1].get("role") == "tool"
+        for pattern, entry in self.script:
+            if not pattern.search(query):
+                continue
+            if entry.get("tool") and tools_offered and not awaiting_tool_result:
+                return {"role": "assistant", "content": None, "tool_calls": [{
+                    "id": f"call_{len(messages)}",
+                    "type": "function",
+                    "function": {"name": entry["tool"], "arguments": json.dumps(entry.get("arguments", {}))}
+                }]}
+            if entry.get("response"):
+                return {"role": "assistant", "content": entry["response"]}
+            break
+        return {"role": "assistant", "content": self.default_reply()}
+
+    def default_reply(self) -> str:
+        """The generic reply, padded to response_tokens tokens."""
+        words = DEFAULT_REPLY.split()
+        filler = itertools.cycle(FILLER_WORDS)
+        while count_tokens(" ".join(words)) < self.response_tokens:
+            words.append(next(filler))
+        return " ".join(words)
+
+def create_stub_app(behaviour: StubBehaviour) -> FastAPI:
+    """Build the stand-in API app."""
+    app = FastAPI(title="LLM stub")
+    sequence = itertools.count()
+    lock = threading.Lock()
+    stats: Dict[str, Any] = {}
+
+    def reset_stats():
+        with lock:
+            stats.clear()
+            stats.update({
+                "requests": 0, "streamed": 0, "ok": 0, "429": 0, "500": 0, "timeout": 0,
+                "tool_calls": 0, "prompt_tokens": 0, "completion_tokens": 0
+            })
+
+    reset_stats()
+
+    def record(outcome: str, streamed: bool, prompt_tokens: int = 0, completion_tokens: int = 0, tool_calls: int = 0):
+        with lock:
+            stats["requests"] += 1
+            stats["streamed"] += streamed
+            stats[outcome] += 1
+            stats["tool_calls"] += tool_calls
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        rng = random.Random(f"{behaviour.seed}:{next(sequence)}")
+        streamed = bool(payload.get("stream"))
+        outcome = behaviour.outcome(rng)
+
+        if outcome == "429":
+            record(outcome, streamed)
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded"}},
+                headers={"Retry-After": str(behaviour.retry_after)}
+            )
+        if outcome == "500":
+            record(outcome, streamed)
+            await asyncio.sleep(behaviour.first_token_delay(rng))
+            return JSONResponse(status_code=500, content={"error": {"message": "Internal error (stub)", "type": "server_error"}})
+        if outcome == "timeout":
+            record(outcome, streamed)
+            await asyncio.sleep(behaviour.timeout_seconds)
+            return JSONResponse(status_code=504, content={"error": {"message": "Upstream timeout (stub)", "type": "timeout"}})
+
+        messages = payload.get("messages") or []
+        tools_offered = bool(payload.get("tools")) and payload.get("tool_choice") != "none"
+        reply = behaviour.reply(messages, tools_offered)
+        content = reply["content"] or ""
+        tool_calls = reply.get("tool_calls") or []
+        completion_tokens = count_tokens(content) + sum(
+            count_tokens(f"{tool_call['function']['name']} {tool_call['function']['arguments']}") for tool_call in tool_calls
+        )
+        record(outcome, streamed, prompt_tokens(payload), completion_tokens, len(tool_calls))
+        completion_id = f"chatcmpl-stub-{rng.getrandbits(32):08x}"
+        model = payload.get("model", "stub")
+        token_delay = 1 / behaviour.tokens_per_second if behaviour.tokens_per_second > 0 else 0.0
+        first_token_delay = behaviour.first_token_delay(rng)
+
+        if not streamed:
+            await asyncio.sleep(first_token_delay + completion_tokens * token_delay)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": reply, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens(payload),
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens(payload) + completion_tokens
+                }
+            }
+
+        async def events():
+            await asyncio.sleep(first_token_delay)
+            pieces = re.findall(r"\S+\s*", content)
+            for piece in pieces:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(count_tokens(piece) * token_delay)
+            final = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def get_stats():
+        with lock:
+            snapshot = dict(stats)
+        served = snapshot["ok"]
+        snapshot["mean_prompt_tokens"] = round(snapshot["prompt_tokens"] / served, 1) if served else 0.0
+        return snapshot
+
+    @app.post("/stats/reset")
+    async def post_stats_reset():
+        reset_stats()
+        return {"status": "reset"}
+
+    return app
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="fixed", help="Distribution of the time to first token")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mean time to first token")
+    parser.add_argument("--latency-spread-ms", type=float, default=100.0, help="Half-width (uniform) or standard deviation (normal, lognormal)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Output pacing; 0 for no delay")
+    parser.add_argument("--response-tokens", type=int, default=60, help="Length of the default reply")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--rate-timeout", type=float, default=0.0, help="Share of requests that hang for --timeout-seconds")
+    parser.add_argument("--timeout-seconds", type=float, default=120.0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429s")
+    parser.add_argument("--script", help="JSON file of scripted replies")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+def behaviour_from_args(args: argparse.Namespace) -> StubBehaviour:
+    return StubBehaviour(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_spread_ms=args.latency_spread_ms,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        rate_429=args.rate_429,
+        rate_500=args.rate_500,
+        rate_timeout=args.rate_timeout,
+        timeout_seconds=args.timeout_seconds,
+        retry_after=args.retry_after,
+        script=load_script(args.script),
+        seed=args.seed
+    )
+
+def main():
+    import uvicorn
+
+    args = build_parser().parse_args()
+    uvicorn.run(create_stub_app(behaviour_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
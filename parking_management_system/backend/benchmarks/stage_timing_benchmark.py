@@ -0,0 +1,96 @@
+"""
+Report the agent's per-stage time before the LLM call.
+
+Runs queries that need the LLM through ParkingAgent.process_query on a
+scratch database and chat history, with the LLM call stubbed out, and prints
+the average time of each stage up to the LLM call.
+
+--history-latency-ms adds a delay to every history read, standing in for a
+vector store or slow disk; --turns sets the length of the conversation.
+
+Usage:
+    python benchmarks/stage_timing_benchmark.py --queries 200 --turns 150 --history-latency-ms 15
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERIES = [
+    "is there a pharmacy near the parking",
+    "can i bring my dog",
+    "where is the nearest exit to the food court",
+    "do you have covered parking",
+]
+
+def run(agent, queries: int, conversation_id: str):
+    """Run the queries and return the averaged stage timings of the LLM path."""
+    from app.agent.prompt_builder import PromptBuilder
+    from app.agent.stage_timings import StageTimings
+
+    StageTimings().reset()
+    for i in range(queries):
+        # Rebuild the prompt blocks each time, as after a slot change
+        PromptBuilder().invalidate(malls=False, slots=True)
+        agent.conversation_context["intent"] = None
+        agent.process_query(f"{QUERIES[i % len(QUERIES)]} {i}", conversation_id)
+    return StageTimings().info().get("llm", {}).get("stages_ms", {})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=150, help="Turns already in the conversation")
+    parser.add_argument("--history-latency-ms", type=float, default=0.0, help="Extra delay per history read")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stage_timing_benchmark_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    os.chdir(workdir)
+    try:
+        import contextlib
+        import io
+
+        from app.agent.agent import ParkingAgent
+        from app.database.database import SessionLocal, ensure_schema
+        from app.memory.file_chat_history import FileChatHistory
+
+        ensure_schema()
+        db = SessionLocal()
+        agent = ParkingAgent(db, "1")
+        agent._call_groq_api = lambda messages: "Sure, here is what I found."
+        agent.conversation_context.update({"selected_mall_id": 4, "selected_mall": "Nexus Mall", "selected_vehicle_type": "car"})
+        # Each run gets its own conversation, since every query adds a turn
+        for conversation_id in ["warmup", "measured"]:
+            for i in range(args.turns):
+                agent.file_chat.add_interaction(conversation_id=conversation_id, user_query=f"question {i} about the mall", agent_response="answer " * 60)
+
+        if args.history_latency_ms:
+            read_history = FileChatHistory.get_conversation_history
+            def slow_history(self, conversation_id):
+                time.sleep(args.history_latency_ms / 1000)
+                return read_history(self, conversation_id)
+            FileChatHistory.get_conversation_history = slow_history
+
+        # The agent logs every step; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(agent, 10, "warmup")
+            stages = run(agent, args.queries, "measured")
+        db.close()
+
+        print(f"{args.queries} LLM-path queries, {args.turns}-turn conversation, +{args.history_latency_ms:.0f} ms per history read")
+        print(f"  {'stage':<16}{'avg ms':>10}{'max ms':>10}")
+        for stage in ["route", "cache_lookup", "prompt", "history"]:
+            if stage in stages:
+                print(f"  {stage:<16}{stages[stage]['avg']:>10.2f}{stages[stage]['max']:>10.2f}")
+        before_llm = sum(stages.get(stage, {}).get("avg", 0.0) for stage in ["route", "cache_lookup", "prompt", "history"])
+        print(f"  {'before LLM':<16}{before_llm:>10.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
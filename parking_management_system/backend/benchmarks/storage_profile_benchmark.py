@@ -0,0 +1,141 @@
+"""
+Benchmark mixed read/write throughput of the SQLite storage profile.
+
+Runs several worker processes against one database file, the way multiple
+uvicorn workers share it, each doing a mix of availability reads (the
+booking overlap query) and booking writes. The run is repeated with SQLite's
+default settings and with the tuned storage profile.
+
+Usage:
+    python benchmarks/storage_profile_benchmark.py --workers 4 --duration 10 --write-ratio 0.2
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.database import models
+from app.database.init_db import init_db
+from app.database.storage_profile import engine_options, apply_storage_profile
+
+def make_engine(database_url: str, tuned: bool):
+    """Create an engine with either the tuned profile or SQLite defaults."""
+    if tuned:
+        engine = create_engine(database_url, **engine_options(database_url))
+        return apply_storage_profile(engine, database_url)
+    return create_engine(database_url, connect_args={"check_same_thread": False})
+
+def seed_database(database_url: str):
+    """Create the schema and sample data."""
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    init_db(db)
+    db.close()
+    engine.dispose()
+
+def run_worker(database_url: str, tuned: bool, duration: float, write_ratio: float, seed: int, results):
+    """Run the mixed workload until the duration expires and report operation counts."""
+    rng = random.Random(seed)
+    engine = make_engine(database_url, tuned)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+
+    slot_ids = [slot_id for (slot_id,) in db.query(models.ParkingSlot.id).all()]
+    reads = writes = errors = 0
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        start_time = datetime.now() + timedelta(hours=rng.randint(0, 24 * 30))
+        end_time = start_time + timedelta(hours=rng.randint(1, 4))
+        slot_id = rng.choice(slot_ids)
+
+        try:
+            if rng.random() < write_ratio:
+                db.add(models.Booking(
+                    user_id=rng.randint(1, 4),
+                    vehicle_id=rng.randint(1, 4),
+                    parking_slot_id=slot_id,
+                    start_time=start_time,
+                    end_time=end_time,
+                    status=models.BookingStatus.CONFIRMED,
+                    total_amount=50.0
+                ))
+                db.commit()
+                writes += 1
+            else:
+                db.query(models.Booking).filter(
+                    models.Booking.parking_slot_id == slot_id,
+                    models.Booking.status == models.BookingStatus.CONFIRMED,
+                    models.Booking.start_time < end_time,
+                    models.Booking.end_time > start_time
+                ).all()
+                reads += 1
+        except Exception:
+            # "database is locked" errors count against the profile
+            db.rollback()
+            errors += 1
+
+    db.close()
+    engine.dispose()
+    results.put((reads, writes, errors))
+
+def run_profile(tuned: bool, workers: int, duration: float, write_ratio: float) -> dict:
+    """Run all workers against a fresh database and aggregate their results."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'benchmark.db')}"
+        seed_database(database_url)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(database_url, tuned, duration, write_ratio, worker_id, results)
+            )
+            for worker_id in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    reads = sum(r for r, _, _ in totals)
+    writes = sum(w for _, w, _ in totals)
+    errors = sum(e for _, _, e in totals)
+    return {
+        "reads_per_sec": reads / duration,
+        "writes_per_sec": writes / duration,
+        "ops_per_sec": (reads + writes) / duration,
+        "errors": errors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Number of worker processes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Fraction of operations that are writes")
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, {args.duration:.0f}s per profile, {args.write_ratio:.0%} writes\n")
+    print(f"{'profile':<10}{'ops/s':>10}{'reads/s':>10}{'writes/s':>10}{'errors':>8}")
+    for name, tuned in (("default", False), ("tuned", True)):
+        result = run_profile(tuned, args.workers, args.duration, args.write_ratio)
+        print(
+            f"{name:<10}{result['ops_per_sec']:>10.0f}{result['reads_per_sec']:>10.0f}"
+            f"{result['writes_per_sec']:>10.0f}{result['errors']:>8}"
+        )
+
+if __name__ == "__main__":
+    main()
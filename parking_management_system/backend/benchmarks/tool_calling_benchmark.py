@@ -0,0 +1,115 @@
+"""
+Compare prompt size and LLM round trips with and without tool calling.
+
+Runs the same conversation through ParkingAgent.process_query twice on a
+scratch database, once with the full system prompt (mall list, slot lines
+and rate card on every turn) and once with LLM_TOOL_CALLING's compact prompt
+and tools. The LLM is the stand-in server from llm_stub_server.py, called
+in-process, scripted to ask for a tool on the turns that need live data.
+Prints prompt tokens and LLM requests per turn for both modes, and the fixed
+part of every request (system prompt, plus tool definitions in tool mode).
+
+Usage:
+    python benchmarks/tool_calling_benchmark.py --rounds 5
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (query, tool the stub asks for, its arguments); turns without a tool don't need live data
+CONVERSATION = [
+    ("is there a pharmacy near the parking", None, None),
+    ("which slots are free at nexus mall tomorrow at 5 pm", "get_available_slots",
+     {"mall": "Nexus Mall", "vehicle_type": "car", "time_period": "tomorrow at 5 pm"}),
+    ("can i bring my dog", None, None),
+    ("is parking cheaper for bikes", "get_parking_rates", {}),
+    ("where is the nearest exit to the food court", None, None),
+    ("when does my parking start", "get_user_bookings", {}),
+    ("do you have covered parking", None, None),
+    ("is it open on sundays", None, None),
+]
+
+def fixed_prompt_tokens(db) -> tuple:
+    """Tokens of the system prompt in both modes, tool definitions included, for an empty context."""
+    from app.agent.prompt_builder import PromptBuilder
+    from app.agent.tools import TOOL_DEFINITIONS
+    from app.memory.history_window import count_tokens
+    from llm_stub_server import tool_tokens
+
+    context = {"selected_mall_id": None, "selected_mall": None, "selected_vehicle_type": None,
+               "selected_license_plate": None, "selected_time_period": None}
+    prompt_builder = PromptBuilder()
+    classic = prompt_builder.system_message(db) + prompt_builder.user_context(db, "1", None, context, "")
+    tools = prompt_builder.tool_system_message("1", None, context)
+    return count_tokens(classic), count_tokens(tools) + tool_tokens(TOOL_DEFINITIONS)
+
+def run(db, stub, use_tools: bool, rounds: int):
+    """Run the conversation and return the stub's stats for it."""
+    from app.agent.agent import ParkingAgent
+    from app.llm.client import LLMClient
+
+    client = LLMClient(base_url="http://stub/v1", api_key="benchmark", max_retries=0)
+    client._sync_client = stub
+    agent = ParkingAgent(db, "1", llm_client=client, use_tools=use_tools)
+    stub.post("/stats/reset")
+    conversation_id = f"tools-{use_tools}"
+    for i in range(rounds):
+        for query, _, _ in CONVERSATION:
+            # Follow-up questions would otherwise stick to the previous intent's direct handler
+            agent.conversation_context["intent"] = None
+            agent.process_query(f"{query} ({i})", conversation_id)
+    return stub.get("/stats").json()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="Times to repeat the conversation")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="tool_calling_benchmark_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    os.environ["LLM_CACHE_SIZE"] = "0"
+    os.chdir(workdir)
+    try:
+        import contextlib
+        import io
+        import re
+
+        from fastapi.testclient import TestClient
+
+        from app.database.database import SessionLocal, ensure_schema
+        from llm_stub_server import StubBehaviour, create_stub_app
+
+        script = [
+            (re.compile(re.escape(query), re.IGNORECASE), {"match": query, "tool": tool, "arguments": arguments})
+            for query, tool, arguments in CONVERSATION if tool
+        ]
+        stub = TestClient(create_stub_app(StubBehaviour(latency="fixed", latency_ms=0, tokens_per_second=0, script=script, seed=1)))
+
+        ensure_schema()
+        db = SessionLocal()
+        # The agent logs every step; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            classic = run(db, stub, False, args.rounds)
+            tools = run(db, stub, True, args.rounds)
+            fixed = fixed_prompt_tokens(db)
+        db.close()
+
+        turns = args.rounds * len(CONVERSATION)
+        live = sum(1 for _, tool, _ in CONVERSATION if tool)
+        print(f"{turns} turns ({live} of every {len(CONVERSATION)} need live data)")
+        print(f"  {'per turn':<22}{'full prompt':>12}{'tools':>10}")
+        print(f"  {'fixed prompt tokens':<22}{fixed[0]:>12}{fixed[1]:>10}  (per request)")
+        for label, key in [("LLM requests", "requests"), ("tool calls", "tool_calls"), ("prompt tokens", "prompt_tokens")]:
+            print(f"  {label:<22}{classic[key] / turns:>12.1f}{tools[key] / turns:>10.1f}")
+        saved = 1 - tools["prompt_tokens"] / classic["prompt_tokens"] if classic["prompt_tokens"] else 0.0
+        print(f"  prompt tokens saved: {100 * saved:.0f}%")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
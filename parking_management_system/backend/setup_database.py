@@ -3,6 +3,7 @@ Consolidated database setup script for the Parking Management System.
 This script creates all necessary tables and populates them with sample data.
 """
 
+import argparse
 import os
 import sys
 from datetime import datetime, timedelta
@@ -19,6 +20,7 @@ from app.database.database import Base, engine
 from app.database.models import (
     Mall, ParkingSlot, VehicleType, User, Vehicle, Booking, BookingStatus, Payment, PaymentStatus, UserRole
 )
+from app.database.synthetic_data import generate_synthetic_data
 
 # Create a session
 Session = sessionmaker(bind=engine)
@@ -336,18 +338,56 @@ def add_sample_vehicles():
         session.rollback()
         print("Error adding vehicles. Rolling back.")
 
+def add_synthetic_data(args):
+    """Add generated data at the requested scale."""
+    if session.query(User).count() > 0 or session.query(Mall).count() > 0:
+        print("Data already exists in the database. Skipping synthetic data generation.")
+        return
+
+    print("Generating synthetic data...")
+    start = datetime.now()
+    counts = generate_synthetic_data(
+        session,
+        malls=args.malls,
+        slots_per_mall=args.slots_per_mall,
+        users=args.users,
+        vehicles=args.vehicles,
+        booking_months=args.booking_months,
+        bookings_per_slot_day=args.bookings_per_slot_day,
+        seed=args.seed
+    )
+    elapsed = (datetime.now() - start).total_seconds()
+    print(f"Generated {counts} in {elapsed:.1f}s.")
+
+def parse_args():
+    """Parse command line options for synthetic data generation."""
+    parser = argparse.ArgumentParser(description="Set up the Parking Management System database")
+    parser.add_argument("--synthetic", action="store_true", help="Generate synthetic data instead of the fixed sample data")
+    parser.add_argument("--malls", type=int, default=10, help="Number of malls")
+    parser.add_argument("--slots-per-mall", type=int, default=10, help="Parking slots per mall")
+    parser.add_argument("--users", type=int, default=3, help="Number of regular users (an admin is always added)")
+    parser.add_argument("--vehicles", type=int, default=4, help="Number of vehicles, shared round-robin between users")
+    parser.add_argument("--booking-months", type=float, default=3, help="Months of booking history to generate")
+    parser.add_argument("--bookings-per-slot-day", type=float, default=4.0, help="Average bookings per slot per day")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    return parser.parse_args()
+
 def main():
     """Main function to set up the database."""
+    args = parse_args()
     print("Starting database setup...")
     
     # Create tables if they don't exist
     create_tables()
     
     # Add sample data
-    add_sample_malls()
-    add_sample_parking_slots()
-    add_sample_users()
-    add_sample_vehicles()
+    if args.synthetic:
+        add_synthetic_data(args)
+    else:
+        add_sample_malls()
+        add_sample_parking_slots()
+        add_sample_users()
+        add_sample_vehicles()
     
     print("Database setup completed successfully.")
 
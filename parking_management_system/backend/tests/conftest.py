@@ -0,0 +1,11 @@
+"""
+Shared test setup.
+
+The app opens its database when app.database.database is first imported, so
+the tests point it at a scratch SQLite file before any test module loads.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='parking_tests_'), 'test.db')}")
@@ -0,0 +1,41 @@
+"""
+Archive checks: archived bookings reach delta /sync clients as deletions.
+"""
+
+from datetime import datetime, timedelta
+
+from app.database.archive import archive_bookings
+from app.database.database import SessionLocal, ensure_schema
+from app.database.models import Booking, BookingArchive, BookingStatus, ParkingSlot, Vehicle
+from app.database.sync import get_changes, get_current_cursor
+
+def test_archived_booking_is_synced_as_deleted():
+    ensure_schema()
+    db = SessionLocal()
+    try:
+        vehicle = db.query(Vehicle).first()
+        slot = db.query(ParkingSlot).first()
+        ended = datetime.now() - timedelta(days=2000)
+        booking = Booking(
+            user_id=vehicle.user_id,
+            vehicle_id=vehicle.id,
+            parking_slot_id=slot.id,
+            start_time=ended - timedelta(hours=2),
+            end_time=ended,
+            status=BookingStatus.COMPLETED,
+            total_amount=10.0
+        )
+        db.add(booking)
+        db.commit()
+        booking_id, user_id = booking.id, vehicle.user_id
+        since = get_current_cursor(db)
+
+        assert archive_bookings(db, retention_days=1000) >= 1
+
+        assert db.get(BookingArchive, booking_id) is not None
+        changes = get_changes(db, str(user_id), since=since)
+        assert changes["full_sync"] is False
+        assert booking_id in changes["deleted_bookings"]
+        assert get_changes(db, str(user_id), since=changes["cursor"])["deleted_bookings"] == []
+    finally:
+        db.close()
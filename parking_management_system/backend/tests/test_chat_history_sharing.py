@@ -0,0 +1,58 @@
+"""
+Shared chat history checks: one user's conversations saved at the same time
+from several threads, or from another worker's copy of the history, all survive.
+"""
+
+import threading
+
+from app.memory.chat_manager import ChatMemoryManager
+from app.memory.file_chat_history import FileChatHistory
+
+def save_concurrently(save, count: int = 20):
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_concurrent_conversations_keep_every_interaction(tmp_path):
+    history = FileChatHistory("7", persist_directory=str(tmp_path))
+    errors = []
+
+    def save(i):
+        try:
+            history.add_interaction(f"conv-{i % 4}", f"question {i}", f"answer {i}")
+            history.list_conversations()
+        except Exception as e:
+            errors.append(e)
+
+    save_concurrently(save)
+
+    assert errors == []
+    conversations = history.list_conversations()
+    assert sorted(c["conversation_id"] for c in conversations) == [f"conv-{i}" for i in range(4)]
+    assert sum(c["interaction_count"] for c in conversations) == 20
+    assert sum(len(history.get_conversation_history(f"conv-{i}")) for i in range(4)) == 20
+
+def test_another_workers_writes_are_not_overwritten(tmp_path):
+    this_worker = FileChatHistory("7", persist_directory=str(tmp_path))
+    other_worker = FileChatHistory("7", persist_directory=str(tmp_path))
+
+    this_worker.add_interaction("mine", "hi", "hello")
+    other_worker.add_interaction("theirs", "hi", "hello")
+    other_worker.rename_conversation("mine", "Renamed elsewhere")
+    this_worker.add_interaction("mine", "book a slot", "done")
+
+    names = {c["conversation_id"]: c["name"] for c in this_worker.list_conversations()}
+    assert names == {"mine": "Renamed elsewhere", "theirs": "Conversation 2"}
+    assert this_worker.has_interactions("theirs")
+    assert FileChatHistory("7", persist_directory=str(tmp_path)).list_conversations() == this_worker.list_conversations()
+
+def test_memory_manager_keeps_other_workers_interactions(tmp_path):
+    this_worker = ChatMemoryManager("7", persist_directory=str(tmp_path))
+    other_worker = ChatMemoryManager("7", persist_directory=str(tmp_path))
+
+    save_concurrently(lambda i: (this_worker if i % 2 else other_worker).add_interaction(f"question {i}", f"answer {i}"))
+
+    assert len(this_worker.get_relevant_history("", k=50)) == 20
+    assert len(ChatMemoryManager("7", persist_directory=str(tmp_path)).conversation_history) == 20
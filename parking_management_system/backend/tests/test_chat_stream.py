@@ -0,0 +1,86 @@
+"""
+/chat/stream session handling: the agent session goes back to the cache only
+once the agent has finished, including when the client disconnects mid-stream.
+"""
+
+import json
+import threading
+import time
+
+import anyio
+import pytest
+
+from app.agent.agent import ParkingAgent
+from app.agent.session_cache import AgentSessionCache
+from app.database.database import ensure_schema
+from app.main import app
+
+@pytest.fixture
+def agent_events(tmp_path, monkeypatch):
+    """Stub the agent's stream; record when it finishes and when its session is released."""
+    monkeypatch.chdir(tmp_path)
+    ensure_schema()
+    AgentSessionCache().clear()
+
+    events = []
+    def fake_stream(self, query, conversation_id=None):
+        yield "first "
+        time.sleep(0.2)
+        yield "second"
+        events.append("saved")
+    monkeypatch.setattr(ParkingAgent, "process_query_stream", fake_stream)
+
+    release = AgentSessionCache.release
+    def recording_release(cache, session):
+        events.append("released")
+        release(cache, session)
+    monkeypatch.setattr(AgentSessionCache, "release", recording_release)
+    return events
+
+async def post_stream(user_id: str, disconnect_after_first_chunk: bool):
+    """Call /chat/stream over ASGI and return the body chunks the client received."""
+    body = json.dumps({"query": "tell me about the mall", "conversation_id": f"stream-{user_id}"}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/chat/stream", "raw_path": b"/chat/stream", "query_string": b"",
+        "root_path": "", "server": ("test", 80), "client": ("test", 1234),
+        "headers": [(b"content-type", b"application/json"), (b"x-user-id", user_id.encode())],
+    }
+    received = []
+    got_chunk = anyio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        if disconnect_after_first_chunk:
+            await got_chunk.wait()
+        else:
+            await anyio.sleep_forever()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            received.append(message["body"].decode())
+            got_chunk.set()
+
+    await app(scope, receive, send)
+    return received
+
+def test_completed_stream_releases_after_saving(agent_events):
+    received = anyio.run(post_stream, "301", False)
+
+    assert "event: done" in received[-1]
+    assert agent_events == ["saved", "released"]
+
+def test_disconnect_releases_only_after_agent_finishes(agent_events):
+    received = anyio.run(post_stream, "302", True)
+
+    # The client left before the done event, but the agent still ran to the end
+    assert not any("event: done" in chunk for chunk in received)
+    assert agent_events == ["saved", "released"]
+    session = AgentSessionCache()._sessions[("302", "stream-302")]
+    assert not session.lock.locked()
+    assert session.agent.db is None
@@ -0,0 +1,99 @@
+"""
+Routing checks for the local intent classifier.
+
+Every held-out query (none of them in the seed examples) must either go to
+its own handler or be left to the LLM; a confident wrong prediction sends the
+user to the wrong handler. Cancellation and modification requests must never
+be routed, since no direct handler serves them.
+"""
+
+import json
+
+import pytest
+
+from app.agent.intent_classifier import (
+    CANCEL_BOOKING, OTHER, IntentClassifier, default_threshold, load_chat_history_examples, training_examples
+)
+
+# Intents the agent has a direct handler for
+ROUTED_INTENTS = {"check_available_slots", "check_parking_rates", "check_user_bookings", "create_booking"}
+
+HELD_OUT = [
+    ("any open spots at orion tonight", "check_available_slots"),
+    ("is there parking space for a truck", "check_available_slots"),
+    ("got any free bays", "check_available_slots"),
+    ("are all the slots taken", "check_available_slots"),
+    ("can i still get a spot", "check_available_slots"),
+    ("is nexus mall full right now", "check_available_slots"),
+    ("find me a free spot", "check_available_slots"),
+    ("show available slots", "check_available_slots"),
+    ("what's the hourly charge", "check_parking_rates"),
+    ("how much will 3 hours set me back", "check_parking_rates"),
+    ("is it expensive to park here", "check_parking_rates"),
+    ("how much per hour for a bike", "check_parking_rates"),
+    ("what's the tariff for cars", "check_parking_rates"),
+    ("what are the rates", "check_parking_rates"),
+    ("do i have to pay for parking", "check_parking_rates"),
+    ("what's the price", "check_parking_rates"),
+    ("what reservations do i have", "check_user_bookings"),
+    ("show me what i reserved", "check_user_bookings"),
+    ("list all my reservations", "check_user_bookings"),
+    ("did i book anything", "check_user_bookings"),
+    ("show my bookings", "check_user_bookings"),
+    ("which reservations are active", "check_user_bookings"),
+    ("please book me a spot", "create_booking"),
+    ("can you reserve a bike slot", "create_booking"),
+    ("i'd like to reserve parking tomorrow", "create_booking"),
+    ("book a slot for my car", "create_booking"),
+    ("hey how's it going", OTHER),
+    ("thanks a lot", OTHER),
+    ("where's the exit", OTHER),
+    ("is the food court open", OTHER),
+    ("what movies are playing", OTHER),
+    ("can i bring my dog", OTHER),
+    ("who am i talking to", OTHER),
+    ("good evening", OTHER),
+    ("is there a pharmacy in the mall", OTHER),
+    ("how do i reach the mall by metro", OTHER),
+    ("tell me about yourself", OTHER),
+    ("what's your name", OTHER),
+    ("delete my reservation", CANCEL_BOOKING),
+    ("cancel my parking for tomorrow", CANCEL_BOOKING),
+    ("i won't need the booking, please cancel it", CANCEL_BOOKING),
+    ("remove the reservation i made", CANCEL_BOOKING),
+    ("can i modify my reservation", OTHER),
+    ("change the time of my booking", OTHER),
+    ("move my reservation to 6 pm", OTHER),
+]
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier().train(training_examples(chat_history_directory=None))
+
+@pytest.mark.parametrize("query, expected", HELD_OUT)
+def test_held_out_query_is_not_misrouted(classifier, query, expected):
+    intent, confidence = classifier.predict(query)
+    if intent in ROUTED_INTENTS and confidence >= default_threshold():
+        assert intent == expected, f"{query!r} routed to {intent} ({confidence:.2f})"
+
+@pytest.mark.parametrize("query", [query for query, expected in HELD_OUT if expected not in ROUTED_INTENTS])
+def test_unhandled_request_is_never_routed(classifier, query):
+    intent, confidence = classifier.predict(query)
+    assert intent not in ROUTED_INTENTS or confidence < default_threshold(), f"{query!r} routed to {intent} ({confidence:.2f})"
+
+def test_chat_history_labels_only_list_replies(tmp_path):
+    interactions = [
+        {"user_query": "what did i reserve", "agent_response": "\nHere are your current active bookings:\n\nBooking ID: 4\n"},
+        {"user_query": "how pricey is it", "agent_response": "\nHere are the current parking rates:\n\nRates at Nexus Mall:\n* Car: \u20b950/hour\n"},
+        # Confirmations and cancellations mention booking and slot IDs too
+        {"user_query": "yes", "agent_response": "\nGreat! Your booking has been confirmed.\n\nBooking ID: 5\n"},
+        {"user_query": "book it", "agent_response": "\nI've found slot 3 at Nexus Mall.\n\n* Slot ID: 3\n* Rate: \u20b950/hour\n"},
+        # A sticky intent answered this cancellation with the bookings list
+        {"user_query": "delete booking 4", "agent_response": "\nHere are your current active bookings:\n\nBooking ID: 4\n"},
+    ]
+    (tmp_path / "user_1").mkdir()
+    (tmp_path / "user_1" / "conversation.json").write_text(json.dumps(interactions))
+    assert load_chat_history_examples(str(tmp_path)) == [
+        ("what did i reserve", "check_user_bookings"),
+        ("how pricey is it", "check_parking_rates"),
+    ]
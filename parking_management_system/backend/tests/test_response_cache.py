@@ -0,0 +1,68 @@
+"""
+Response cache checks: an answer to an opening FAQ-style question is shared
+between users, while questions that depend on the user still reach the LLM.
+"""
+
+import pytest
+
+from app.agent.agent import ParkingAgent
+from app.agent.prompt_builder import SHARED_USER_NAME
+from app.database.database import SessionLocal, ensure_schema
+from app.llm.response_cache import LLMResponseCache
+
+QUESTION = "is there a pharmacy near the parking at orion mall"
+
+@pytest.fixture
+def llm_calls(tmp_path, monkeypatch):
+    """Record the messages of every LLM call, which answers with a fixed reply."""
+    # Chat history and memory files are written under the working directory
+    monkeypatch.chdir(tmp_path)
+    ensure_schema()
+    LLMResponseCache().clear()
+
+    calls = []
+    def fake_llm(self, messages):
+        calls.append(messages)
+        return "Yes, there is a pharmacy on the ground floor."
+    monkeypatch.setattr(ParkingAgent, "_call_groq_api", fake_llm)
+    return calls
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+def ask(db, user_id: str, user_name: str, query: str, conversation_id: str) -> str:
+    agent = ParkingAgent(db, user_id, use_tools=False)
+    agent.bind_request(db, conversation_id=conversation_id, user_name=user_name)
+    return agent.process_query(query, conversation_id)
+
+def test_opening_question_is_shared_between_users(llm_calls, db):
+    first = ask(db, "201", "Asha", QUESTION, "conversation-a")
+    hits = LLMResponseCache().stats["hits"]
+    second = ask(db, "202", "Ravi", QUESTION.upper() + "?", "conversation-b")
+
+    assert second == first
+    assert len(llm_calls) == 1
+    assert LLMResponseCache().stats["hits"] == hits + 1
+
+def test_shared_prompt_leaves_out_the_user(llm_calls, db):
+    ask(db, "203", "Meera", QUESTION, "conversation-c")
+
+    system_prompt = llm_calls[0][0]["content"]
+    assert "Meera" not in system_prompt
+    assert "203" not in system_prompt
+    assert SHARED_USER_NAME in system_prompt
+    # Only the system prompt and the question; no past questions
+    assert len(llm_calls[0]) == 2
+
+def test_follow_up_question_bypasses_the_cache(llm_calls, db):
+    ask(db, "204", "Kiran", QUESTION, "conversation-d")
+    ask(db, "205", "Divya", "is there an atm near the parking", "conversation-e")
+    ask(db, "205", "Divya", QUESTION, "conversation-e")
+
+    # The cached answer isn't reused; the follow-up is asked with the user's own prompt and history
+    assert len(llm_calls) == 3
+    assert "Divya" in llm_calls[2][0]["content"]
+    assert len(llm_calls[2]) > 2
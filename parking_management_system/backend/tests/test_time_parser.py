@@ -0,0 +1,101 @@
+"""
+Table-driven tests of the booking time parser.
+
+Every phrase is resolved against a fixed reference time (Monday 19 October
+2026, 10:00) and compared with the expected start and end.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.agent.time_parser import InvalidDateError, combine_time_phrases, find_time_phrase, resolve_time_period
+
+REFERENCE = datetime(2026, 10, 19, 10, 0)  # a Monday
+
+# (phrase, expected start, expected end); None means the phrase has no time information
+CASES = [
+    # Clock times and defaults (5 pm, 2 hours)
+    ("5 pm", "2026-10-19 17:00", "2026-10-19 19:00"),
+    ("at 3:30 pm", "2026-10-19 15:30", "2026-10-19 17:30"),
+    ("at 5", "2026-10-19 17:00", "2026-10-19 19:00"),
+    ("at 11", "2026-10-19 11:00", "2026-10-19 13:00"),
+    ("14:00", "2026-10-19 14:00", "2026-10-19 16:00"),
+    ("noon", "2026-10-19 12:00", "2026-10-19 14:00"),
+    ("9 am", "2026-10-20 09:00", "2026-10-20 11:00"),  # already passed today
+    ("2 hours", "2026-10-19 17:00", "2026-10-19 19:00"),
+    # Relative days
+    ("today at 9 am", "2026-10-19 09:00", "2026-10-19 11:00"),
+    ("tomorrow at 5 pm for 2 hours", "2026-10-20 17:00", "2026-10-20 19:00"),
+    ("tmrw 8am", "2026-10-20 08:00", "2026-10-20 10:00"),
+    ("day after tomorrow morning", "2026-10-21 09:00", "2026-10-21 11:00"),
+    ("in 3 days at 11 am", "2026-10-22 11:00", "2026-10-22 13:00"),
+    ("tonight", "2026-10-19 20:00", "2026-10-19 22:00"),
+    ("next week", "2026-10-26 17:00", "2026-10-26 19:00"),
+    # Weekdays
+    ("friday 3-5 pm", "2026-10-23 15:00", "2026-10-23 17:00"),
+    ("on sat at 6:30pm", "2026-10-24 18:30", "2026-10-24 20:30"),
+    ("monday at 8 am", "2026-10-26 08:00", "2026-10-26 10:00"),
+    ("monday at 4 pm", "2026-10-19 16:00", "2026-10-19 18:00"),
+    ("next monday evening for 90 minutes", "2026-10-26 18:00", "2026-10-26 19:30"),
+    # Explicit dates
+    ("25 oct from 10:30 to 13:00", "2026-10-25 10:30", "2026-10-25 13:00"),
+    ("on 25/12 at noon", "2026-12-25 12:00", "2026-12-25 14:00"),
+    ("2026-11-02 at 14:00", "2026-11-02 14:00", "2026-11-02 16:00"),
+    ("1-11-2026 at 4 pm", "2026-11-01 16:00", "2026-11-01 18:00"),
+    ("october 3rd", "2027-10-03 17:00", "2027-10-03 19:00"),  # past dates mean next year
+    ("the 5th of november at 2pm", "2026-11-05 14:00", "2026-11-05 16:00"),
+    ("29 feb", "2028-02-29 17:00", "2028-02-29 19:00"),  # next leap year
+    ("on 29th february at 5 pm", "2028-02-29 17:00", "2028-02-29 19:00"),
+    ("29/02/2028 at 10 am", "2028-02-29 10:00", "2028-02-29 12:00"),
+    # Ranges
+    ("from 3 to 5", "2026-10-19 15:00", "2026-10-19 17:00"),
+    ("between 11 and 1 pm", "2026-10-19 11:00", "2026-10-19 13:00"),
+    ("10 pm to 1 am", "2026-10-19 22:00", "2026-10-20 01:00"),
+    ("at 9 in the evening", "2026-10-19 21:00", "2026-10-19 23:00"),
+    # Durations
+    ("for 1.5 hours", "2026-10-19 17:00", "2026-10-19 18:30"),
+    ("half an hour", "2026-10-19 17:00", "2026-10-19 17:30"),
+    ("for an hour and a half", "2026-10-19 17:00", "2026-10-19 18:30"),
+    ("1 hour 30 minutes at 6 pm", "2026-10-19 18:00", "2026-10-19 19:30"),
+    # Not times
+    ("show my bookings", None, None),
+    ("mall 3", None, None),
+    ("book slot 12", None, None),
+    ("KA01AB1234", None, None),
+]
+
+# Dates that don't exist; booking the time alone would land on another day
+INVALID_DATES = [
+    "29/02/2027 at 10 am",
+    "31/04/2027 at 10 am",
+    "32/01/2027 at 9 am",
+    "on 30 February at 3pm",
+    "31st april",
+]
+
+# (previous phrase, new phrase, combined)
+COMBINATIONS = [
+    ("tomorrow", "at 5 pm", "tomorrow at 5 pm"),
+    ("tomorrow at 5 pm", "for 3 hours", "tomorrow at 5 pm for 3 hours"),
+    ("tomorrow at 5 pm", "at 6 pm", "at 6 pm"),
+    (None, "friday", "friday"),
+]
+
+@pytest.mark.parametrize("phrase, expected_start, expected_end", [case for case in CASES if case[1] is not None])
+def test_resolve_time_period(phrase, expected_start, expected_end):
+    start, end = resolve_time_period(phrase, REFERENCE)
+    assert f"{start:%Y-%m-%d %H:%M} - {end:%Y-%m-%d %H:%M}" == f"{expected_start} - {expected_end}"
+
+@pytest.mark.parametrize("phrase", INVALID_DATES)
+def test_invalid_date_is_rejected(phrase):
+    with pytest.raises(InvalidDateError):
+        resolve_time_period(phrase, REFERENCE)
+
+@pytest.mark.parametrize("phrase", [case[0] for case in CASES if case[1] is None])
+def test_not_a_time_phrase(phrase):
+    assert find_time_phrase(phrase) is None
+
+@pytest.mark.parametrize("previous, new, expected", COMBINATIONS)
+def test_combine_time_phrases(previous, new, expected):
+    assert combine_time_phrases(previous, new) == expected
@@ -986,6 +986,71 @@ class ChatInterfaceComponent {
         }
     }
 
+    /**
+     * Read a /chat/stream Server-Sent Events response, showing tokens as they arrive.
+     *
+     * Resolves with { response } once the `done` event is received, so callers can
+     * handle the final text exactly like a regular /chat response.
+     */
+    async readChatStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let streamedText = '';
+        let finalResponse = null;
+        let liveMessage = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // Events are separated by a blank line
+            let separatorIndex;
+            while ((separatorIndex = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, separatorIndex);
+                buffer = buffer.slice(separatorIndex + 2);
+
+                let eventName = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        eventName = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                });
+
+                if (!data) {
+                    continue;
+                }
+
+                const payload = JSON.parse(data);
+                if (eventName === 'token') {
+                    streamedText += payload.token;
+
+                    // Replace the typing indicator with the partial response
+                    if (!liveMessage) {
+                        this.removeTypingIndicator();
+                        liveMessage = document.createElement('div');
+                        liveMessage.className = 'assistant-message typing';
+                        document.getElementById('chatMessages').appendChild(liveMessage);
+                    }
+                    liveMessage.innerHTML = `<p>${this.formatMessage(streamedText)}</p>`;
+                    this.scrollToBottom();
+                } else if (eventName === 'done') {
+                    finalResponse = payload.response;
+                }
+            }
+        }
+
+        // The live message is marked as typing so the caller's cleanup removes it
+        return { response: finalResponse !== null ? finalResponse : streamedText };
+    }
+
     sendToBackend(message) {
         // Get current user ID
         const userId = localStorage.getItem('userId');
@@ -1021,8 +1086,8 @@ class ChatInterfaceComponent {
 
                     console.log('Sending message with conversation ID:', conversationId);
 
-                    // Send to backend
-                    return fetch(`${API_BASE_URL}/chat`, {
+                    // Send to backend (streamed, so tokens show up as they are generated)
+                    return fetch(`${API_BASE_URL}/chat/stream`, {
                         method: 'POST',
                         headers: {
                             'Content-Type': 'application/json',
@@ -1068,7 +1133,7 @@ class ChatInterfaceComponent {
                 if (!response || !response.ok) {
                     throw new Error(`HTTP error! Status: ${response?.status}, Text: ${response?.statusText}`);
                 }
-                return response.json();
+                return this.readChatStream(response);
             })
             .then(data => {
                 // Remove typing indicator